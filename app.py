@@ -3,15 +3,16 @@ from components.sidebar import render as sidebar_render
 
 st.set_page_config(page_title="TaskPilot AI", layout="wide", initial_sidebar_state="expanded")
 
-# Ensure default page selection is Dashboard
-if "nav_radio" not in st.session_state:
-    st.session_state["nav_radio"] = "Dashboard"
-
-active = sidebar_render(st.session_state["nav_radio"])
-st.session_state["nav_radio"] = active
+# The radio keeps its own value under "nav_radio"; Dashboard until the user picks a page.
+active = sidebar_render(st.session_state.get("nav_radio", "Dashboard"))
 
 # Redirect to the selected page (Streamlit multipage style)
-if active != "Dashboard":
-    st.switch_page(f"pages/{['Dashboard','All Tasks','Open Tasks','Closed Tasks','Knowledge Base','Development'].index(active)+1}_{active.replace(' ','_')}.py")
-else:
-    st.switch_page("pages/1_Dashboard.py")
\ No newline at end of file
+PAGES = {
+    "Dashboard": "pages/1_Dashboard.py",
+    "All Tasks": "pages/2_All_Tasks.py",
+    "Open Tasks": "pages/3_Open_Tasks.py",
+    "Closed Tasks": "pages/4_Closed_Tasks.py",
+    "Knowledge Base": "pages/6_Knowledge_Base.py",
+    "Development": "pages/7_Development.py",
+}
+st.switch_page(PAGES.get(active, PAGES["Dashboard"]))
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmarks: `python -m benchmarks.run --sizes 1000,10000 --out results.json`."""
@@ -0,0 +1,46 @@
+from __future__ import annotations
+from typing import Dict, Any
+import sys, json, argparse
+
+
+def _index(report: Dict[str,Any]) -> Dict[tuple, Dict[str,Any]]:
+    return {(r["backend"], r["size"], r["group"], r["name"]): r
+            for run in report["runs"] for r in run["results"]}
+
+
+def compare(base: Dict[str,Any], new: Dict[str,Any], threshold: float = 0.25, floor_ms: float = 1.0):
+    """Rows of (key, base p50, new p50, ratio, regressed) for cases present in both reports.
+
+    A case regresses when its p50 grew by more than `threshold` and by more
+    than `floor_ms`, so sub-millisecond noise doesn't trip it.
+    """
+    a, b = _index(base), _index(new)
+    rows = []
+    for key in sorted(a.keys() & b.keys(), key=str):
+        old, cur = a[key]["p50_ms"], b[key]["p50_ms"]
+        ratio = cur / old if old else float("inf")
+        rows.append((key, old, cur, ratio, cur - old > floor_ms and ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare two benchmark JSON files; exit 1 on regressions.")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown, as a fraction")
+    ap.add_argument("--floor-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold, args.floor_ms)
+    for (backend, size, group, name), old, cur, ratio, bad in rows:
+        flag = "  REGRESSION" if bad else ""
+        print(f"{backend:<7}{size:>9} {group:<12} {name:<32} {old:10.2f} -> {cur:10.2f} ms  x{ratio:5.2f}{flag}")
+    regressions = sum(1 for r in rows if r[4])
+    print(f"{len(rows)} cases compared, {regressions} regressions")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+from typing import Dict, Any, Iterator
+import os, json, random, argparse, datetime as dtm
+
+SYSTEMS = ["Snowflake", "Matillion", "dbt", "Airflow", "S3 stage", "Snowpipe", "Python UDF"]
+OBJECTS = ["orders", "customers", "events", "invoices", "sessions", "inventory", "payments", "shipments"]
+PROBLEMS = [
+    ("load is failing", "COPY INTO fails with a file format error on the {obj} stage."),
+    ("job is slow", "The {sys} job for {obj} went from 5 to 40 minutes after the last deploy."),
+    ("duplicates after merge", "MERGE into {obj} leaves duplicate keys when late files arrive."),
+    ("permissions error", "Role cannot read {obj} in the reporting schema since the grant change."),
+    ("warehouse credits spike", "Credits for the {obj} pipeline tripled; the warehouse never suspends."),
+    ("schema drift", "A new column in the {obj} feed breaks the {sys} transformation."),
+    ("stream lag", "The stream on {obj} is hours behind and the task keeps skipping."),
+]
+UPDATES = [
+    "Reproduced in dev; looking at the query profile.",
+    "Checked the {sys} logs, error starts at the {obj} step.",
+    "Raised a ticket with the platform team.",
+    "Added a QUALIFY ROW_NUMBER() dedupe on {obj}.",
+    "Resized the warehouse to MEDIUM and set AUTO_SUSPEND = 60.",
+    "Re-granted USAGE and SELECT on the schema to the role.",
+    "Backfilled the last 3 days of {obj}.",
+    "Waiting on the source team to confirm the file layout.",
+    "Deployed the fix; monitoring the next runs.",
+]
+PEOPLE = ["You", "Asha", "Ben", "Chen", "Dana", "Eli"]
+TAGS = ["snowflake", "matillion", "dbt", "urgent", "backfill", "perf", "access", "ingest"]
+STATUS_WEIGHTS = [("Closed", 0.6), ("Open", 0.25), ("In Progress", 0.15)]
+
+
+def _iso(epoch: float) -> str:
+    return dtm.datetime.fromtimestamp(epoch, dtm.timezone.utc).isoformat()
+
+
+def generate(n: int, seed: int = 42, mean_activity: float = 4.0, days: int = 365,
+             now: float | None = None) -> Iterator[Dict[str,Any]]:
+    """Yield `n` tasks shaped like the app's own, deterministic for a given seed."""
+    rnd = random.Random(seed)
+    now = dtm.datetime.now(dtm.timezone.utc).timestamp() if now is None else now
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    p = 1.0 / (1.0 + mean_activity)
+    for i in range(1, n + 1):
+        sys_, obj = rnd.choice(SYSTEMS), rnd.choice(OBJECTS)
+        short, long = rnd.choice(PROBLEMS)
+        created = now - rnd.random() * days * 86400
+        status = rnd.choices(statuses, weights)[0]
+        t = {
+            "id": f"TASK-{i}",
+            "title": f"{sys_} {obj} {short}",
+            "description": long.format(sys=sys_, obj=obj),
+            "status": status,
+            "created_at": _iso(created),
+            "due_days": rnd.randint(3, 10),
+            "tags": rnd.sample(TAGS, rnd.randint(0, 3)),
+        }
+        at = created
+        acts = []
+        k = 0
+        while rnd.random() > p:     # geometric, mean ~mean_activity
+            k += 1
+            at = min(now, at + rnd.random() * 2 * 86400)
+            acts.append({"at": _iso(at), "who": rnd.choice(PEOPLE),
+                         "text": rnd.choice(UPDATES).format(sys=sys_, obj=obj)})
+        if status == "Closed":
+            at = min(now, at + rnd.random() * 86400)
+            acts.append({"at": _iso(at), "who": rnd.choice(PEOPLE), "text": "Status set to Closed. Fixed and verified."})
+            t["completed_at"] = _iso(at)
+        t["activity"] = acts
+        yield t
+
+
+def write_tasks_json(path: str, n: int, seed: int = 42, **kw) -> int:
+    """Stream a tasks.json (legacy layout, activity inline) without holding it in memory."""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    count = 0
+    with open(path, "w") as f:
+        f.write("[\n")
+        for t in generate(n, seed, **kw):
+            f.write((",\n" if count else "") + json.dumps(t))
+            count += 1
+        f.write("\n]")
+    return count
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic tasks.json.")
+    ap.add_argument("--tasks", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--activity", type=float, default=4.0, help="mean activity entries per task")
+    ap.add_argument("--out", default=os.path.join("data", "tasks.json"))
+    args = ap.parse_args(argv)
+    n = write_tasks_json(args.out, args.tasks, args.seed, mean_activity=args.activity)
+    print(f"wrote {n} tasks to {args.out}")
+
+if __name__ == "__main__":
+    main()
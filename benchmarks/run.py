@@ -0,0 +1,225 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Callable
+import os, sys, json, time, random, shutil, platform, argparse, tempfile, subprocess, threading, datetime as dtm
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GROUPS = ("task_manager", "ai", "pages")
+
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q * (len(sorted_ms) - 1))))]
+
+
+class Bench:
+    """Collects timings; each case runs `repeat` times or until `budget` seconds are spent.
+
+    `setup` runs untimed before every repetition.
+    """
+
+    def __init__(self, size: int, backend: str, budget: float = 2.0):
+        self.size = size
+        self.backend = backend
+        self.budget = budget
+        self.results: List[Dict[str,Any]] = []
+
+    def run(self, group: str, name: str, fn: Callable[[], Any], repeat: int = 20,
+            setup: Callable[[], Any] | None = None):
+        times = []
+        spent = 0.0
+        for _ in range(repeat):
+            if setup:
+                setup()
+            t = time.perf_counter()
+            fn()
+            dt = time.perf_counter() - t
+            times.append(dt * 1000)
+            spent += dt
+            if spent > self.budget:
+                break
+        s = sorted(times)
+        r = {"group": group, "name": name, "size": self.size, "backend": self.backend, "runs": len(s),
+             "mean_ms": sum(s) / len(s), "p50_ms": _pct(s, 0.5), "p95_ms": _pct(s, 0.95),
+             "min_ms": s[0], "max_ms": s[-1]}
+        self.results.append(r)
+        print(f"  {group:<12} {name:<32} p50 {r['p50_ms']:10.2f} ms  p95 {r['p95_ms']:10.2f} ms  ({r['runs']} runs)",
+              file=sys.stderr, flush=True)
+        return r
+
+
+# ---------- cases ----------
+
+def bench_task_manager(b: Bench, n: int, seed: int):
+    from services import task_manager as tm
+    from services.similar import similar_tasks
+    from services.ai_assistant import guidance_prompt
+    rnd = random.Random(seed)
+    pick = lambda: f"TASK-{rnd.randint(1, n)}"
+    g = "task_manager"
+
+    b.run(g, "list_tasks.cold", tm.list_tasks, repeat=1)      # opens the store (and migrates tasks.json)
+    b.run(g, "list_tasks", tm.list_tasks)
+    b.run(g, "get_task", lambda: tm.get_task(pick()), repeat=200)
+    b.run(g, "get_tasks.50", lambda: tm.get_tasks([pick() for _ in range(50)]))
+    b.run(g, "by_status.open", lambda: tm.by_status("open"))
+    b.run(g, "task_kpis.cold", tm.task_kpis, repeat=1)
+    b.run(g, "task_kpis", tm.task_kpis, repeat=200)
+    b.run(g, "overdue_tasks.50", lambda: tm.overdue_tasks(limit=50), repeat=200)
+    b.run(g, "query_tasks.page", lambda: tm.query_tasks(limit=25))
+    b.run(g, "query_tasks.filtered", lambda: tm.query_tasks(status=["Closed", "Completed"], tag="perf",
+                                                             text="warehouse", sort="oldest", offset=25, limit=25))
+    b.run(g, "list_tags", tm.list_tags)
+    b.run(g, "search_tasks.cold", lambda: tm.search_tasks("warehouse credits"), repeat=1)
+    b.run(g, "search_tasks", lambda: tm.search_tasks(rnd.choice(["merge duplicates", "copy into stage", "role grant"])))
+    b.run(g, "iter_activity.20", lambda: tm.iter_activity(pick(), limit=20), repeat=200)
+    b.run(g, "activity_count", lambda: tm.activity_count(pick()), repeat=200)
+    b.run(g, "similar_tasks.cold", lambda: similar_tasks(tm.get_task(pick())), repeat=1)
+    b.run(g, "similar_tasks", lambda: similar_tasks(tm.get_task(pick())))
+    b.run(g, "guidance_prompt", lambda: guidance_prompt(tm.get_task(pick()), "next steps?"))
+
+    b.run(g, "create_task", lambda: tm.create_task("Bench task", "created by the benchmark", ["bench"]))
+    b.run(g, "create_tasks.100", lambda: tm.create_tasks([{"title": f"Bench {i}", "description": "bulk"} for i in range(100)]),
+          repeat=5)
+    b.run(g, "set_status", lambda: tm.set_status(pick(), rnd.choice(["Open", "In Progress", "Closed"])))
+    b.run(g, "set_status_many.100", lambda: tm.set_status_many([pick() for _ in range(100)], "In Progress"), repeat=5)
+    b.run(g, "add_activity", lambda: tm.add_activity(pick(), "Bench", "Benchmark note about the warehouse."))
+    b.run(g, "add_activity_many.100",
+          lambda: tm.add_activity_many([(pick(), "Bench", "Bulk benchmark note.") for _ in range(100)]), repeat=5)
+    b.run(g, "list_tasks.after_write", tm.list_tasks, repeat=5,
+          setup=lambda: tm.set_status(pick(), "Open"))
+    victims = [t["id"] for t in tm.create_tasks([{"title": f"Doomed {i}", "description": ""} for i in range(20)])]
+    b.run(g, "delete_task", lambda: tm.delete_task(victims.pop()), repeat=len(victims))
+
+
+def bench_ai(b: Bench, latency: float):
+    from benchmarks.stub_server import StubServer
+    from services import ai_assistant as ai
+    g = "ai"
+    with StubServer(latency=latency) as stub:
+        os.environ["GROQ_API_URL"] = stub.url
+        ai._client = None
+        msg = lambda i: [{"role": "user", "content": f"How do I fix warehouse credits? #{i}"}]
+        counter = iter(range(10**9))
+        b.run(g, "groq_chat.uncached", lambda: ai.groq_chat(msg(next(counter)), use_cache=False), repeat=30)
+        ai.groq_chat(msg(-1))
+        b.run(g, "groq_chat.cached", lambda: ai.groq_chat(msg(-1)), repeat=200)
+        b.run(g, "groq_chat_stream", lambda: "".join(ai.groq_chat_stream(msg(next(counter)), use_cache=False)), repeat=30)
+
+        def parallel():
+            threads = [threading.Thread(target=lambda i=i: ai.groq_chat(msg(next(counter)), use_cache=False))
+                       for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        b.run(g, "groq_chat.parallel8", parallel, repeat=10)
+
+
+def bench_pages(b: Bench, n: int):
+    from streamlit.testing.v1 import AppTest
+    from services import task_manager as tm
+    g = "pages"
+    detail_id = max(range(1, min(n, 200) + 1), key=lambda i: tm.activity_count(f"TASK-{i}"))
+
+    def render(page: str, state: Dict[str,Any] | None = None):
+        at = AppTest.from_file(os.path.join(REPO, "pages", page), default_timeout=600)
+        for k, v in (state or {}).items():
+            at.session_state[k] = v
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].value}")
+
+    for page, state in (("1_Dashboard.py", None), ("2_All_Tasks.py", None),
+                        ("5_Task_Detail.py", {"selected_task_id": f"TASK-{detail_id}"})):
+        name = page[:-3]
+        b.run(g, name + ".cold", lambda: render(page, state), repeat=1)
+        b.run(g, name, lambda: render(page, state), repeat=5)
+
+
+# ---------- orchestration ----------
+
+def child(args) -> Dict[str,Any]:
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["GROQ_RPM"] = "0"
+    # A background archiving pass mid-run would skew timings; opt in explicitly.
+    os.environ.setdefault("TASKPILOT_ARCHIVE_DAYS", "0")
+    b = Bench(args.size, args.backend, args.budget)
+    groups = args.groups.split(",")
+    if "task_manager" in groups:
+        bench_task_manager(b, args.size, args.seed)
+    if "ai" in groups:
+        bench_ai(b, args.latency)
+    if "pages" in groups:
+        bench_pages(b, args.size)
+    return {"size": args.size, "backend": args.backend, "results": b.results}
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time task_manager ops, the chat client and page renders on synthetic data.")
+    ap.add_argument("--sizes", default="1000,10000", help="comma-separated task counts, e.g. 1000,10000,100000,1000000")
+    ap.add_argument("--backends", default="sqlite", help="comma-separated: sqlite,json,packed")
+    ap.add_argument("--groups", default=",".join(GROUPS))
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--activity", type=float, default=4.0, help="mean activity entries per task")
+    ap.add_argument("--latency", type=float, default=0.01, help="stub server latency (s)")
+    ap.add_argument("--budget", type=float, default=2.0, help="max seconds per case")
+    ap.add_argument("--out", default="benchmark-results.json")
+    ap.add_argument("--keep", action="store_true", help="keep the generated data directories")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    ap.add_argument("--backend", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        json.dump(child(args), sys.stdout)
+        return
+
+    from benchmarks.generate import write_tasks_json
+    runs = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        for backend in [s for s in args.backends.split(",") if s]:
+            # Fresh directory and process per run: module-level caches and the
+            # relative data/ paths all start cold.
+            work = tempfile.mkdtemp(prefix=f"taskpilot-bench-{size}-{backend}-")
+            try:
+                t = time.perf_counter()
+                write_tasks_json(os.path.join(work, "data", "tasks.json"), size, args.seed, mean_activity=args.activity)
+                print(f"[{size} tasks, {backend}] generated in {time.perf_counter() - t:.1f}s ({work})", file=sys.stderr)
+                env = dict(os.environ, TASKPILOT_STORE=backend,
+                           PYTHONPATH=os.pathsep.join(filter(None, [REPO, os.environ.get("PYTHONPATH")])))
+                cmd = [sys.executable, "-m", "benchmarks.run", "--child", "--size", str(size), "--backend", backend,
+                       "--groups", args.groups, "--seed", str(args.seed), "--latency", str(args.latency),
+                       "--budget", str(args.budget)]
+                p = subprocess.run(cmd, cwd=work, env=env, stdout=subprocess.PIPE, text=True)
+                if p.returncode != 0:
+                    raise SystemExit(f"benchmark run for {size} tasks ({backend}) failed")
+                runs.append(json.loads(p.stdout))
+            finally:
+                if not args.keep:
+                    shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": dtm.datetime.now(dtm.timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "activity": args.activity,
+            "latency": args.latency,
+        },
+        "runs": runs,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
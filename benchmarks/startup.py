@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import List, Dict, Any
+import os, re, sys, json, time, shutil, platform, argparse, tempfile, subprocess, datetime as dtm
+from benchmarks.run import REPO, _pct, _git_rev
+from benchmarks.compare import compare
+
+# Cold start per page: each sample is a fresh interpreter that imports
+# Streamlit's test harness, then renders one page once under
+# `python -X importtime`. A sample reports the first render's wall time and
+# the imports that render triggered, which is what a newly scaled-out
+# container pays before first paint.
+
+PAGES = ("app.py", "1_Dashboard.py", "2_All_Tasks.py", "3_Open_Tasks.py", "4_Closed_Tasks.py",
+         "5_Task_Detail.py", "6_Knowledge_Base.py", "7_Development.py")
+STATE = {"5_Task_Detail.py": {"selected_task_id": "TASK-1"}}
+MARK = "--- taskpilot page start ---"
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _child(page: str):
+    from streamlit.testing.v1 import AppTest
+    path = os.path.join(REPO, page if page == "app.py" else os.path.join("pages", page))
+    at = AppTest.from_file(path, default_timeout=600)
+    for k, v in STATE.get(page, {}).items():
+        at.session_state[k] = v
+    print(MARK, file=sys.stderr, flush=True)
+    t = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - t) * 1000
+    if at.exception:
+        raise SystemExit(f"{page}: {at.exception[0].value}")
+    json.dump({"render_ms": ms}, sys.stdout)
+
+
+def _imports(stderr: str) -> List[Dict[str,Any]]:
+    """Top-level imports made while the page rendered, costliest first."""
+    _, _, after = stderr.partition(MARK)
+    out = []
+    for line in after.splitlines():
+        m = _LINE.match(line)
+        # importtime indents nested imports by two spaces per level.
+        if m and len(m.group(3)) <= 1:
+            out.append({"module": m.group(4), "self_us": int(m.group(1)), "cumulative_us": int(m.group(2))})
+    return sorted(out, key=lambda r: -r["cumulative_us"])
+
+
+def sample(page: str, work: str) -> Dict[str,Any]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO, os.environ.get("PYTHONPATH")])))
+    env.setdefault("TASKPILOT_ARCHIVE_DAYS", "0")
+    cmd = [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--child", page]
+    p = subprocess.run(cmd, cwd=work, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise SystemExit(f"{page} failed to start:\n{p.stderr[-2000:]}")
+    imports = _imports(p.stderr)
+    return {"render_ms": json.loads(p.stdout)["render_ms"], "imports": imports,
+            "import_ms": sum(r["cumulative_us"] for r in imports) / 1000}
+
+
+def _case(page: str, name: str, ms: List[float], size: int) -> Dict[str,Any]:
+    s = sorted(ms)
+    return {"group": "startup", "name": f"{page[:-3]}.{name}", "size": size, "backend": "startup", "runs": len(s),
+            "mean_ms": sum(s) / len(s), "p50_ms": _pct(s, 0.5), "p95_ms": _pct(s, 0.95), "min_ms": s[0], "max_ms": s[-1]}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time each page's cold start in fresh processes; exit 1 on regressions.")
+    ap.add_argument("--pages", default=",".join(PAGES))
+    ap.add_argument("--size", type=int, default=1000, help="tasks in the generated store")
+    ap.add_argument("--repeat", type=int, default=3, help="fresh processes per page")
+    ap.add_argument("--top", type=int, default=10, help="imports listed per page")
+    ap.add_argument("--out", default="startup-results.json")
+    ap.add_argument("--baseline", help="earlier --out file; exit 1 if a page's p50 regressed against it")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown, as a fraction")
+    ap.add_argument("--floor-ms", type=float, default=20.0, help="ignore slowdowns smaller than this")
+    ap.add_argument("--max-ms", type=float, help="exit 1 if any page's cold render p50 exceeds this")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return
+
+    from benchmarks.generate import write_tasks_json
+    work = tempfile.mkdtemp(prefix="taskpilot-startup-")
+    results, imports = [], {}
+    try:
+        write_tasks_json(os.path.join(work, "data", "tasks.json"), args.size, 42)
+        sample("app.py", work)      # migrate tasks.json once so no page pays for it
+        for page in [p for p in args.pages.split(",") if p]:
+            runs = [sample(page, work) for _ in range(args.repeat)]
+            results.append(_case(page, "cold", [r["render_ms"] for r in runs], args.size))
+            results.append(_case(page, "imports", [r["import_ms"] for r in runs], args.size))
+            imports[page] = runs[-1]["imports"][:args.top]
+            r = results[-2]
+            print(f"{page:<22} cold p50 {r['p50_ms']:8.1f} ms   imports {results[-1]['p50_ms']:8.1f} ms", file=sys.stderr)
+            for m in imports[page]:
+                print(f"    {m['cumulative_us'] / 1000:8.1f} ms  {m['module']}", file=sys.stderr)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": dtm.datetime.now(dtm.timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "size": args.size,
+        },
+        "runs": [{"size": args.size, "backend": "startup", "results": results}],
+        "imports": imports,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+    failed = 0
+    if args.max_ms is not None:
+        for r in results:
+            if r["name"].endswith(".cold") and r["p50_ms"] > args.max_ms:
+                print(f"{r['name']}: {r['p50_ms']:.1f} ms over the {args.max_ms:g} ms budget", file=sys.stderr)
+                failed += 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        for (_, _, _, name), old, cur, ratio, bad in compare(base, report, args.threshold, args.floor_ms):
+            if bad:
+                print(f"{name}: {old:.1f} -> {cur:.1f} ms (x{ratio:.2f})  REGRESSION", file=sys.stderr)
+                failed += 1
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json, time, threading, argparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True    # headers and body go out as separate writes
+    latency = 0.0
+    tokens = ["Check", " the", " query", " profile", " first", "."]
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for tok in self.tokens:
+                self._chunk(("data: " + json.dumps({"choices": [{"delta": {"content": tok}}]}) + "\n\n").encode())
+            self._chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        out = json.dumps({"choices": [{"message": {"content": "".join(self.tokens)}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+class StubServer:
+    """OpenAI-compatible chat endpoint on localhost; answers after `latency` seconds."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        handler = type("Handler", (_Handler,), {"latency": latency})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/chat/completions"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve a stand-in chat-completions API (point GROQ_API_URL at it).")
+    ap.add_argument("--port", type=int, default=8808)
+    ap.add_argument("--latency", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    with StubServer(args.port, args.latency) as s:
+        print(f"listening on {s.url}")
+        s._thread.join()
+
+if __name__ == "__main__":
+    main()
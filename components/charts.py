@@ -1,25 +1,24 @@
 import streamlit as st
-import pandas as pd
-from services.task_manager import list_tasks
-from services.utils import pct_complete
+from services.task_manager import list_tasks, task_kpis
+from services.temporal import task_times
 
 def dashboard_kpis():
+    kpis = task_kpis()
     tasks = list_tasks()
-    total = len(tasks)
-    open_ = len([t for t in tasks if t["status"].lower().startswith("open")])
-    progress = round(pd.Series([pct_complete(t["created_at"], t.get("due_days",5)) for t in tasks]).mean() if tasks else 0, 1)
+    progress = round(float(task_times(tasks)["progress"].mean()) if tasks else 0, 1)
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Tasks", total)
-    col2.metric("Open", open_)
-    col3.metric("Closed", total - open_)
+    col1.metric("Total Tasks", kpis["total"])
+    col2.metric("Open", kpis["open"])
+    col3.metric("Closed", kpis["closed"])
     col4.metric("Avg Progress %", progress)
 
 def timeline_chart():
+    import pandas as pd  # only this chart needs it; keep it off every page's import path
     tasks = list_tasks()
-    df = pd.DataFrame([{
-        "Task": t["title"],
-        "Progress": pct_complete(t["created_at"], t.get("due_days",5))
-    } for t in tasks])
+    df = pd.DataFrame({
+        "Task": [t["title"] for t in tasks],
+        "Progress": task_times(tasks)["progress"],
+    })
     if df.empty:
         st.info("No tasks yet.")
         return
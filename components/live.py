@@ -0,0 +1,35 @@
+import os
+import streamlit as st
+from services import changes
+
+# Seconds between checks; each check is a fragment run and a websocket round
+# trip per open page, so keep it to a few seconds. 0 turns polling off.
+REFRESH_SECONDS = float(os.getenv("TASKPILOT_LIVE_REFRESH", "3") or 0)
+
+def live_updates(key: str, every: float = REFRESH_SECONDS):
+    """Rerun this page within `every` seconds of any session or process writing tasks.
+
+    Call it before the page reads any data. Every open page runs a small
+    fragment on that interval, even when nothing changed; the fragment itself
+    only compares the session's version with the process watcher's.
+    """
+    w = changes.watcher()
+    seen = f"_live_seen_{key}"
+    st.session_state[seen] = w.version
+    if every <= 0:
+        return
+
+    @st.fragment(run_every=every)
+    def _poll():
+        if w.version != st.session_state.get(seen):
+            st.rerun()
+    _poll()
+
+
+def live_view(key: str, load, keep) -> changes.LiveView:
+    """This session's LiveView under `key`, brought up to date."""
+    view = st.session_state.get(key)
+    if not isinstance(view, changes.LiveView):
+        view = st.session_state[key] = changes.LiveView(load, keep)
+    view.refresh()
+    return view
@@ -1,9 +1,14 @@
 import streamlit as st
-import datetime as dtm
-from services.task_manager import list_tasks, create_task
+from services.task_manager import create_task, task_kpis, overdue_tasks
+from services.ai_assistant import submit_overdue_guidance, batch_status, latest_guidance
 from services.utils import to_local  # only dependency we assume exists
+from services import perf
+from components.live import live_updates
+
+perf.page_begin("Dashboard")
 
 st.set_page_config(page_title="TaskPilot AI • Dashboard", layout="wide", initial_sidebar_state="expanded")
+live_updates("dashboard")
 
 # --------- header + create form ----------
 h1, h2 = st.columns([6,2])
@@ -23,51 +28,21 @@ with h2:
                     st.success(f"Task {t.get('id','')} created")
                     st.rerun()
 
-# --------- load tasks ----------
+# --------- KPIs ----------
+# Counts come from the service's materialized aggregates (kept current on
+# every create/status change/delete), not from a pass over every task.
+OVERDUE_SHOWN = 50
 try:
-    tasks = list_tasks() or []
+    kpis = task_kpis()
+    overdue = overdue_tasks(limit=OVERDUE_SHOWN)
 except Exception:
-    tasks = []
-
-# --------- small, inline age calc (self-contained) ----------
-def age_days_safe(iso_str) -> int:
-    try:
-        if not iso_str:
-            return 0
-        s = str(iso_str).strip()
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        try:
-            d = dtm.datetime.fromisoformat(s)
-        except Exception:
-            try:
-                d = dtm.datetime.strptime(str(iso_str), "%Y-%m-%d").replace(tzinfo=dtm.timezone.utc)
-            except Exception:
-                return 0
-        if d.tzinfo is None:
-            d = d.replace(tzinfo=dtm.timezone.utc)
-        now = dtm.datetime.now(dtm.timezone.utc)
-        return max(0, int((now - d).total_seconds() // 86400))
-    except Exception:
-        return 0
+    kpis = {"open": 0, "closed": 0, "overdue": 0, "nearing": 0}
+    overdue = []
 
-# --------- KPIs ----------
-open_cnt = 0
-closed_cnt = 0
-overdue_cnt = 0
-nearing_cnt = 0
-
-for t in tasks:
-    status = (t.get("status") or "").strip()
-    days = age_days_safe(t.get("created_at"))
-    if status in ("Closed", "Completed"):
-        closed_cnt += 1
-    else:
-        open_cnt += 1
-        if days > 5:
-            overdue_cnt += 1
-        elif 3 <= days <= 5:
-            nearing_cnt += 1
+open_cnt = kpis["open"]
+closed_cnt = kpis["closed"]
+overdue_cnt = kpis["overdue"]
+nearing_cnt = kpis["nearing"]
 
 def kpi_card(title, value, subtitle, icon=None):
     with st.container(border=True):
@@ -89,20 +64,38 @@ with c4: kpi_card("Closed Tasks", closed_cnt, "Total tasks completed", "✅")
 with st.container(border=True):
     st.markdown("**Priority: Overdue Tasks**")
     st.caption("These tasks are over 5 days old and require immediate attention.")
-    any_overdue = False
-    for t in tasks:
+    if overdue_cnt:
+        if st.button("Suggest next steps for all overdue tasks", key="dash_ai_batch"):
+            st.session_state["dash_ai_batch_id"] = submit_overdue_guidance()
+        batch_id = st.session_state.get("dash_ai_batch_id")
+        if batch_id:
+            @st.fragment(run_every=2.0)
+            def batch_progress():
+                b = batch_status(batch_id)
+                finished = b["done"] + b["error"]
+                if b["total"] and finished >= b["total"]:
+                    st.session_state.pop("dash_ai_batch_id", None)
+                    st.rerun()
+                st.progress(finished / b["total"] if b["total"] else 1.0,
+                            text=f"AI triage: {finished} of {b['total']} overdue tasks ({b['error']} failed)")
+            batch_progress()
+    for t in overdue:
         status = (t.get("status") or "").strip()
-        if status in ("Closed", "Completed"):
-            continue
-        if age_days_safe(t.get("created_at")) > 5:
-            any_overdue = True
-            try:
-                created_disp = to_local(str(t.get("created_at") or ""))
-            except Exception:
-                created_disp = "-"
-            st.markdown(f"- {t.get('title','Untitled')} • {status or 'Open'} • Created {created_disp}")
-            if st.button("Open", key=f"tp_open_{t.get('id', id(t))}"):
-                st.experimental_set_query_params(task=t.get("id",""))
-                st.switch_page("pages/5_Task_Detail.py")
-    if not any_overdue:
-        st.markdown("<div style='padding:24px;text-align:center;color:#9aa4b2'>No overdue tasks. Great job!</div>", unsafe_allow_html=True)
\ No newline at end of file
+        try:
+            created_disp = to_local(str(t.get("created_at") or ""))
+        except Exception:
+            created_disp = "-"
+        st.markdown(f"- {t.get('title','Untitled')} • {status or 'Open'} • Created {created_disp}")
+        job = latest_guidance(t.get("id", ""))
+        if job is not None and job.status == "done":
+            with st.expander("Suggested next steps"):
+                st.write(job.result)
+        if st.button("Open", key=f"tp_open_{t.get('id', id(t))}"):
+            st.experimental_set_query_params(task=t.get("id",""))
+            st.switch_page("pages/5_Task_Detail.py")
+    if overdue_cnt > len(overdue):
+        st.caption(f"Showing the {len(overdue)} oldest of {overdue_cnt} overdue tasks.")
+    if not overdue:
+        st.markdown("<div style='padding:24px;text-align:center;color:#9aa4b2'>No overdue tasks. Great job!</div>", unsafe_allow_html=True)
+
+perf.page_end()
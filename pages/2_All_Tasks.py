@@ -1,9 +1,13 @@
 import streamlit as st
-import datetime as dtm
-from services.task_manager import list_tasks, create_task
-from services.utils import to_local
+from services.task_manager import create_task, query_tasks, list_tags, search_tasks
+from services.temporal import task_times
+from services import perf
+from components.live import live_updates
+
+perf.page_begin("All Tasks")
 
 st.set_page_config(page_title="TaskPilot AI • All Tasks", layout="wide", initial_sidebar_state="expanded")
+live_updates("all_tasks")
 
 # Header with Create Task
 h1, h2 = st.columns([6,2])
@@ -24,25 +28,7 @@ with h2:
                     st.success(f"Task {t.get('id','')} created")
                     st.rerun()
 
-def age_days(created_at_iso: str) -> int:
-    try:
-        if not created_at_iso:
-            return 0
-        s = str(created_at_iso).strip()
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        try:
-            d = dtm.datetime.fromisoformat(s)
-        except Exception:
-            d = dtm.datetime.strptime(str(created_at_iso), "%Y-%m-%d").replace(tzinfo=dtm.timezone.utc)
-        if d.tzinfo is None:
-            d = d.replace(tzinfo=dtm.timezone.utc)
-        return max(0, (dtm.datetime.now(dtm.timezone.utc) - d).days)
-    except Exception:
-        return 0
-
-def urgency_bar(created_at_iso: str, status: str):
-    days = age_days(created_at_iso)
+def urgency_bar(days: int):
     seg1 = min(2, max(0, days))
     seg2 = min(2, max(0, days - 2))
     seg3 = min(1, max(0, days - 4))
@@ -73,10 +59,68 @@ def status_pill(status: str):
         unsafe_allow_html=True
     )
 
+# --------- filters / sort / paging ----------
+# Only the visible page is fetched from the store and rendered.
+STATUS_FILTERS = {"All": None, "Open": "Open", "In Progress": "In Progress", "Closed": ["Closed", "Completed"]}
+SORT_LABELS = {"Newest first": "newest", "Oldest first": "oldest", "Title": "title", "Status": "status"}
+
+f1, f2, f3, f4, f5 = st.columns([3,2,2,2,1])
+text_q = f1.text_input("Search", placeholder="Search titles, descriptions and activity", key="at_text")
+status_sel = f2.selectbox("Status", list(STATUS_FILTERS), key="at_status")
+try:
+    tag_options = ["All"] + list_tags()
+except Exception:
+    tag_options = ["All"]
+tag_sel = f3.selectbox("Tag", tag_options, key="at_tag")
+sort_sel = f4.selectbox("Sort", list(SORT_LABELS), key="at_sort")
+page_size = f5.selectbox("Per page", [25, 50, 100], key="at_page_size")
+
+filters = (text_q, status_sel, tag_sel, sort_sel, page_size)
+if st.session_state.get("at_filters") != filters:
+    st.session_state["at_filters"] = filters
+    st.session_state["at_page"] = 0
+page = st.session_state.get("at_page", 0)
+
+SEARCH_LIMIT = 500
+status_f = STATUS_FILTERS[status_sel]
+tag_f = None if tag_sel == "All" else tag_sel
 try:
-    tasks = list_tasks() or []
+    if (text_q or "").strip():
+        # Ranked search results (best match first); status/tag still apply.
+        wanted = None if status_f is None else {s.lower() for s in ([status_f] if isinstance(status_f, str) else status_f)}
+        hits = [t for t in search_tasks(text_q.strip(), limit=SEARCH_LIMIT)
+                if (wanted is None or (t.get("status") or "").lower() in wanted)
+                and (tag_f is None or tag_f in (t.get("tags") or ()))]
+        total = len(hits)
+        tasks = hits[page * page_size:(page + 1) * page_size]
+    else:
+        tasks, total = query_tasks(
+            status=status_f,
+            tag=tag_f,
+            sort=SORT_LABELS[sort_sel],
+            offset=page * page_size,
+            limit=page_size,
+        )
 except Exception:
-    tasks = []
+    tasks, total = [], 0
+if not tasks and page > 0:
+    # Filtered set shrank under us (e.g. after deletes); start over.
+    st.session_state["at_page"] = 0
+    st.rerun()
+
+pages = max(1, -(-total // page_size))
+
+def pager(where: str):
+    p1, p2, p3 = st.columns([1,4,1])
+    if p1.button("← Prev", key=f"at_prev_{where}", disabled=page <= 0):
+        st.session_state["at_page"] = page - 1
+        st.rerun()
+    p2.caption(f"Page {page + 1} of {pages} • {total} tasks")
+    if p3.button("Next →", key=f"at_next_{where}", disabled=page + 1 >= pages):
+        st.session_state["at_page"] = page + 1
+        st.rerun()
+
+pager("top")
 
 with st.container(border=True):
     c = st.columns([3,2,3,2,2])
@@ -86,13 +130,13 @@ with st.container(border=True):
     c[3].markdown("**Created**")
     c[4].markdown("**Completed**")
 
-for t in tasks:
+# Ages and display dates for the whole page in one pass.
+times = task_times(tasks)
+for t, days, created_disp, completed_disp in zip(tasks, times["age_days"], times["created_local"], times["completed_local"]):
     with st.container(border=True):
         c1, c2, c3, c4, c5 = st.columns([3,2,3,2,2])
         title = t.get("title","Untitled")
         desc = (t.get("description") or "")[:80]
-        created = t.get("created_at")
-        completed = t.get("completed_at")
         status = t.get("status","Open")
         tid = t.get("id","")
 
@@ -105,10 +149,13 @@ for t in tasks:
         with c2:
             status_pill(status)
         with c3:
-            urgency_bar(created, status)
+            urgency_bar(int(days))
         with c4:
-            try: st.markdown(to_local(created))
-            except Exception: st.markdown("-")
+            st.markdown(created_disp)
         with c5:
-            try: st.markdown(to_local(completed) if completed else "-")
-            except Exception: st.markdown("-")
\ No newline at end of file
+            st.markdown(completed_disp)
+
+if total > page_size:
+    pager("bottom")
+
+perf.page_end()
@@ -1,7 +1,17 @@
 import streamlit as st
 from services.task_manager import by_status
 from components.task_card import task_card
+from components.live import live_updates, live_view
+from services import perf
+
+perf.page_begin("Open Tasks")
 
 st.title("Open Tasks")
-for t in by_status("Open"):
-    task_card(t, on_open=lambda tid=t["id"]: st.experimental_set_query_params(task=tid) or st.switch_page("pages/5_Task_Detail.py"))
\ No newline at end of file
+live_updates("open_tasks")
+# This session's list is patched with just the tasks the change feed names.
+view = live_view("live_open_tasks", lambda: by_status("Open"),
+                 lambda t: (t.get("status") or "").lower().startswith("open"))
+for t in view.tasks():
+    task_card(t, on_open=lambda tid=t["id"]: st.experimental_set_query_params(task=tid) or st.switch_page("pages/5_Task_Detail.py"))
+
+perf.page_end()
@@ -1,7 +1,21 @@
 import streamlit as st
-from services.task_manager import by_status
+from services.task_manager import by_status, archived_count
 from components.task_card import task_card
+from components.live import live_updates, live_view
+from services import perf
+
+perf.page_begin("Closed Tasks")
 
 st.title("Closed Tasks")
-for t in by_status("Closed"):
-    task_card(t, on_open=lambda tid=t["id"]: st.experimental_set_query_params(task=tid) or st.switch_page("pages/5_Task_Detail.py"))
\ No newline at end of file
+archived = archived_count()
+if archived:
+    st.caption(f"{archived} long-closed tasks are archived and not listed here; "
+               "search and task links still find them.")
+live_updates("closed_tasks")
+# This session's list is patched with just the tasks the change feed names.
+view = live_view("live_closed_tasks", lambda: by_status("Closed"),
+                 lambda t: (t.get("status") or "").lower().startswith("closed"))
+for t in view.tasks():
+    task_card(t, on_open=lambda tid=t["id"]: st.experimental_set_query_params(task=tid) or st.switch_page("pages/5_Task_Detail.py"))
+
+perf.page_end()
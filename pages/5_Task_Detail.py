@@ -1,7 +1,11 @@
 import streamlit as st
-from services.task_manager import get_task, add_activity, set_status, delete_task
+from services.task_manager import get_task, add_activity, set_status, delete_task, iter_activity, activity_count
 from services.utils import to_local
-from services.ai_assistant import groq_chat
+from services import kb, changes
+from services.ai_assistant import SIMILAR_IN_PROMPT, KB_IN_PROMPT, kb_query, groq_chat_stream, chat_prompt, submit_guidance, get_job, latest_guidance
+from services import perf
+
+perf.page_begin("Task Detail")
 
 st.set_page_config(page_title="TaskPilot AI • Task", layout="wide", initial_sidebar_state="expanded")
 
@@ -26,6 +30,29 @@ with top_right:
         st.session_state.pop("selected_task_id", None)
         st.switch_page("pages/2_All_Tasks.py")
 
+def related(task):
+    """Similar tasks (None while the index is still being built) and runbook sections.
+
+    Kept per session and recomputed only after a task write or a KB ingest,
+    not on every rerun.
+    """
+    key = (task["id"], changes.watcher().version, kb.version())
+    hit = st.session_state.get("td_related")
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    runbooks = kb.search(kb_query(task), k=KB_IN_PROMPT)
+    # Imported here so the page itself doesn't pay for NumPy and the index module.
+    from services import similar as similar_index
+    if not similar_index.ready():
+        # The first lookup would embed every closed task; do that off the page.
+        similar_index.warm()
+        return None, runbooks
+    found = similar_index.similar_tasks(task, k=5), runbooks
+    st.session_state["td_related"] = (key, found)
+    return found
+
+similar, runbooks = related(task)
+
 left, right = st.columns([2,1])
 
 with left:
@@ -35,10 +62,20 @@ with left:
 
     with st.container(border=True):
         st.subheader("Activity")
-        acts = list(reversed(task.get("activity", [])))
+        # Newest page first; "Load older" pulls the next page on demand.
+        ACT_PAGE = 20
+        pages_key = f"td_act_pages_{task['id']}"
+        shown = st.session_state.get(pages_key, 1) * ACT_PAGE
+        acts = iter_activity(task["id"], limit=shown)
         if acts:
             for a in acts:
                 st.markdown(f"- {to_local(a['at'])} — **{a['who']}**: {a['text']}")
+            total = activity_count(task["id"])
+            if total > len(acts):
+                st.caption(f"Showing {len(acts)} of {total} updates.")
+                if st.button("Load older", key="td_act_older"):
+                    st.session_state[pages_key] = st.session_state.get(pages_key, 1) + 1
+                    st.rerun()
         else:
             st.caption("No updates yet.")
 
@@ -53,27 +90,11 @@ with left:
 
     with st.container(border=True):
         st.subheader("AI Chat")
-        st.caption("Ask questions about this task; AI uses recent activity as context.")
-        history_lines = [f"{a['who']}: {a['text']}" for a in task.get("activity", [])]
-        history = "
-".join(history_lines[-10:])
+        st.caption("Ask questions about this task; AI uses its recent activity and a summary of older updates as context.")
         user_q = st.text_area("Message", placeholder="e.g., What was the last update on this task?")
         if st.button("Send", key="td_ai_chat"):
-            parts = [
-                "You are an assistant for data engineering tasks, specialized in Snowflake, Matillion, SQL, and Python.",
-                "Answer concisely with steps and relevant SQL/examples.",
-                "",
-                f"Task Title: {task['title']}",
-                f"Task Description: {task.get('description','')}",
-                "Recent Activity:",
-                history,
-                "",
-                f"User Question: {user_q}",
-            ]
-            prompt = "
-".join(parts)
-            answer = groq_chat([{"role":"user","content": prompt}])
-            st.write(answer)
+            prompt = chat_prompt(task, user_q, similar=(similar or [])[:SIMILAR_IN_PROMPT])
+            st.write_stream(groq_chat_stream([{"role":"user","content": prompt}], task_id=task["id"]))
 
 with right:
     with st.container(border=True):
@@ -97,26 +118,69 @@ with right:
             add_activity(task["id"], "You", msg)
             st.rerun()
 
+    with st.container(border=True):
+        st.subheader("Similar past tasks")
+        if similar is None:
+            st.caption("Indexing closed tasks…")
+            @st.fragment(run_every=1.0)
+            def poll_index():
+                from services import similar as similar_index
+                if similar_index.ready():
+                    st.rerun()
+            poll_index()
+        elif not similar:
+            st.caption("No closed task looks like this one yet.")
+        for s in similar or []:
+            c1, c2 = st.columns([4,1])
+            with c1:
+                st.markdown(f"**{s['title']}**")
+                st.caption(f"{s['id']} • {s['status']} • match {s['score']:.0%}")
+                if s["resolution"]:
+                    st.caption(s["resolution"][:200])
+            with c2:
+                if st.button("Open", key=f"td_sim_{s['id']}"):
+                    st.session_state["selected_task_id"] = s["id"]
+                    st.rerun()
+
+    if runbooks:
+        with st.container(border=True):
+            st.subheader("Related runbooks")
+            for ch in runbooks:
+                st.markdown(f"**{ch['title']}**" + (f" › {ch['heading']}" if ch["heading"] else ""))
+                st.caption((ch["url"] or ch["path"]) + " • " + " ".join(ch["text"].split())[:200])
+
     with st.container(border=True):
         st.subheader("AI-Powered Guidance")
         st.caption("Guidance for Snowflake/Matillion/SQL/Python using this task's context.")
         guide_q = st.text_area("Question", placeholder="e.g., How to backtrack changes in Snowflake for this table?")
+        job_key = f"td_job_{task['id']}"
         if st.button("Get Suggestion", key="td_ai_suggest"):
-            act_lines = [f"- {a['who']}: {a['text']}" for a in task.get("activity", [])]
-            recent = "
-".join(act_lines[-10:])
-            parts = [
-                "Act as a senior data engineer specialized in Snowflake and Matillion.",
-                "Given the task details and recent activity, propose next steps with SQL and Matillion job hints.",
-                "",
-                f"Task: {task['title']}",
-                f"Description: {task.get('description','')}",
-                "Recent Activity:",
-                recent,
-                "",
-                f"Question: {guide_q}",
-            ]
-            prompt = "
-".join(parts)
-            answer = groq_chat([{"role":"user","content": prompt}])
-            st.write(answer)
\ No newline at end of file
+            # Runs in the background; the answer survives reruns and other clicks.
+            st.session_state[job_key] = submit_guidance(task["id"], guide_q).id
+
+        job = get_job(st.session_state[job_key]) if job_key in st.session_state else latest_guidance(task["id"])
+
+        def show_job(job):
+            if job.status == "done":
+                st.write(job.result)
+            elif job.status == "error":
+                st.error(job.error)
+            else:
+                st.info("Working on a suggestion…")
+
+        if job is not None:
+            if job.finished:
+                show_job(job)
+            else:
+                @st.fragment(run_every=1.0)
+                def poll_job(job_id=job.id):
+                    j = get_job(job_id)
+                    if j is None:
+                        return
+                    if j.finished:
+                        # Full rerun so the finished answer renders without polling.
+                        st.rerun()
+                    show_job(j)
+                poll_job()
+
+perf.page_end()
@@ -1,11 +1,45 @@
 import streamlit as st
+from services import perf, kb
+
+perf.page_begin("Knowledge Base")
 
 st.title("Knowledge Base")
+base = kb.get_kb()
+stats = base.stats()
+st.caption(f"{stats['docs']} documents ({stats['duplicates']} duplicate URLs) • {stats['chunks']} chunks • {stats['links']} links")
+
+query = st.text_input("Search runbooks", placeholder="e.g. Snowpipe stopped loading files")
+if query.strip():
+    hits = base.search(query, k=8)
+    if not hits:
+        st.caption("No matching runbook sections.")
+    for ch in hits:
+        with st.container(border=True):
+            st.markdown(f"**{ch['title']}**" + (f" › {ch['heading']}" if ch["heading"] else ""))
+            st.caption(ch["url"] or ch["path"])
+            st.write(ch["text"])
+
+with st.expander("Ingest documents"):
+    # Only the configured docs folder: a path typed into the page could index
+    # any file the server can read. Other folders go through the CLI.
+    st.caption(f"Markdown, HTML and text files under `{kb.DOCS_DIR}` (TASKPILOT_KB_DIR) are chunked and indexed; "
+               "unchanged files are skipped. Use `python -m services.kb ingest <folder>` for other folders.")
+    if st.button("Ingest"):
+        with st.spinner("Indexing…"):
+            done = base.ingest(kb.DOCS_DIR)
+        st.success(", ".join(f"{k.replace('_', ' ')}: {v}" for k, v in sorted(done.items())) or "Nothing to do.")
+
+st.subheader("Links")
 st.info("Add links to Snowflake and Matillion docs you reference often. Paste URLs and short notes.")
-links = st.session_state.setdefault("kb_links", [])
 new = st.text_input("Add doc URL")
 note = st.text_input("Short note")
 if st.button("Add"):
-    links.append((new, note))
-for url, n in links:
-    st.markdown(f"- [{n or url}]({url})")
\ No newline at end of file
+    try:
+        if not base.add_link(new, note):
+            st.warning("That link is already saved.")
+    except ValueError:
+        st.warning("Please paste a URL first.")
+for link in base.links():
+    st.markdown(f"- [{link['note'] or link['href']}]({link['href']})")
+
+perf.page_end()
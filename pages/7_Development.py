@@ -0,0 +1,65 @@
+import streamlit as st
+import datetime as dtm
+from services import perf
+from services.task_manager import cache_stats
+
+perf.page_begin("Development")
+
+st.set_page_config(page_title="TaskPilot AI • Development", layout="wide", initial_sidebar_state="expanded")
+
+st.markdown("## Performance")
+st.caption("Latency of service calls, Groq requests and page runs in this server process (last "
+           f"{perf.BUFFER} spans), plus store and cache counters.")
+
+c1, c2, c3, c4 = st.columns([3,2,2,2])
+with c1:
+    prefix = st.selectbox("Show", ["All", "task_manager.", "ai_assistant.", "page."], key="dev_prefix")
+with c2:
+    profile = st.toggle("Profile page runs (cProfile)", value=perf.PROFILE, key="dev_profile",
+                        help="Applies to every session on this server while on; adds noticeable overhead.")
+    if profile != perf.PROFILE:
+        perf.set_profiling(profile)
+with c3:
+    st.download_button("Export spans (JSONL)", perf.export_jsonl(), file_name="taskpilot-spans.jsonl",
+                       mime="application/x-ndjson", key="dev_export")
+with c4:
+    if st.button("Reset", key="dev_reset"):
+        perf.reset()
+        st.rerun()
+
+rows = perf.summary("" if prefix == "All" else prefix)
+with st.container(border=True):
+    st.subheader("Latency by operation")
+    if rows:
+        st.dataframe(
+            [{"Operation": r["name"], "Calls": r["count"], "p50 ms": round(r["p50_ms"], 2),
+              "p95 ms": round(r["p95_ms"], 2), "Max ms": round(r["max_ms"], 2),
+              "Total ms": round(r["total_ms"], 1)} for r in rows],
+            use_container_width=True, hide_index=True,
+        )
+    else:
+        st.info("Nothing recorded yet. Use the app for a bit, then come back.")
+
+left, right = st.columns(2)
+with left:
+    with st.container(border=True):
+        st.subheader("Counters")
+        counters = perf.counters()
+        snap = cache_stats()
+        counters["cache.snapshot.tasks"] = snap["tasks"]
+        st.dataframe([{"Counter": k, "Value": v} for k, v in sorted(counters.items())],
+                     use_container_width=True, hide_index=True)
+
+with right:
+    with st.container(border=True):
+        st.subheader("Profiles")
+        profiles = perf.profiles()
+        if not profiles:
+            st.caption("Turn on profiling and rerun a page to capture one.")
+        else:
+            labels = [f"{p['page']} • {dtm.datetime.fromtimestamp(p['at']).strftime('%H:%M:%S')} • {p['ms']:.0f} ms"
+                      for p in reversed(profiles)]
+            pick = st.selectbox("Run", range(len(labels)), format_func=lambda i: labels[i], key="dev_profile_pick")
+            st.code(list(reversed(profiles))[pick]["stats"], language="text")
+
+perf.page_end()
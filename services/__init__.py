@@ -1,3 +1,21 @@
-from .task_manager import (
-    list_tasks, get_task, create_task, set_status, add_activity, by_status
-)
\ No newline at end of file
+from __future__ import annotations
+import importlib
+
+# Names re-exported from task_manager. They resolve on first access (PEP 562),
+# so `from services import perf` on a page that never reads tasks does not pay
+# for the store, NumPy or the snapshot. Derived per-task state (context,
+# similar, changes) subscribes when task_manager sends its first event.
+_TASK_MANAGER = (
+    "list_tasks", "get_task", "create_task", "set_status", "add_activity", "by_status", "cache_stats",
+    "get_tasks", "iter_activity", "activity_count", "create_tasks", "set_status_many", "add_activity_many",
+    "task_kpis", "overdue_tasks", "query_tasks", "list_tags", "search_tasks", "subscribe",
+    "archive_closed", "archived_count", "iter_export",
+)
+
+__all__ = list(_TASK_MANAGER)
+
+
+def __getattr__(name: str):
+    if name in _TASK_MANAGER:
+        return getattr(importlib.import_module(".task_manager", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
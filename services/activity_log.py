@@ -0,0 +1,122 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable
+import os, re, json, struct, hashlib
+from .durable import FileLock
+from .perf import incr
+
+_OFF = struct.Struct("<Q")
+
+
+def _safe_name(task_id: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", str(task_id))
+    if name != str(task_id):
+        name += "-" + hashlib.sha1(str(task_id).encode()).hexdigest()[:8]
+    return name
+
+
+class ActivityLog:
+    """Append-only, per-task activity log for the JSON backend.
+
+    Each task gets `<id>.jsonl` (one entry per line) plus `<id>.idx`, a packed
+    array of little-endian uint64 line offsets. Entry `seq` is its position in
+    the idx file, so appends are O(1) and any page can be read with two seeks.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = FileLock(os.path.join(root, "activity"))
+
+    def _paths(self, task_id: str):
+        base = os.path.join(self.root, _safe_name(task_id))
+        return base + ".jsonl", base + ".idx"
+
+    def count(self, task_id: str) -> int:
+        try:
+            return os.path.getsize(self._paths(task_id)[1]) // _OFF.size
+        except FileNotFoundError:
+            return 0
+
+    def append_many(self, task_id: str, entries: Iterable[Dict[str,Any]]) -> int:
+        entries = list(entries)
+        if not entries:
+            return self.count(task_id)
+        os.makedirs(self.root, exist_ok=True)
+        log_path, idx_path = self._paths(task_id)
+        with self._lock:
+            seq = self.count(task_id)
+            with open(log_path, "ab") as log, open(idx_path, "ab") as idx:
+                # Drop any tail left by a crash between the two writes below;
+                # the idx file is authoritative.
+                if seq:
+                    with open(idx_path, "rb") as f:
+                        f.seek((seq - 1) * _OFF.size)
+                        last = _OFF.unpack(f.read(_OFF.size))[0]
+                    with open(log_path, "rb") as f:
+                        f.seek(last)
+                        end = last + len(f.readline())
+                    if log.tell() != end:
+                        log.truncate(end)
+                        log.seek(end)
+                elif log.tell():
+                    log.truncate(0)
+                offsets = bytearray()
+                start = log.tell()
+                for e in entries:
+                    offsets += _OFF.pack(log.tell())
+                    log.write((json.dumps({**e, "seq": seq}) + "\n").encode())
+                    seq += 1
+                log.flush()
+                os.fsync(log.fileno())
+                idx.write(offsets)
+                incr("store.bytes_written", log.tell() - start + len(offsets))
+                idx.flush()
+                os.fsync(idx.fileno())
+        return seq - 1
+
+    def append(self, task_id: str, entry: Dict[str,Any]) -> int:
+        return self.append_many(task_id, [entry])
+
+    def page(self, task_id: str, before: int | None = None, limit: int = 20) -> List[Dict[str,Any]]:
+        """Up to `limit` entries older than `before`, newest first."""
+        log_path, idx_path = self._paths(task_id)
+        n = self.count(task_id)
+        hi = n if before is None else max(0, min(int(before), n))
+        lo = max(0, hi - limit) if limit is not None else 0
+        if hi <= lo:
+            return []
+        with open(idx_path, "rb") as f:
+            f.seek(lo * _OFF.size)
+            # One extra offset (when there is one) bounds the read at entry `hi`.
+            offs = [o for (o,) in _OFF.iter_unpack(f.read((hi - lo + 1) * _OFF.size))]
+        with open(log_path, "rb") as f:
+            f.seek(offs[0])
+            blob = f.read(offs[-1] - offs[0]) if len(offs) > hi - lo else f.read()
+        incr("store.bytes_read", len(blob) + len(offs) * _OFF.size)
+        lines = blob.split(b"\n")[: hi - lo]
+        return [json.loads(line) for line in reversed(lines)]
+
+    def delete(self, task_id: str):
+        with self._lock:
+            for p in self._paths(task_id):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+
+
+def load_tasks_json(json_path: str, logged: bool = True) -> List[Dict[str,Any]]:
+    """Every task in a tasks.json file with its full activity nested, as the file had before JsonStore opened it.
+
+    JsonStore moves nested activity into `activity/` beside the file; with
+    `logged`, that is read back for each task that has no nested list.
+    """
+    with open(json_path) as f:
+        tasks = json.load(f)
+    if logged:
+        log = ActivityLog(os.path.join(os.path.dirname(json_path), "activity"))
+        for t in tasks:
+            if "activity" not in t and t.get("id"):
+                acts = log.page(t["id"], None, None)[::-1]
+                if acts:
+                    t["activity"] = [{k: v for k, v in a.items() if k != "seq"} for a in acts]
+    return tasks
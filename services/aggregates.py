@@ -0,0 +1,118 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Mapping
+from bisect import bisect_left, bisect_right, insort
+import math, time, threading
+import numpy as np
+from .temporal import DAY, OVERDUE_AFTER_DAYS, NEARING_FROM_DAYS, parse_epoch, is_closed
+from .table import TaskTable
+
+_INF = float("inf")
+_MAX_ID = "\U0010ffff"  # sorts after every task id
+
+
+def created_epoch(iso_str) -> float:
+    """created_at as epoch seconds; unparseable values sort after everything (age 0)."""
+    e = parse_epoch(iso_str)
+    return _INF if math.isnan(e) else e
+
+
+class TaskAggregates:
+    """Dashboard KPIs kept up to date on every create / status change / delete.
+
+    Open tasks sit in a list sorted by created_at, so the overdue and
+    nearing-deadline buckets are two bisects instead of a scan.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self._lock = threading.Lock()
+        self._open: Dict[str, tuple] = {}     # id -> (epoch, id, title, status, created_at)
+        self._closed: set = set()
+        self._by_created: List[tuple] = []    # sorted (epoch, id)
+
+    @classmethod
+    def build(cls, tasks: Iterable[Mapping[str,Any]] | TaskTable, version=None) -> "TaskAggregates":
+        agg = cls(version)
+        if isinstance(tasks, TaskTable):
+            return agg._from_table(tasks)
+        for t in tasks:
+            tid = t.get("id")
+            if is_closed(t.get("status")):
+                agg._closed.add(tid)
+            else:
+                e = created_epoch(t.get("created_at"))
+                agg._open[tid] = (e, tid, t.get("title", "Untitled"), t.get("status") or "Open", t.get("created_at"))
+                agg._by_created.append((e, tid))
+        agg._by_created.sort()
+        return agg
+
+    def _from_table(self, table: TaskTable) -> "TaskAggregates":
+        # Column arrays: only open rows are materialised, closed ones are just ids.
+        closed = table.closed_mask()
+        self._closed = {table.task_id(i) for i in np.flatnonzero(closed).tolist()}
+        rows = np.flatnonzero(~closed)
+        epochs = table.created_seconds(rows)
+        epochs[np.isnan(epochs)] = _INF
+        for i, e in zip(rows.tolist(), epochs.tolist()):
+            tid = table.task_id(i)
+            self._open[tid] = (e, tid, table.value(i, "title"), table.status_of(i) or "Open",
+                               table.value(i, "created_at"))
+            self._by_created.append((e, tid))
+        self._by_created.sort()
+        return self
+
+    # ---- maintenance ----
+    def _drop_open(self, tid):
+        ent = self._open.pop(tid, None)
+        if ent:
+            i = bisect_left(self._by_created, (ent[0], tid))
+            if i < len(self._by_created) and self._by_created[i] == (ent[0], tid):
+                del self._by_created[i]
+
+    def upsert(self, t: Mapping[str,Any]):
+        tid = t.get("id")
+        with self._lock:
+            self._drop_open(tid)
+            self._closed.discard(tid)
+            if is_closed(t.get("status")):
+                self._closed.add(tid)
+            else:
+                e = created_epoch(t.get("created_at"))
+                self._open[tid] = (e, tid, t.get("title", "Untitled"), t.get("status") or "Open", t.get("created_at"))
+                insort(self._by_created, (e, tid))
+
+    def remove(self, tid: str):
+        with self._lock:
+            self._drop_open(tid)
+            self._closed.discard(tid)
+
+    # ---- queries ----
+    def _cutoffs(self, now: float | None):
+        now = time.time() if now is None else now
+        # age_days = floor((now - created) / DAY); overdue is age > 5, i.e. created <= now - 6 days.
+        overdue_cut = now - (OVERDUE_AFTER_DAYS + 1) * DAY
+        nearing_cut = now - NEARING_FROM_DAYS * DAY
+        return overdue_cut, nearing_cut
+
+    def kpis(self, now: float | None = None) -> Dict[str,int]:
+        overdue_cut, nearing_cut = self._cutoffs(now)
+        with self._lock:
+            overdue = bisect_right(self._by_created, (overdue_cut, _MAX_ID))
+            nearing = bisect_right(self._by_created, (nearing_cut, _MAX_ID)) - overdue
+            return {
+                "total": len(self._open) + len(self._closed),
+                "open": len(self._open),
+                "closed": len(self._closed),
+                "overdue": overdue,
+                "nearing": nearing,
+            }
+
+    def overdue(self, limit: int | None = None, now: float | None = None) -> List[Dict[str,Any]]:
+        """Open tasks past the overdue threshold, oldest first."""
+        overdue_cut, _ = self._cutoffs(now)
+        with self._lock:
+            n = bisect_right(self._by_created, (overdue_cut, _MAX_ID))
+            keys = self._by_created[: n if limit is None else min(n, limit)]
+            rows = [self._open[tid] for _, tid in keys]
+        return [{"id": tid, "title": title, "status": status, "created_at": created}
+                for _, tid, title, status, created in rows]
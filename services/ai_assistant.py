@@ -1,18 +1,423 @@
-import os, requests
+from __future__ import annotations
+from typing import Iterator, List, Dict, Any, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import os, json, time, uuid, random, threading
+from . import llm_cache
+from .perf import span, timed, incr, record
+
+if TYPE_CHECKING:
+    import requests
+
+# The task store, prompt context, similarity index and knowledge base are
+# imported where a prompt is first built, so a page that only shows job
+# status doesn't load them (or NumPy) when it imports this module.
 
 GROQ_API = "https://api.groq.com/openai/v1/chat/completions"
 SYSTEM = (
  "You are TaskPilot AI, a focused assistant for Snowflake and Matillion tasks. "
  "Provide step-by-step guidance, SQL samples, Matillion orchestration tips, and troubleshooting."
 )
+DEFAULT_MODEL = "llama-3.1-70b-versatile"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _requests():
+    # requests (and urllib3) is the costliest import on the page path; load it
+    # with the first client instead of with every page that shows guidance.
+    import requests
+    return requests
+
+
+class ChatError(Exception):
+    def __init__(self, status: int, text: str):
+        super().__init__(f"{status} {text[:200]}")
+        self.status = status
+        self.text = text
+
+
+class RateLimiter:
+    """Token bucket shared by every request of a client.
+
+    A 429 pauses the whole bucket for the server's Retry-After, so batch
+    jobs back off together instead of each hammering the API in turn.
+    """
+
+    def __init__(self, per_minute: float, burst: int | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, int(per_minute // 6)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ChatClient:
+    """OpenAI-compatible chat-completions client.
+
+    One pooled requests.Session per client keeps TCP/TLS connections alive
+    between questions. Connection errors, timeouts, 429 and 5xx responses are
+    retried with exponential backoff and full jitter (Retry-After wins when
+    the server sends it). stream_chat() yields tokens from the server-sent
+    event stream as they arrive.
+    """
+
+    def __init__(self, api_key: str | None = None, url: str = GROQ_API, connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0, max_retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 8.0, pool_size: int = 10, limiter: RateLimiter | None = None):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        rq = _requests()
+        self._transient = (rq.ConnectionError, rq.Timeout)
+        self.session = rq.Session()
+        adapter = rq.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _delay(self, attempt: int, resp=None) -> float:
+        if resp is not None:
+            ra = resp.headers.get("Retry-After")
+            try:
+                if ra is not None:
+                    return min(float(ra), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _post(self, payload: Dict, stream: bool) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                with span("ai_assistant.http"):
+                    r = self.session.post(self.url, json=payload, headers=headers, timeout=self.timeout, stream=stream)
+            except self._transient:
+                if attempt >= self.max_retries:
+                    raise
+                incr("ai.retries")
+                time.sleep(self._delay(attempt))
+                attempt += 1
+                continue
+            if r.status_code == 200:
+                return r
+            if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._delay(attempt, r)
+                if r.status_code == 429 and self.limiter:
+                    self.limiter.pause(delay)
+                r.close()
+                incr("ai.retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            text = r.text
+            r.close()
+            raise ChatError(r.status_code, text)
+
+    @staticmethod
+    def _payload(messages, model, temperature, stream=False) -> Dict:
+        p = {"model": model, "messages": [{"role":"system","content":SYSTEM}] + list(messages), "temperature": temperature}
+        if stream:
+            p["stream"] = True
+        return p
+
+    def chat(self, messages: List[Dict], model: str = DEFAULT_MODEL, temperature: float = 0.2) -> str:
+        r = self._post(self._payload(messages, model, temperature), stream=False)
+        return r.json()["choices"][0]["message"]["content"].strip()
+
+    def stream_chat(self, messages: List[Dict], model: str = DEFAULT_MODEL, temperature: float = 0.2) -> Iterator[str]:
+        r = self._post(self._payload(messages, model, temperature, stream=True), stream=True)
+        # SSE is always UTF-8, but requests falls back to ISO-8859-1 for a
+        # text/* response without a charset and would garble non-ASCII tokens.
+        r.encoding = "utf-8"
+        with r:
+            for line in r.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                for choice in chunk.get("choices") or ():
+                    tok = (choice.get("delta") or {}).get("content")
+                    if tok:
+                        yield tok
+
+
+def _api_key():
+    return os.getenv("groq_api_key") or os.getenv("GROQ_API_KEY")
+
+_client: ChatClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> ChatClient:
+    """Process-wide client; GROQ_API_URL points it at another OpenAI-compatible server."""
+    global _client
+    with _client_lock:
+        key = _api_key()
+        if _client is None or _client.api_key != key:
+            rpm = float(os.getenv("GROQ_RPM", "30") or 0)
+            _client = ChatClient(
+                api_key=key,
+                url=os.getenv("GROQ_API_URL", GROQ_API),
+                max_retries=int(os.getenv("GROQ_MAX_RETRIES", "3")),
+                read_timeout=float(os.getenv("GROQ_TIMEOUT", "60")),
+                limiter=RateLimiter(rpm) if rpm > 0 else None,
+            )
+        return _client
+
+_NO_KEY = "Set groq_api_key in Streamlit secrets to enable AI guidance."
+
+def _cached(messages, model, temperature, use_cache):
+    if not (use_cache and llm_cache.enabled()):
+        return None, None
+    key = llm_cache.cache_key(model, temperature, SYSTEM, list(messages))
+    return key, llm_cache.get_cache().get(key)
+
+def _complete(messages, model=DEFAULT_MODEL, temperature=0.2, task_id=None, use_cache=True) -> str:
+    key, hit = _cached(messages, model, temperature, use_cache)
+    if hit is not None:
+        return hit
+    answer = get_client().chat(messages, model, temperature)
+    if key:
+        llm_cache.get_cache().put(key, answer, task_id)
+    return answer
+
+@timed
+def groq_chat(messages, model=DEFAULT_MODEL, temperature=0.2, task_id=None, use_cache=True):
+    if not _api_key():
+        return _NO_KEY
+    try:
+        return _complete(messages, model, temperature, task_id, use_cache)
+    except ChatError as e:
+        return f"Groq API error: {e.status} {e.text[:200]}"
+    except _requests().RequestException as e:
+        return f"Groq API error: {e}"
+
+def groq_chat_stream(messages, model=DEFAULT_MODEL, temperature=0.2, task_id=None, use_cache=True) -> Iterator[str]:
+    """Like groq_chat, but yields the answer token by token (for st.write_stream).
+
+    A cached answer is yielded whole; a fresh one is cached once the stream completes.
+    """
+    if not _api_key():
+        yield _NO_KEY
+        return
+    key, hit = _cached(messages, model, temperature, use_cache)
+    if hit is not None:
+        yield hit
+        return
+    parts = []
+    t = time.perf_counter()
+    try:
+        for tok in get_client().stream_chat(messages, model, temperature):
+            if not parts:
+                record("ai_assistant.first_token", (time.perf_counter() - t) * 1000)
+            parts.append(tok)
+            yield tok
+    except ChatError as e:
+        yield f"Groq API error: {e.status} {e.text[:200]}"
+        return
+    except _requests().RequestException as e:
+        yield f"Groq API error: {e}"
+        return
+    record("ai_assistant.groq_chat_stream", (time.perf_counter() - t) * 1000)
+    if key and parts:
+        llm_cache.get_cache().put(key, "".join(parts).strip(), task_id)
+
+
+# ---------- prompts ----------
+
+GUIDANCE_INSTRUCTIONS = [
+    "Act as a senior data engineer specialized in Snowflake and Matillion.",
+    "Given the task details and recent activity, propose next steps with SQL and Matillion job hints.",
+]
+CHAT_INSTRUCTIONS = [
+    "You are an assistant for data engineering tasks, specialized in Snowflake, Matillion, SQL, and Python.",
+    "Answer concisely with steps and relevant SQL/examples.",
+]
+
+SIMILAR_IN_PROMPT = 3
+KB_IN_PROMPT = 3
+
+def kb_query(task, question: str = "") -> str:
+    return f"{task.get('title') or ''}\n{(task.get('description') or '')[:300]}\n{question}"
+
+def _with_similar(task, instructions, question, budget, similar, runbooks=None):
+    from .context import build_prompt
+    from .similar import similar_tasks, similar_text
+    from . import kb
+    if similar is None:
+        similar = similar_tasks(task, k=SIMILAR_IN_PROMPT)
+    if runbooks is None:
+        runbooks = kb.search(kb_query(task, question), k=KB_IN_PROMPT)
+    extra = []
+    if similar:
+        extra.append(("Similar Past Tasks (already resolved):", similar_text(similar)))
+    if runbooks:
+        extra.append(("Runbook Excerpts:", kb.kb_text(runbooks)))
+    return build_prompt(task, question, instructions, budget, extra)
+
+def guidance_prompt(task, question: str, budget: int | None = None, similar=None, runbooks=None) -> str:
+    return _with_similar(task, GUIDANCE_INSTRUCTIONS, question, budget, similar, runbooks)
+
+def chat_prompt(task, question: str, budget: int | None = None, similar=None, runbooks=None) -> str:
+    return _with_similar(task, CHAT_INSTRUCTIONS, question, budget, similar, runbooks)
+
+def _guidance_messages(task_id: str, question: str):
+    from .task_manager import get_task
+    task = get_task(task_id)
+    if task is None:
+        raise LookupError(f"Task {task_id} not found")
+    return [{"role": "user", "content": guidance_prompt(task, question)}]
+
+
+# ---------- background jobs ----------
+
+NEXT_STEPS_QUESTION = "What are the concrete next steps to unblock and close this task?"
+
+class Job:
+    __slots__ = ("id", "task_id", "question", "batch", "status", "result", "error", "submitted_at", "finished_at")
+
+    def __init__(self, task_id: str, question: str, batch: str | None = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.task_id = task_id
+        self.question = question
+        self.batch = batch
+        self.status = "queued"          # queued -> running -> done | error
+        self.result: str | None = None
+        self.error: str | None = None
+        self.submitted_at = time.time()
+        self.finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+
+class JobRunner:
+    """Runs guidance requests off the Streamlit script thread.
+
+    Interactive questions and batch runs use separate bounded pools so a
+    200-task morning batch can't starve someone waiting on Task Detail.
+    All of them share the client's rate limiter. Finished jobs are kept
+    (up to `keep`) for pages to poll.
+    """
+
+    def __init__(self, workers: int = 4, batch_workers: int = 4, keep: int = 2000):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-job")
+        self._batch_pool = ThreadPoolExecutor(max_workers=batch_workers, thread_name_prefix="ai-batch")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_task: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.keep = keep
+
+    def _track(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            self._by_task[job.task_id] = job.id
+            while len(self._jobs) > self.keep:
+                old_id, old = self._jobs.popitem(last=False)
+                if self._by_task.get(old.task_id) == old_id:
+                    del self._by_task[old.task_id]
+
+    def _run(self, job: Job):
+        job.status = "running"
+        t = time.perf_counter()
+        try:
+            if not _api_key():
+                raise RuntimeError(_NO_KEY)
+            job.result = _complete(_guidance_messages(job.task_id, job.question), task_id=job.task_id)
+            job.status = "done"
+        except ChatError as e:
+            job.error, job.status = f"Groq API error: {e.status} {e.text[:200]}", "error"
+        except Exception as e:
+            job.error, job.status = str(e) or e.__class__.__name__, "error"
+        finally:
+            job.finished_at = time.time()
+            record("ai_assistant.guidance_job", (time.perf_counter() - t) * 1000)
+
+    def submit(self, task_id: str, question: str, batch: str | None = None) -> Job:
+        job = Job(task_id, question, batch)
+        self._track(job)
+        (self._batch_pool if batch else self._pool).submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest_for_task(self, task_id: str) -> Job | None:
+        with self._lock:
+            jid = self._by_task.get(task_id)
+            return self._jobs.get(jid) if jid else None
+
+    def batch(self, batch_id: str) -> List[Job]:
+        with self._lock:
+            return [j for j in self._jobs.values() if j.batch == batch_id]
+
+
+_runner: JobRunner | None = None
+
+def get_runner() -> JobRunner:
+    global _runner
+    with _client_lock:
+        if _runner is None:
+            _runner = JobRunner(
+                workers=int(os.getenv("TASKPILOT_AI_WORKERS", "4")),
+                batch_workers=int(os.getenv("TASKPILOT_AI_BATCH_CONCURRENCY", "4")),
+            )
+        return _runner
+
+def submit_guidance(task_id: str, question: str) -> Job:
+    """Queue a guidance request; poll get_job(job.id) for the answer."""
+    return get_runner().submit(task_id, question)
+
+def get_job(job_id: str) -> Job | None:
+    return get_runner().get(job_id)
+
+def latest_guidance(task_id: str) -> Job | None:
+    """Most recent job for a task, e.g. one queued by the overdue batch."""
+    return get_runner().latest_for_task(task_id)
+
+def submit_overdue_guidance(question: str = NEXT_STEPS_QUESTION, limit: int | None = None) -> str:
+    """Queue next-step suggestions for every overdue task. Returns a batch id for batch_status()."""
+    from .task_manager import overdue_tasks
+    batch_id = uuid.uuid4().hex[:12]
+    runner = get_runner()
+    for t in overdue_tasks(limit=limit):
+        runner.submit(t["id"], question, batch=batch_id)
+    return batch_id
 
-def groq_chat(messages, model="llama-3.1-70b-versatile", temperature=0.2):
-    key = os.getenv("groq_api_key") or os.getenv("GROQ_API_KEY")
-    if not key:
-        return "Set groq_api_key in Streamlit secrets to enable AI guidance."
-    headers = {"Authorization": f"Bearer {key}"}
-    payload = {"model": model, "messages": [{"role":"system","content":SYSTEM}] + messages, "temperature": temperature}
-    r = requests.post(GROQ_API, json=payload, headers=headers, timeout=60)
-    if r.status_code != 200:
-        return f"Groq API error: {r.status_code} {r.text[:200]}"
-    return r.json()["choices"][0]["message"]["content"].strip()
\ No newline at end of file
+def batch_status(batch_id: str) -> Dict[str, Any]:
+    jobs = get_runner().batch(batch_id)
+    return {
+        "total": len(jobs),
+        "done": sum(j.status == "done" for j in jobs),
+        "error": sum(j.status == "error" for j in jobs),
+        "jobs": jobs,
+    }
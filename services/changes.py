@@ -0,0 +1,209 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Mapping, Callable, Tuple
+import os, json, time, logging, sqlite3, threading
+from .task_manager import get_tasks, subscribe
+from .perf import incr
+
+# Change feed: every task write appends (version, event, task ids) to a small
+# SQLite log shared by all processes on this data directory. Versions only
+# go up, so "anything new?" is a single comparison, and "what changed since
+# v?" names exactly the tasks a session has to re-read.
+
+FEED_PATH = os.path.join("data", "changes.db")
+KEEP = 10000                 # versions kept; sessions further behind reload in full
+# A LiveView reloads in full after patching this many rows, which also lets go
+# of the old snapshot its first rows came from.
+MAX_PATCHED = 2000
+POLL_SECONDS = float(os.getenv("TASKPILOT_WATCH_INTERVAL", "0.2"))
+_GONE = ("delete", "archive")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    version  INTEGER PRIMARY KEY AUTOINCREMENT,
+    at       REAL NOT NULL,
+    event    TEXT NOT NULL,
+    task_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class ChangeFeed:
+    def __init__(self, path: str = FEED_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            c = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.executescript(_SCHEMA)
+            # When this log started; ids_since can't answer for anything earlier.
+            c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('created_at', ?)", (time.time(),))
+            self._local.conn = c
+        return c
+
+    def append(self, event: str, task_ids: Iterable[str]) -> int:
+        c = self._conn()
+        v = c.execute("INSERT INTO changes (at, event, task_ids) VALUES (?, ?, ?)",
+                      (time.time(), event, json.dumps(list(task_ids)))).lastrowid
+        if v % 1000 == 0:
+            c.execute("DELETE FROM changes WHERE version <= ?", (v - KEEP,))
+        return v
+
+    def version(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(version), 0) FROM changes").fetchone()[0]
+
+    def since(self, version: int) -> Tuple[int, Dict[str,str] | None]:
+        """(current version, {task id: its latest event} after `version`), or None if that part of the log is gone."""
+        c = self._conn()
+        c.execute("BEGIN")
+        try:
+            oldest, current = c.execute("SELECT MIN(version), COALESCE(MAX(version), 0) FROM changes").fetchone()
+            rows = c.execute("SELECT event, task_ids FROM changes WHERE version > ? ORDER BY version",
+                             (version,)).fetchall()
+        finally:
+            c.execute("COMMIT")
+        if version > current or (oldest is not None and oldest > version + 1):
+            return current, None    # trimmed past `version`, or the feed was reset
+        changed: Dict[str,str] = {}
+        for event, blob in rows:
+            changed.update(dict.fromkeys(json.loads(blob), event))
+        return current, changed
+
+    def created_at(self) -> float:
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'created_at'").fetchone()[0]
+
+    def ids_since(self, at: float) -> set | None:
+        """Ids of tasks written at or after `at` (epoch seconds), or None if the log doesn't reach back that far."""
+        c = self._conn()
+        c.execute("BEGIN")
+        try:
+            created = c.execute("SELECT value FROM meta WHERE key = 'created_at'").fetchone()[0]
+            first, oldest = c.execute("SELECT MIN(version), MIN(at) FROM changes").fetchone()
+            if created > at or (first is not None and first > 1 and oldest > at):
+                return None     # started, or already trimmed, after `at`
+            rows = c.execute("SELECT task_ids FROM changes WHERE at >= ?", (at,)).fetchall()
+        finally:
+            c.execute("COMMIT")
+        ids: set = set()
+        for (blob,) in rows:
+            ids.update(json.loads(blob))
+        return ids
+
+
+class Watcher:
+    """One thread per process polling the feed version; sessions read `version` for free.
+
+    Writes made in this process bump `version` immediately; other processes'
+    writes show up within POLL_SECONDS. `wait()` blocks until the version moves.
+    """
+
+    def __init__(self, feed: ChangeFeed, interval: float = POLL_SECONDS):
+        self.feed = feed
+        self.interval = interval
+        self.version = feed.version()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="taskpilot-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.bump(self.feed.version())
+            except Exception:
+                logging.getLogger(__name__).exception("change feed poll failed")
+
+    def bump(self, version: int):
+        if version > self.version:
+            with self._cond:
+                if version > self.version:
+                    self.version = version
+                    incr("changes.seen")
+                    self._cond.notify_all()
+
+    def wait(self, since: int, timeout: float | None = None) -> int:
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since, timeout)
+            return self.version
+
+
+_feed: ChangeFeed | None = None
+_watcher: Watcher | None = None
+_lock = threading.Lock()
+
+def feed() -> ChangeFeed:
+    global _feed
+    if _feed is None:
+        _feed = ChangeFeed(FEED_PATH)
+    return _feed
+
+def watcher() -> Watcher:
+    global _watcher
+    if _watcher is None:
+        with _lock:
+            if _watcher is None:
+                _watcher = Watcher(feed())
+    return _watcher
+
+
+class LiveView:
+    """A session's own list of tasks, kept current by re-reading only what the feed says changed.
+
+    `load()` gives the full list (first use, or after falling too far behind);
+    `keep(task)` says whether a re-read task still belongs in the view.
+    """
+
+    def __init__(self, load: Callable[[], List[Mapping[str,Any]]], keep: Callable[[Mapping[str,Any]], bool]):
+        self.load = load
+        self.keep = keep
+        self.version = -1
+        self.patched = 0
+        self.rows: Dict[str, Mapping[str,Any]] = {}
+
+    def refresh(self) -> int:
+        """Bring the view up to date; returns how many tasks were re-read (-1 for a full reload)."""
+        f = feed()
+        if self.version < 0 or self.patched > MAX_PATCHED:
+            self.version = f.version()
+            self.patched = 0
+            self.rows = {t["id"]: t for t in self.load()}
+            return -1
+        if self.version == watcher().version:
+            return 0
+        current, changed = f.since(self.version)
+        if changed is None:
+            self.version = -1
+            return self.refresh()
+        # Deleted and archived tasks just drop out; everything else is re-read.
+        fresh = {t["id"]: t for t in get_tasks([i for i, e in changed.items() if e not in _GONE])}
+        for tid in changed:
+            t = fresh.get(tid)
+            if t is not None and self.keep(t):
+                self.rows[tid] = t
+            else:
+                self.rows.pop(tid, None)
+        self.version = current
+        self.patched += len(changed)
+        incr("changes.rows_patched", len(changed))
+        return len(changed)
+
+    def tasks(self) -> List[Mapping[str,Any]]:
+        return list(self.rows.values())
+
+
+def _on_change(event: str, task_ids: List[str]):
+    v = feed().append(event, task_ids)
+    if _watcher is not None:
+        _watcher.bump(v)
+
+subscribe(_on_change)
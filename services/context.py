@@ -0,0 +1,196 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Mapping
+import os, re, json, sqlite3, threading
+from .task_manager import iter_activity, activity_count, subscribe
+
+SUMMARY_PATH = os.path.join("data", "summaries.db")
+# The newest entries are always sent verbatim; everything older is folded
+# into the task's rolling summary.
+RECENT_WINDOW = 10
+DEFAULT_BUDGET = int(os.getenv("TASKPILOT_PROMPT_BUDGET", "1500"))
+MAX_HIGHLIGHTS = 12
+_STATUS_RE = re.compile(r"^Status set to ([^.]+)\.")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose and SQL; close enough for budgeting.
+    return (len(text or "") + 3) // 4
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    text = text or ""
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    return text[: max(0, budget * 4 - 1)].rstrip() + "…"
+
+
+class RollingSummary:
+    """Extractive summary of a task's activity, folded one entry at a time.
+
+    Keeps counts per author, the status history, the covered date range and
+    the last few condensed updates; the state is small and bounded no
+    matter how long the task has run.
+    """
+
+    def __init__(self, state: Dict[str,Any] | None = None):
+        self.state = state or {"covered": 0, "count": 0, "who": {}, "statuses": [],
+                               "first_at": None, "last_at": None, "highlights": []}
+
+    @property
+    def covered(self) -> int:
+        return self.state["covered"]
+
+    def fold(self, entries: List[Mapping[str,Any]]):
+        """Fold entries (oldest first) into the summary."""
+        s = self.state
+        for a in entries:
+            s["count"] += 1
+            who = a.get("who") or "?"
+            s["who"][who] = s["who"].get(who, 0) + 1
+            s["first_at"] = s["first_at"] or a.get("at")
+            s["last_at"] = a.get("at") or s["last_at"]
+            text = " ".join(str(a.get("text") or "").split())
+            m = _STATUS_RE.match(text)
+            if m and (not s["statuses"] or s["statuses"][-1] != m.group(1)):
+                s["statuses"].append(m.group(1))
+                s["statuses"] = s["statuses"][-8:]
+            first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+            s["highlights"].append(f"{who}: {first[:160]}")
+            s["highlights"] = s["highlights"][-MAX_HIGHLIGHTS:]
+            if "seq" in a:
+                s["covered"] = max(s["covered"], a["seq"] + 1)
+            else:
+                s["covered"] += 1
+
+    def render(self) -> str:
+        s = self.state
+        if not s["count"]:
+            return ""
+        who = ", ".join(f"{w} ×{n}" for w, n in sorted(s["who"].items(), key=lambda kv: -kv[1])[:5])
+        lines = [f"{s['count']} earlier updates ({(s['first_at'] or '?')[:10]} to {(s['last_at'] or '?')[:10]}; by {who})."]
+        if s["statuses"]:
+            lines.append("Status history: " + " → ".join(s["statuses"]))
+        if s["highlights"]:
+            lines.append("Latest of those:")
+            lines += [f"- {h}" for h in s["highlights"]]
+        return "\n".join(lines)
+
+
+class SummaryStore:
+    def __init__(self, path: str = SUMMARY_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            c = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("CREATE TABLE IF NOT EXISTS summaries (task_id TEXT PRIMARY KEY, state TEXT NOT NULL)")
+            self._local.conn = c
+        return c
+
+    def get(self, task_id: str) -> RollingSummary:
+        r = self._conn().execute("SELECT state FROM summaries WHERE task_id = ?", (task_id,)).fetchone()
+        return RollingSummary(json.loads(r[0]) if r else None)
+
+    def put(self, task_id: str, summary: RollingSummary):
+        self._conn().execute("INSERT OR REPLACE INTO summaries (task_id, state) VALUES (?, ?)",
+                             (task_id, json.dumps(summary.state)))
+
+    def delete(self, task_id: str):
+        self._conn().execute("DELETE FROM summaries WHERE task_id = ?", (task_id,))
+
+
+_store: SummaryStore | None = None
+_lock = threading.Lock()
+
+def _summaries() -> SummaryStore:
+    global _store
+    if _store is None:
+        _store = SummaryStore(SUMMARY_PATH)
+    return _store
+
+
+def update_summary(task_id: str, count: int | None = None) -> RollingSummary:
+    """Fold any activity that has slid out of the recent window into the summary.
+
+    Only entries not yet covered are read, so an append costs O(1) entries.
+    """
+    with _lock:
+        store = _summaries()
+        summary = store.get(task_id)
+        n = activity_count(task_id) if count is None else count
+        target = n - RECENT_WINDOW
+        if target > summary.covered:
+            new = iter_activity(task_id, before=target, limit=target - summary.covered)
+            summary.fold(list(reversed(new)))
+            store.put(task_id, summary)
+        return summary
+
+
+def _on_change(event: str, task_ids: List[str]):
+    if event == "activity":
+        for tid in task_ids:
+            update_summary(tid)
+    elif event == "delete":
+        for tid in task_ids:
+            _summaries().delete(tid)
+
+subscribe(_on_change)
+
+
+def build_prompt(task: Mapping[str,Any], question: str, instructions: List[str],
+                 budget: int | None = None, extra_sections: List[tuple] | None = None) -> str:
+    """Pack task context into at most `budget` tokens (as counted by estimate_tokens).
+
+    Instructions, title and question always go in. The rest is filled in
+    order: description (≤40% of what's left), rolling summary of older
+    activity (≤40% of what's left), then recent activity newest-first
+    until the budget runs out. `extra_sections` are (heading, text) pairs
+    placed before the activity, each capped at 25% of what's left.
+    """
+    budget = DEFAULT_BUDGET if budget is None else budget
+    head = list(instructions) + ["", f"Task: {task['title']}"]
+    tail = ["", f"Question: {question}"]
+    avail = budget - estimate_tokens("\n".join(head + tail))
+    body: List[str] = []
+
+    def cost(*lines) -> int:
+        # Every line is charged with its newline; rounding each one up keeps
+        # the sum at or above the cost of the joined prompt.
+        return sum(estimate_tokens(line + "\n") for line in lines)
+
+    def section(label: str, text: str, share: float, inline: bool = False):
+        nonlocal avail
+        text = truncate_tokens(text, int(avail * share) - cost(label))
+        if text:
+            lines = [label + text] if inline else [label, text]
+            body.extend(lines)
+            avail -= cost(*lines)
+
+    section("Description: ", task.get("description") or "", 0.4, inline=True)
+    for heading, text in extra_sections or ():
+        section(heading, text, 0.25)
+
+    recent = iter_activity(task["id"], limit=RECENT_WINDOW)
+    older = update_summary(task["id"], count=(recent[0]["seq"] + 1) if recent else 0).render()
+    section("Earlier Activity (summary):", older, 0.4)
+
+    lines = []
+    avail -= cost("Recent Activity:")
+    for a in recent:
+        line = f"- {a['who']}: {a['text']}"
+        if cost(line) > avail:
+            break
+        lines.append(line)
+        avail -= cost(line)
+    if lines:
+        body += ["Recent Activity:"] + list(reversed(lines))
+
+    return "\n".join(head + body + tail)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from typing import Any, Callable, List
+from concurrent.futures import Future
+import os, json, tempfile, threading, time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive inter-process lock on `<path>.lock`, re-entrant within a thread.
+
+    flock() only serialises separate open file descriptions, so threads of the
+    same process additionally go through an RLock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self._tlock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._tlock.acquire()
+        if self._depth == 0:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                os.close(fd)
+                self._tlock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, 0)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._tlock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def atomic_write(path: str, write: Callable[[Any], None], mode: str = "w"):
+    """Write via a temp file in the same directory, fsync it, then rename over `path`.
+
+    Readers see either the old or the new file, never a truncated one.
+    """
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=d)
+    try:
+        # mkstemp creates 0600 files; keep the permissions the target had.
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself.
+        dfd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+
+
+def atomic_write_json(path: str, obj: Any, **dump_kwargs):
+    atomic_write(path, lambda f: json.dump(obj, f, **dump_kwargs))
+
+
+class GroupCommit:
+    """Batch mutations that arrive within `window` seconds into one commit.
+
+    The first caller to arrive becomes the leader: it waits out the window,
+    takes everything queued meanwhile and hands the batch to `apply_batch`,
+    which must return one result (or exception instance) per mutation.
+    Every caller blocks until its own mutation is durable.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[Any]], List[Any]], window: float):
+        self._apply = apply_batch
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._leading = False
+        self.batches = 0
+        self.mutations = 0
+
+    def submit(self, mutation) -> Any:
+        fut: Future = Future()
+        with self._lock:
+            self._pending.append((mutation, fut))
+            lead = not self._leading
+            self._leading = True
+        if lead:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._leading = False
+            self._flush(batch)
+        return fut.result()
+
+    def _flush(self, batch):
+        try:
+            results = self._apply([m for m, _ in batch])
+        except BaseException as e:
+            for _, f in batch:
+                f.set_exception(e)
+            return
+        self.batches += 1
+        self.mutations += len(batch)
+        for (_, f), r in zip(batch, results):
+            if isinstance(r, BaseException):
+                f.set_exception(r)
+            else:
+                f.set_result(r)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Dict, Any, List
+import os, csv, json, time, argparse, datetime as dtm
+from .task_manager import iter_export, EXPORT_TASK_FIELDS, EXPORT_ACTIVITY_FIELDS
+from .temporal import parse_epoch
+from . import changes
+
+FORMATS = ("csv", "jsonl", "parquet")
+# Incremental exports start this many seconds before the previous run began,
+# so a write that was committing while that run read past it is picked up
+# next time. Load exports as upserts keyed on task id (and seq for activity).
+OVERLAP_SECONDS = 5.0
+
+
+class _CsvSink:
+    def __init__(self, path: str, fields):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.w = csv.DictWriter(self.f, fieldnames=fields)
+        self.w.writeheader()
+
+    def write(self, rows: List[Dict[str,Any]]):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class _JsonlSink:
+    def __init__(self, path: str, fields):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Dict[str,Any]]):
+        self.f.writelines(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in rows)
+
+    def close(self):
+        self.f.close()
+
+
+_PARQUET_TYPES = {"due_days": "int64", "seq": "int64", "activity_count": "int64", "archived": "bool_"}
+
+class _ParquetSink:
+    """One row group per batch."""
+
+    def __init__(self, path: str, fields):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use csv or jsonl instead") from None
+        self.pa = pa
+        self.schema = pa.schema([(f, getattr(pa, _PARQUET_TYPES.get(f, "string"))()) for f in fields])
+        self.w = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows: List[Dict[str,Any]]):
+        if rows:
+            self.w.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.w.close()
+
+
+_SINKS = {"csv": _CsvSink, "jsonl": _JsonlSink, "parquet": _ParquetSink}
+
+
+def export(out_dir: str, fmt: str = "csv", since: float | None = None, batch: int = 1000,
+           include_archived: bool = True) -> Dict[str,Any]:
+    """Write tasks.<fmt> and activity.<fmt> under `out_dir`.
+
+    Rows are streamed a batch at a time into temp files that replace the
+    outputs only once the export has finished. Returns counts and the
+    `watermark` to pass as `since` next time.
+    """
+    if fmt not in _SINKS:
+        raise ValueError(f"Unsupported export format {fmt!r}; use one of {', '.join(FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    # The next run can only be incremental from a point the change feed
+    # covers; opening it here starts the feed on a fresh install.
+    born = changes.feed().created_at()
+    started = time.time()
+    paths = {name: os.path.join(out_dir, f"{name}.{fmt}") for name in ("tasks", "activity")}
+    tmp = {name: p + ".tmp" for name, p in paths.items()}
+    sinks = {"tasks": _SINKS[fmt](tmp["tasks"], EXPORT_TASK_FIELDS),
+             "activity": _SINKS[fmt](tmp["activity"], EXPORT_ACTIVITY_FIELDS)}
+    n_tasks = n_acts = 0
+    try:
+        for tasks, acts in iter_export(since, batch, include_archived):
+            sinks["tasks"].write(tasks)
+            sinks["activity"].write(acts)
+            n_tasks += len(tasks)
+            n_acts += len(acts)
+    except BaseException:
+        for name, s in sinks.items():
+            s.close()
+            os.remove(tmp[name])
+        raise
+    for name, s in sinks.items():
+        s.close()
+        os.replace(tmp[name], paths[name])
+    return {"tasks": n_tasks, "activity": n_acts, "since": since, "watermark": max(started - OVERLAP_SECONDS, born),
+            "seconds": time.time() - started, "files": list(paths.values())}
+
+
+def _read_state(path: str) -> float | None:
+    try:
+        with open(path) as f:
+            return float(json.load(f)["watermark"])
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m services.exporter",
+                                 description="Export tasks and activity as flat tables for reporting")
+    ap.add_argument("out_dir")
+    ap.add_argument("--format", choices=FORMATS, default="csv")
+    ap.add_argument("--since", help="only tasks written at or after this ISO time or epoch seconds")
+    ap.add_argument("--state", help="watermark file: read --since from it and update it after a successful run")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--no-archived", action="store_true", help="skip the cold archive")
+    ap.add_argument("--nice", type=int, default=10, help="lower this process's CPU priority by this much")
+    args = ap.parse_args(argv)
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    since = None
+    if args.since:
+        since = float(args.since) if args.since.replace(".", "", 1).isdigit() else parse_epoch(args.since)
+        if since != since:
+            ap.error(f"can't parse --since {args.since!r}")
+    elif args.state:
+        since = _read_state(args.state)
+    r = export(args.out_dir, args.format, since, args.batch_size, not args.no_archived)
+    if args.state:
+        with open(args.state + ".tmp", "w") as f:
+            json.dump({"watermark": r["watermark"],
+                       "at": dtm.datetime.fromtimestamp(r["watermark"], dtm.timezone.utc).isoformat()}, f)
+        os.replace(args.state + ".tmp", args.state)
+    scope = "all tasks" if since is None else f"tasks changed since {dtm.datetime.fromtimestamp(since, dtm.timezone.utc).isoformat()}"
+    print(f"Exported {r['tasks']} tasks and {r['activity']} activity entries ({scope}) "
+          f"to {args.out_dir} in {r['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
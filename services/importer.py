@@ -0,0 +1,99 @@
+from __future__ import annotations
+from typing import Iterator, Iterable, Dict, Any, List
+import os, csv, json, argparse
+from itertools import islice
+from .task_manager import create_tasks
+
+# Column aliases seen in exports from other trackers.
+_ALIASES = {
+    "title": ("title", "summary", "name", "subject"),
+    "description": ("description", "details", "body"),
+    "status": ("status", "state"),
+    "tags": ("tags", "labels"),
+    "due_days": ("due_days",),
+    "created_at": ("created_at", "created"),
+    "completed_at": ("completed_at", "resolved", "closed_at"),
+    "source_id": ("id", "key", "source_id"),
+}
+
+
+def _normalize(rec: Dict[str,Any]) -> Dict[str,Any]:
+    low = {str(k).strip().lower(): v for k, v in rec.items() if k is not None}
+    out: Dict[str,Any] = {}
+    for field, names in _ALIASES.items():
+        for n in names:
+            v = low.get(n)
+            if v not in (None, ""):
+                out[field] = v
+                break
+    tags = out.get("tags")
+    if isinstance(tags, str):
+        out["tags"] = [g.strip() for g in tags.replace(";", ",").split(",") if g.strip()]
+    if "due_days" in out:
+        try:
+            out["due_days"] = int(out["due_days"])
+        except (TypeError, ValueError):
+            out.pop("due_days")
+    if isinstance(low.get("activity"), list):
+        out["activity"] = low["activity"]
+    return out
+
+
+def read_csv(path: str) -> Iterator[Dict[str,Any]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            yield _normalize(row)
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str,Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _normalize(json.loads(line))
+
+
+def read_records(path: str, fmt: str | None = None) -> Iterator[Dict[str,Any]]:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt == "csv":
+        return read_csv(path)
+    if fmt in ("jsonl", "ndjson"):
+        return read_jsonl(path)
+    raise ValueError(f"Unsupported import format {fmt!r}; use csv or jsonl")
+
+
+def _batches(it: Iterable, size: int) -> Iterator[List]:
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_records(records: Iterable[Dict[str,Any]], batch_size: int = 1000) -> int:
+    """Create tasks from normalized records, one store write per batch. Returns the count."""
+    n = 0
+    for chunk in _batches((r for r in records if r.get("title")), batch_size):
+        create_tasks(chunk)
+        n += len(chunk)
+    return n
+
+
+def import_file(path: str, fmt: str | None = None, batch_size: int = 1000) -> int:
+    """Stream a CSV/JSONL export into the task store; only one batch is held in memory."""
+    return import_records(read_records(path, fmt), batch_size)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m services.importer", description="Bulk-import tasks from CSV or JSONL")
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    ap.add_argument("--batch-size", type=int, default=1000)
+    args = ap.parse_args(argv)
+    n = import_file(args.path, args.format, args.batch_size)
+    print(f"Imported {n} tasks from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from collections import Counter
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import os, re, sys, time, sqlite3, hashlib, argparse, threading
+from .durable import FileLock
+from .search import SearchIndex
+
+# Knowledge base: local Markdown/HTML/text runbooks split into chunks of a
+# few paragraphs, kept in SQLite and ranked with the same BM25 index as task
+# search. Ingestion is incremental: a file whose mtime and size are unchanged
+# is not opened, one whose bytes hash the same is only re-stamped, and only
+# the chunks of files that really changed are re-indexed. Documents that
+# carry the same source URL (two exports of one page) are indexed once.
+
+KB_DIR = os.path.join("data", "kb")
+DOCS_DIR = os.getenv("TASKPILOT_KB_DIR", os.path.join(KB_DIR, "docs"))
+EXTENSIONS = (".md", ".markdown", ".html", ".htm", ".txt")
+CHUNK_CHARS = 1200           # ~300 tokens
+COMMIT_EVERY = 500           # files per transaction while ingesting
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path        TEXT PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    sha1        TEXT NOT NULL,
+    title       TEXT,
+    url         TEXT,
+    dup_of      TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_url ON docs(url);
+CREATE TABLE IF NOT EXISTS chunks (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    path    TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    heading TEXT,
+    text    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+CREATE TABLE IF NOT EXISTS links (
+    url      TEXT PRIMARY KEY,
+    href     TEXT NOT NULL,
+    note     TEXT,
+    added_at REAL NOT NULL
+);
+"""
+
+
+# ---------- URLs ----------
+
+_TRACKING = ("utm_", "gclid", "fbclid", "mc_")
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to spot duplicates: lower-case scheme and host,
+    no default port, fragment, tracking parameters or trailing slash."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host += f":{parts.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not k.lower().startswith(_TRACKING)))
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "", query, ""))
+
+
+# ---------- parsing ----------
+
+class Doc:
+    __slots__ = ("title", "url", "sections")
+
+    def __init__(self, title: str, url: str | None, sections: List[Tuple[str | None, List[str]]]):
+        self.title = title
+        self.url = url
+        self.sections = sections          # (heading, paragraphs)
+
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FRONT_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.S)
+
+def _paragraphs(lines: Iterable[str]) -> List[str]:
+    out, cur = [], []
+    for line in lines:
+        if line.strip():
+            cur.append(line.rstrip())
+        elif cur:
+            out.append("\n".join(cur))
+            cur = []
+    if cur:
+        out.append("\n".join(cur))
+    return out
+
+def parse_markdown(text: str, name: str) -> Doc:
+    meta: Dict[str,str] = {}
+    m = _FRONT_RE.match(text)
+    if m:
+        for line in m.group(1).splitlines():
+            k, sep, v = line.partition(":")
+            if sep:
+                meta[k.strip().lower()] = v.strip().strip("'\"")
+        text = text[m.end():]
+    sections, heading, lines, fence, title = [], None, [], False, meta.get("title")
+    for line in text.splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            fence = not fence
+        h = None if fence else _HEADING_RE.match(line)
+        if h:
+            sections.append((heading, _paragraphs(lines)))
+            heading, lines = h.group(2), []
+            title = title or (heading if len(h.group(1)) == 1 else None)
+        else:
+            lines.append(line)
+    sections.append((heading, _paragraphs(lines)))
+    return Doc(title or name, meta.get("url") or meta.get("source"), [s for s in sections if s[1]])
+
+
+class _HTMLText(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "template", "svg"}
+    _BLOCK = {"p", "div", "li", "tr", "br", "pre", "table", "ul", "ol", "section", "article", "blockquote", "dd", "dt"}
+    _HEAD = {"h1", "h2", "h3", "h4"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.url = None
+        self.sections: List[Tuple[str | None, List[str]]] = []
+        self._heading, self._paras, self._buf, self._head_buf = None, [], [], None
+        self._skip = 0
+        self._in_title = False
+
+    def _flush(self):
+        text = " ".join("".join(self._buf).split())
+        if text:
+            self._paras.append(text)
+        self._buf = []
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag in self._SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "link" and (a.get("rel") or "").lower() == "canonical" and a.get("href"):
+            self.url = a["href"]
+        elif tag == "meta" and a.get("property") == "og:url" and a.get("content") and not self.url:
+            self.url = a["content"]
+        elif tag in self._HEAD:
+            self._flush()
+            self.sections.append((self._heading, self._paras))
+            self._heading, self._paras, self._head_buf = None, [], []
+        elif tag in self._BLOCK:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self._HEAD and self._head_buf is not None:
+            self._heading = " ".join("".join(self._head_buf).split()) or None
+            self._head_buf = None
+        elif tag in self._BLOCK:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._in_title:
+            self.title += data
+        elif self._head_buf is not None:
+            self._head_buf.append(data)
+        else:
+            self._buf.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+        self.sections.append((self._heading, self._paras))
+
+def parse_html(text: str, name: str) -> Doc:
+    p = _HTMLText()
+    p.feed(text)
+    p.close()
+    sections = [s for s in p.sections if s[1]]
+    title = " ".join(p.title.split()) or next((h for h, _ in p.sections if h), None) or name
+    return Doc(title, p.url, sections)
+
+def parse_text(text: str, name: str) -> Doc:
+    paras = _paragraphs(text.splitlines())
+    first = paras[0].splitlines()[0].strip() if paras else ""
+    return Doc(first if 0 < len(first) <= 120 else name, None, [(None, paras)])
+
+def parse(path: str, data: bytes) -> Doc:
+    text = data.decode("utf-8", errors="replace")
+    name, ext = os.path.splitext(os.path.basename(path))
+    ext = ext.lower()
+    if ext in (".md", ".markdown"):
+        return parse_markdown(text, name)
+    if ext in (".html", ".htm"):
+        return parse_html(text, name)
+    return parse_text(text, name)
+
+
+def chunk(doc: Doc, size: int = CHUNK_CHARS) -> Iterator[Tuple[str | None, str]]:
+    """(heading, text) pieces of at most ~`size` characters, packed from whole paragraphs."""
+    for heading, paras in doc.sections:
+        cur, n = [], 0
+        for p in paras:
+            while len(p) > size:
+                # A paragraph longer than a chunk is cut at a word boundary.
+                cut = p.rfind(" ", 0, size)
+                cut = cut if cut > size // 2 else size
+                if cur:
+                    yield heading, "\n\n".join(cur)
+                    cur, n = [], 0
+                yield heading, p[:cut].strip()
+                p = p[cut:].strip()
+            if cur and n + len(p) > size:
+                yield heading, "\n\n".join(cur)
+                cur, n = [], 0
+            if p:
+                cur.append(p)
+                n += len(p) + 2
+        if cur:
+            yield heading, "\n\n".join(cur)
+
+
+def _index_text(title: str, heading: str | None, text: str) -> str:
+    return f"{title}\n{heading or ''}\n{text}"
+
+
+# ---------- store ----------
+
+class KnowledgeBase:
+    def __init__(self, root: str = KB_DIR):
+        self.root = root
+        self.path = os.path.join(root, "kb.db")
+        self.index = SearchIndex(os.path.join(root, "index"))
+        self._flock = FileLock(os.path.join(root, "ingest"))
+        self._local = threading.local()
+        self._checked = False
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            os.makedirs(self.root, exist_ok=True)
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.executescript(_SCHEMA)
+            self._local.conn = c
+        return c
+
+    # ---- ingestion ----
+    def _walk(self, root: str, exts: Tuple[str, ...]) -> Iterator[Tuple[str, os.stat_result]]:
+        stack = [root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    if not e.name.startswith("."):
+                        stack.append(e.path)
+                elif e.name.lower().endswith(exts):
+                    yield e.path, e.stat()
+
+    def _drop_chunks(self, c: sqlite3.Connection, path: str, title: str | None) -> List[Tuple[str, str]]:
+        rows = c.execute("SELECT id, heading, text FROM chunks WHERE path = ?", (path,)).fetchall()
+        c.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        return [(str(i), _index_text(title or "", h, t)) for i, h, t in rows]
+
+    def _store(self, c: sqlite3.Connection, path: str, st, sha1: str, doc: Doc) -> Tuple[List, List]:
+        """Replace `path`'s row and chunks; returns (index removals, index additions)."""
+        old = c.execute("SELECT title, dup_of FROM docs WHERE path = ?", (path,)).fetchone()
+        removed = self._drop_chunks(c, path, old[0]) if old and old[1] is None else []
+        url = normalize_url(doc.url) or None
+        owner = None
+        if url:
+            row = c.execute("SELECT path FROM docs WHERE url = ? AND dup_of IS NULL AND path <> ? LIMIT 1",
+                            (url, path)).fetchone()
+            owner = row[0] if row else None
+        c.execute("INSERT OR REPLACE INTO docs (path, mtime_ns, size, sha1, title, url, dup_of, ingested_at) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                  (path, st.st_mtime_ns, st.st_size, sha1, doc.title, url, owner, time.time()))
+        added = []
+        if owner is None:
+            for seq, (heading, text) in enumerate(chunk(doc)):
+                cid = c.execute("INSERT INTO chunks (path, seq, heading, text) VALUES (?, ?, ?, ?)",
+                                (path, seq, heading, text)).lastrowid
+                added.append((str(cid), _index_text(doc.title, heading, text)))
+        return removed, added
+
+    def ingest(self, root: str = DOCS_DIR, exts: Tuple[str, ...] = EXTENSIONS) -> Dict[str,int]:
+        """Bring the KB in line with the files under `root`; returns counts of what was done."""
+        root = os.path.abspath(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        stats: Counter = Counter()
+        c = self._conn()
+        with self._flock:
+            fresh_index = not self.index.exists()
+            known = {r[0]: r[1:] for r in c.execute("SELECT path, mtime_ns, size, sha1, title, dup_of FROM docs")
+                     if r[0].startswith(prefix)}
+            seen, todo = set(), []
+            for path, st in self._walk(root, exts):
+                seen.add(path)
+                k = known.get(path)
+                if k and k[0] == st.st_mtime_ns and k[1] == st.st_size:
+                    stats["unchanged"] += 1
+                else:
+                    todo.append((path, st))
+            removes, adds = [], []
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                for path in known.keys() - seen:
+                    if known[path][4] is None:
+                        removes += self._drop_chunks(c, path, known[path][3])
+                    c.execute("DELETE FROM docs WHERE path = ?", (path,))
+                    stats["removed"] += 1
+                for n, (path, st) in enumerate(todo, 1):
+                    try:
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    except OSError:
+                        stats["failed"] += 1
+                        continue
+                    sha1 = hashlib.sha1(data).hexdigest()
+                    k = known.get(path)
+                    if k and k[2] == sha1:
+                        c.execute("UPDATE docs SET mtime_ns = ?, size = ? WHERE path = ?", (st.st_mtime_ns, st.st_size, path))
+                        stats["touched"] += 1
+                        continue
+                    r, a = self._store(c, path, st, sha1, parse(path, data))
+                    removes += r
+                    adds += a
+                    stats["updated" if k else "added"] += 1
+                    if n % COMMIT_EVERY == 0:
+                        c.execute("COMMIT")
+                        c.execute("BEGIN IMMEDIATE")
+                # Duplicates whose original went away or changed URL take its place.
+                orphans = c.execute("SELECT d.path FROM docs d WHERE d.dup_of IS NOT NULL AND NOT EXISTS "
+                                    "(SELECT 1 FROM docs o WHERE o.path = d.dup_of AND o.url = d.url AND o.dup_of IS NULL)").fetchall()
+                for (path,) in orphans:
+                    try:
+                        st = os.stat(path)
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    except OSError:
+                        continue
+                    c.execute("UPDATE docs SET dup_of = NULL WHERE path = ?", (path,))
+                    r, a = self._store(c, path, st, hashlib.sha1(data).hexdigest(), parse(path, data))
+                    removes += r
+                    adds += a
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            stats["chunks_added"] = len(adds)
+            stats["chunks_removed"] = len(removes)
+            if not fresh_index:
+                self.index.remove_many(removes)
+                self.index.add_many(adds)
+            if fresh_index or self._index_stale():
+                self.rebuild()
+        self._checked = True
+        return dict(stats)
+
+    def rebuild(self):
+        """Rebuild the search index from the chunks table."""
+        rows = self._conn().execute(
+            "SELECT c.id, d.title, c.heading, c.text FROM chunks c JOIN docs d ON d.path = c.path")
+        self.index.build((str(i), _index_text(t or "", h, x)) for i, t, h, x in rows)
+
+    def _index_stale(self) -> bool:
+        # A crash between the SQLite commit and the index journal leaves the
+        # two disagreeing; the chunk count gives it away.
+        self.index.refresh()
+        return len(self.index.index) != self._conn().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    # ---- lookup ----
+    def search(self, query: str, k: int = 5) -> List[Dict[str,Any]]:
+        """Best `k` chunks for `query`, with their document's title, URL and path."""
+        if not query.strip() or not self.exists():
+            return []
+        if not self._checked:
+            with self._flock:
+                if not self.index.exists() or self._index_stale():
+                    self.rebuild()
+            self._checked = True
+        hits = self.index.search(query, k)
+        if not hits:
+            return []
+        ids = [int(i) for i, _ in hits]
+        rows = self._conn().execute(
+            f"SELECT c.id, c.path, c.heading, c.text, d.title, d.url FROM chunks c JOIN docs d ON d.path = c.path "
+            f"WHERE c.id IN ({','.join('?' * len(ids))})", ids).fetchall()
+        found = {r[0]: r for r in rows}
+        return [{"id": i, "path": found[i][1], "heading": found[i][2], "text": found[i][3],
+                 "title": found[i][4], "url": found[i][5], "score": score}
+                for i, (_, score) in zip(ids, hits) if i in found]
+
+    def version(self):
+        """Changes whenever an ingest changes what `search` can return."""
+        return self.index.version()
+
+    def stats(self) -> Dict[str,int]:
+        if not self.exists():
+            return {"docs": 0, "duplicates": 0, "chunks": 0, "links": 0}
+        c = self._conn()
+        docs, dups = c.execute("SELECT COUNT(*), COUNT(dup_of) FROM docs").fetchone()
+        return {"docs": docs, "duplicates": dups, "chunks": c.execute("SELECT COUNT(*) FROM chunks").fetchone()[0],
+                "links": c.execute("SELECT COUNT(*) FROM links").fetchone()[0]}
+
+    # ---- links ----
+    def add_link(self, href: str, note: str = "") -> bool:
+        """Save a reference link; False if the same URL (normalized) is already saved."""
+        url = normalize_url(href)
+        if not url:
+            raise ValueError("empty URL")
+        href = href.strip()
+        if "://" not in href:
+            href = "https://" + href
+        cur = self._conn().execute("INSERT OR IGNORE INTO links (url, href, note, added_at) VALUES (?, ?, ?, ?)",
+                                   (url, href, (note or "").strip(), time.time()))
+        return cur.rowcount == 1
+
+    def remove_link(self, href: str):
+        self._conn().execute("DELETE FROM links WHERE url = ?", (normalize_url(href),))
+
+    def links(self) -> List[Dict[str,Any]]:
+        if not self.exists():
+            return []
+        rows = self._conn().execute("SELECT url, href, note, added_at FROM links ORDER BY added_at")
+        return [{"url": u, "href": h, "note": n, "added_at": a} for u, h, n, a in rows]
+
+
+_kb: KnowledgeBase | None = None
+_lock = threading.Lock()
+
+def get_kb() -> KnowledgeBase:
+    global _kb
+    if _kb is None:
+        with _lock:
+            if _kb is None:
+                _kb = KnowledgeBase(KB_DIR)
+    return _kb
+
+def search(query: str, k: int = 5) -> List[Dict[str,Any]]:
+    return get_kb().search(query, k)
+
+def version():
+    return get_kb().version()
+
+def ingest(root: str = DOCS_DIR) -> Dict[str,int]:
+    return get_kb().ingest(root)
+
+
+def kb_text(chunks: List[Dict[str,Any]], per_chunk: int = 600) -> str:
+    """Chunks as prompt lines: where each comes from, then its (trimmed) text."""
+    lines = []
+    for ch in chunks:
+        where = " › ".join(filter(None, [ch.get("title"), ch.get("heading")]))
+        src = ch.get("url") or os.path.basename(ch.get("path") or "")
+        text = " ".join((ch.get("text") or "").split())[:per_chunk]
+        lines.append(f"- {where} ({src}): {text}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m services.kb", description="Ingest and search the knowledge base")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ingest", help="index new and changed files under a folder")
+    p.add_argument("folder", nargs="?", default=DOCS_DIR)
+    p = sub.add_parser("search", help="print the best-matching chunks")
+    p.add_argument("query")
+    p.add_argument("-k", type=int, default=5)
+    sub.add_parser("rebuild", help="rebuild the search index from the stored chunks")
+    args = ap.parse_args(argv)
+    kb = get_kb()
+    if args.cmd == "ingest":
+        t = time.perf_counter()
+        stats = kb.ingest(args.folder)
+        print(" ".join(f"{k}={v}" for k, v in sorted(stats.items())) + f" in {time.perf_counter() - t:.2f}s")
+    elif args.cmd == "search":
+        for ch in kb.search(args.query, args.k):
+            print(f"{ch['score']:6.2f}  {ch['title']} › {ch['heading'] or '-'}  ({ch['url'] or ch['path']})")
+            print("        " + " ".join(ch["text"].split())[:200])
+    else:
+        kb.rebuild()
+        print(kb.stats(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+from collections import OrderedDict
+import os, json, time, sqlite3, hashlib, threading
+from .perf import incr
+
+CACHE_PATH = os.path.join("data", "llm_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key       TEXT PRIMARY KEY,
+    task_id   TEXT,
+    value     TEXT NOT NULL,
+    expires   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_task ON responses(task_id);
+CREATE INDEX IF NOT EXISTS ix_responses_used ON responses(last_used);
+"""
+
+
+def cache_key(model: str, temperature: float, system: str, messages: List[Dict[str,Any]]) -> str:
+    blob = json.dumps([model, temperature, system, messages], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResponseCache:
+    """LLM answers keyed by a hash of (model, temperature, system prompt, messages).
+
+    A small in-memory LRU sits in front of a SQLite file. Entries expire
+    after `ttl` seconds, the disk store is trimmed to `max_disk` least
+    recently used rows, and everything cached for a task can be dropped at
+    once when the task changes.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = 7 * 86400, max_memory: int = 256, max_disk: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (value, expires, task_id)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            c = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.executescript(_SCHEMA)
+            self._local.conn = c
+        return c
+
+    def _remember(self, key, value, expires, task_id):
+        self._mem[key] = (value, expires, task_id)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_memory:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    self._mem.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    incr("cache.llm.memory_hit")
+                    return hit[0]
+                del self._mem[key]
+        c = self._conn()
+        r = c.execute("SELECT value, expires, task_id FROM responses WHERE key = ?", (key,)).fetchone()
+        if r is None or r[1] <= now:
+            if r is not None:
+                c.execute("DELETE FROM responses WHERE key = ?", (key,))
+            with self._lock:
+                self.stats["misses"] += 1
+            incr("cache.llm.miss")
+            return None
+        c.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self._remember(key, r[0], r[1], r[2])
+            self.stats["disk_hits"] += 1
+        incr("cache.llm.disk_hit")
+        return r[0]
+
+    def put(self, key: str, value: str, task_id: str | None = None):
+        now = time.time()
+        expires = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires, task_id)
+            self._puts += 1
+            trim = self._puts % 100 == 0
+        c = self._conn()
+        c.execute("INSERT OR REPLACE INTO responses (key, task_id, value, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                  (key, task_id, value, expires, now))
+        if trim:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows and trim the disk store to max_disk entries."""
+        c = self._conn()
+        c.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+        c.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                  (self.max_disk,))
+
+    def invalidate_task(self, task_id: str):
+        with self._lock:
+            for k in [k for k, v in self._mem.items() if v[2] == task_id]:
+                del self._mem[k]
+        self._conn().execute("DELETE FROM responses WHERE task_id = ?", (task_id,))
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        self._conn().execute("DELETE FROM responses")
+
+    def hit_stats(self) -> Dict[str,Any]:
+        with self._lock:
+            s = dict(self.stats)
+            s["memory_entries"] = len(self._mem)
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_rate"] = (s["memory_hits"] + s["disk_hits"]) / lookups if lookups else 0.0
+        return s
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                CACHE_PATH,
+                ttl=float(os.getenv("TASKPILOT_LLM_CACHE_TTL", str(7 * 86400))),
+                max_memory=int(os.getenv("TASKPILOT_LLM_CACHE_MEMORY", "256")),
+                max_disk=int(os.getenv("TASKPILOT_LLM_CACHE_MAX", "10000")),
+            )
+        return _cache
+
+def enabled() -> bool:
+    return os.getenv("TASKPILOT_LLM_CACHE", "1") != "0"
+
+def invalidate_task(task_id: str):
+    """Forget cached answers about a task (called when its activity changes)."""
+    if _cache is None and not os.path.exists(CACHE_PATH):
+        return
+    get_cache().invalidate_task(task_id)
@@ -0,0 +1,345 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Callable, Tuple
+import os, json, mmap, zlib, struct
+import numpy as np
+from .durable import atomic_write
+from .activity_log import load_tasks_json
+from .table import MISSING, _NO_DUE, _canonical, _id_number, _to_us, _iso
+from .perf import incr
+
+# tasks.pack layout (little-endian):
+#
+#   header   magic, format version, flags, task count, then the offset of the
+#            record array and the offset/length of the metadata block
+#   heap     variable-length blobs: title, tags, description, activity, extra
+#   records  one fixed-width RECORD per task, in task order
+#   meta     JSON: the status vocabulary
+#
+# Opening a pack maps the file and reads only the header, the record array
+# (a zero-copy numpy view) and the tiny metadata block; a task's strings are
+# decoded when that task is touched. With FLAG_ZLIB, description, activity and
+# extra blobs are zlib-compressed one by one (titles and tags stay plain, lists
+# show them). Anything the fixed columns can't hold exactly (odd ids, non-UTC
+# timestamps, unknown keys, non-string values) goes into the record's extra
+# JSON blob.
+
+MAGIC = b"TPAK"
+FORMAT = 1
+FLAG_ZLIB = 1
+HEADER = struct.Struct("<4sHHQQQQ")
+RECORD = np.dtype([
+    ("id", "<i8"), ("status", "<u2"), ("flags", "<u2"), ("due", "<i4"),
+    ("created", "<i8"), ("completed", "<i8"),
+    ("title_off", "<u8"), ("title_len", "<u4"),
+    ("tags_off", "<u8"), ("tags_len", "<u4"),
+    ("desc_off", "<u8"), ("desc_len", "<u4"),
+    ("act_off", "<u8"), ("act_len", "<u4"), ("act_count", "<u4"),
+    ("extra_off", "<u8"), ("extra_len", "<u4"),
+])
+NO_STATUS = 0xFFFF
+# record flags: which optional keys are present in the columns/heap
+_HAS_TITLE, _HAS_DESC, _HAS_STATUS, _HAS_TAGS = 1, 2, 4, 8
+_COLUMNS = ("id", "title", "description", "status", "created_at", "completed_at", "due_days", "tags")
+_TAG_SEP = "\x1f"
+
+
+class PackWriter:
+    """Streams tasks into a pack: blobs are written as they come, records and metadata at the end."""
+
+    def __init__(self, f, compress: bool = False):
+        self.f = f
+        self.compress = compress
+        self.pos = HEADER.size
+        self.records: List[tuple] = []
+        self.vocab: Dict[Any, int] = {}
+        f.write(b"\0" * HEADER.size)
+
+    def _put(self, data: bytes, pack: bool) -> Tuple[int, int]:
+        if pack and self.compress and data:
+            data = zlib.compress(data, 6)
+        off = self.pos
+        self.f.write(data)
+        self.pos += len(data)
+        return off, len(data)
+
+    def add(self, task: Mapping[str,Any], raw_activity: Tuple[bytes, int] | None = None):
+        """Append one task. Activity comes from task["activity"], or already encoded as `raw_activity`."""
+        extra = {k: v for k, v in task.items() if k not in _COLUMNS and k != "activity"}
+        flags = 0
+        tid = task.get("id")
+        num = _id_number(tid)
+        if num is None:
+            num = -1
+            if "id" in task:
+                extra["id"] = tid
+        status = NO_STATUS
+        if "status" in task:
+            st = task["status"]
+            try:
+                status = self.vocab.setdefault(st, len(self.vocab))
+                flags |= _HAS_STATUS
+            except TypeError:       # unhashable
+                extra["status"] = st
+        stamps = []
+        for key in ("created_at", "completed_at"):
+            us = MISSING
+            if key in task:
+                v = task[key]
+                if _canonical(v):
+                    us = _to_us(v)
+                if us == MISSING or _iso(us) != v:
+                    us = MISSING
+                    extra[key] = v
+            stamps.append(us)
+        due = _NO_DUE
+        if "due_days" in task:
+            d = task["due_days"]
+            if type(d) is int and _NO_DUE < d < 2**31:
+                due = d
+            else:
+                extra["due_days"] = d
+        title = (0, 0)
+        if isinstance(task.get("title"), str):
+            flags |= _HAS_TITLE
+            title = self._put(task["title"].encode(), False)
+        elif "title" in task:
+            extra["title"] = task["title"]
+        tags = (0, 0)
+        tg = task.get("tags")
+        if isinstance(tg, list) and all(isinstance(g, str) and _TAG_SEP not in g for g in tg) and "" not in tg:
+            flags |= _HAS_TAGS
+            tags = self._put(_TAG_SEP.join(tg).encode(), False)
+        elif "tags" in task:
+            extra["tags"] = tg
+        desc = (0, 0)
+        if isinstance(task.get("description"), str):
+            flags |= _HAS_DESC
+            desc = self._put(task["description"].encode(), True)
+        elif "description" in task:
+            extra["description"] = task["description"]
+        if raw_activity is not None:
+            act = self._put(raw_activity[0], False) + (raw_activity[1],)
+        elif task.get("activity"):
+            acts = list(task["activity"])
+            act = self._put(json.dumps(acts, separators=(",", ":")).encode(), True) + (len(acts),)
+        else:
+            act = (0, 0, 0)
+        ex = self._put(json.dumps(extra, separators=(",", ":")).encode(), True) if extra else (0, 0)
+        self.records.append((num, status, flags, due, stamps[0], stamps[1]) + title + tags + desc + act + ex)
+
+    def finish(self):
+        if len(self.vocab) >= NO_STATUS:
+            raise ValueError("too many distinct statuses for a pack file")
+        pad = -self.pos % 8
+        self.f.write(b"\0" * pad)
+        rec_off = self.pos + pad
+        recs = np.array(self.records, dtype=RECORD)
+        self.f.write(recs.tobytes())
+        meta = json.dumps({"statuses": list(self.vocab)}).encode()
+        meta_off = rec_off + recs.nbytes
+        self.f.write(meta)
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, FORMAT, FLAG_ZLIB if self.compress else 0, len(self.records),
+                                 rec_off, meta_off, len(meta)))
+        incr("store.bytes_written", meta_off + len(meta))
+
+
+def write_pack(path: str, tasks: Iterable[Mapping[str,Any]], compress: bool = False,
+               raw_activity: Callable[[str, bool], Tuple[bytes, int] | None] | None = None):
+    """Atomically (re)write `path` with `tasks`.
+
+    `raw_activity(task_id, compressed)` supplies already-encoded activity for
+    tasks without an "activity" key (carrying it over from the previous pack).
+    """
+    def write(f):
+        w = PackWriter(f, compress)
+        for t in tasks:
+            raw = raw_activity(t.get("id"), compress) if raw_activity and "activity" not in t else None
+            w.add(t, raw)
+        w.finish()
+    atomic_write(path, write, "wb")
+
+
+def _iso_column(us: np.ndarray) -> List[str | None]:
+    # Vectorised _iso(): isoformat() leaves out a zero microsecond part.
+    out = np.datetime_as_string(us.astype("datetime64[us]"), unit="us").tolist()
+    return [None if m else (s[:-7] if s.endswith(".000000") else s) + "+00:00"
+            for s, m in zip(out, (us == MISSING).tolist())]
+
+
+class PackReader:
+    """Read-only view of a pack file through mmap; decodes only the rows asked for.
+
+    The mapping stays valid after the file is atomically replaced (it pins the
+    old inode), so a reader serves one consistent version until dropped.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{path}: not a task pack (truncated header)")
+        magic, fmt, flags, n, rec_off, meta_off, meta_len = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"{path}: not a task pack (magic {magic!r}, format {fmt})")
+        self.path = path
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.records = np.frombuffer(self._mm, dtype=RECORD, count=n, offset=rec_off)
+        self.statuses: List[Any] = json.loads(self._mm[meta_off:meta_off + meta_len])["statuses"]
+        self._index: Tuple[np.ndarray, np.ndarray, Dict[str,int]] | None = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def _bytes(self, off, ln, packed: bool) -> bytes:
+        if not ln:
+            return b""
+        off, ln = int(off), int(ln)
+        incr("store.bytes_read", ln)
+        data = self._mm[off:off + ln]
+        return zlib.decompress(data) if packed and self.compressed else data
+
+    def _extra(self, r) -> Dict[str,Any]:
+        return json.loads(self._bytes(r["extra_off"], r["extra_len"], True).decode()) if r["extra_len"] else {}
+
+    # ---- rows ----
+    def task(self, i: int, with_description: bool = True) -> Dict[str,Any]:
+        r = self.records[i]
+        flags = int(r["flags"])
+        t: Dict[str,Any] = {}
+        if r["id"] >= 0:
+            t["id"] = f"TASK-{int(r['id'])}"
+        if flags & _HAS_TITLE:
+            t["title"] = self._bytes(r["title_off"], r["title_len"], False).decode()
+        if flags & _HAS_DESC:
+            t["description"] = self._bytes(r["desc_off"], r["desc_len"], True).decode() if with_description else None
+        if flags & _HAS_STATUS:
+            t["status"] = self.statuses[int(r["status"])]
+        if r["created"] != MISSING:
+            t["created_at"] = _iso(r["created"])
+        if r["completed"] != MISSING:
+            t["completed_at"] = _iso(r["completed"])
+        if r["due"] != _NO_DUE:
+            t["due_days"] = int(r["due"])
+        if flags & _HAS_TAGS:
+            tg = self._bytes(r["tags_off"], r["tags_len"], False).decode()
+            t["tags"] = tg.split(_TAG_SEP) if tg else []
+        if r["extra_len"]:
+            t.update(self._extra(r))
+        return t
+
+    def tasks(self, with_description: bool = True, chunk: int = 65536) -> Iterator[Dict[str,Any]]:
+        """Every task in order; same dicts as task(i), decoded a column chunk at a time."""
+        mm, packed = self._mm, self.compressed
+        for lo in range(0, len(self.records), chunk):
+            rec = self.records[lo:lo + chunk]
+            stamps = [_iso_column(rec[c]) for c in ("created", "completed")]
+            cols = zip(rec["id"].tolist(), rec["flags"].tolist(), rec["status"].tolist(), stamps[0], stamps[1],
+                       rec["due"].tolist(), rec["title_off"].tolist(), rec["title_len"].tolist(),
+                       rec["tags_off"].tolist(), rec["tags_len"].tolist(),
+                       rec["desc_off"].tolist(), rec["desc_len"].tolist(),
+                       rec["extra_off"].tolist(), rec["extra_len"].tolist())
+            read = 0
+            for num, flags, st, created, completed, due, to, tl, go, gl, do, dl, eo, el in cols:
+                t: Dict[str,Any] = {}
+                if num >= 0:
+                    t["id"] = f"TASK-{num}"
+                if flags & _HAS_TITLE:
+                    t["title"] = mm[to:to + tl].decode()
+                if flags & _HAS_DESC:
+                    if with_description:
+                        d = mm[do:do + dl]
+                        t["description"] = (zlib.decompress(d) if packed and dl else d).decode()
+                        read += dl
+                    else:
+                        t["description"] = None
+                if flags & _HAS_STATUS:
+                    t["status"] = self.statuses[st]
+                if created is not None:
+                    t["created_at"] = created
+                if completed is not None:
+                    t["completed_at"] = completed
+                if due != _NO_DUE:
+                    t["due_days"] = due
+                if flags & _HAS_TAGS:
+                    t["tags"] = mm[go:go + gl].decode().split(_TAG_SEP) if gl else []
+                if el:
+                    e = mm[eo:eo + el]
+                    t.update(json.loads((zlib.decompress(e) if packed else e).decode()))
+                read += tl + gl + el
+                yield t
+            incr("store.bytes_read", read)
+
+    def task_id(self, i: int):
+        r = self.records[i]
+        return f"TASK-{int(r['id'])}" if r["id"] >= 0 else self._extra(r).get("id")
+
+    def row_of(self, task_id) -> int | None:
+        if self._index is None:
+            ids = self.records["id"]
+            order = np.argsort(ids, kind="stable")
+            odd = {self.task_id(int(i)): int(i) for i in np.flatnonzero(ids < 0)}
+            self._index = (order, ids[order], odd)
+        order, ids, odd = self._index
+        num = _id_number(task_id)
+        if num is None:
+            return odd.get(task_id)
+        j = int(np.searchsorted(ids, num))
+        return int(order[j]) if j < len(ids) and ids[j] == num else None
+
+    def description(self, i: int) -> str | None:
+        r = self.records[i]
+        if int(r["flags"]) & _HAS_DESC:
+            return self._bytes(r["desc_off"], r["desc_len"], True).decode()
+        return self._extra(r).get("description")
+
+    def status_rows(self, prefix: str) -> np.ndarray:
+        p = (prefix or "").lower()
+        codes = [c for c, s in enumerate(self.statuses) if (s or "").lower().startswith(p)]
+        rows = np.isin(self.records["status"], codes) & ((self.records["flags"] & _HAS_STATUS) > 0)
+        if not p:
+            rows |= (self.records["flags"] & _HAS_STATUS) == 0
+        return np.flatnonzero(rows)
+
+    # ---- activity ----
+    def activity_count(self, i: int) -> int:
+        return int(self.records[i]["act_count"])
+
+    def activity(self, i: int) -> List[Dict[str,Any]]:
+        r = self.records[i]
+        return json.loads(self._bytes(r["act_off"], r["act_len"], True)) if r["act_len"] else []
+
+    def raw_activity(self, task_id, compressed: bool) -> Tuple[bytes, int] | None:
+        """Activity blob of `task_id` encoded for a pack with/without compression, without parsing it."""
+        i = self.row_of(task_id)
+        if i is None or not self.records[i]["act_len"]:
+            return None
+        r = self.records[i]
+        data = self._mm[int(r["act_off"]):int(r["act_off"]) + int(r["act_len"])]
+        if compressed != self.compressed:
+            data = zlib.compress(data, 6) if compressed else zlib.decompress(data)
+        return data, int(r["act_count"])
+
+
+def export_json(path: str, tasks: Iterable[Mapping[str,Any]]):
+    """Stream `tasks` to `path` in the tasks.json layout (same bytes as json.dump(..., indent=2))."""
+    def write(f):
+        f.write("[")
+        first = True
+        for t in tasks:
+            f.write(("\n" if first else ",\n") + "  " + json.dumps(t, indent=2).replace("\n", "\n  "))
+            first = False
+        f.write("\n]" if not first else "]")
+    atomic_write(path, write)
+
+
+def convert_json(json_path: str, pack_path: str, compress: bool = False) -> int:
+    """tasks.json (activity nested or not) -> pack. Returns the number of tasks written.
+
+    Activity the JSON backend moved out to `activity/` goes into the pack too,
+    unless the pack is in the same directory: PackedStore reads that log itself.
+    """
+    shared = os.path.dirname(os.path.abspath(json_path)) == os.path.dirname(os.path.abspath(pack_path))
+    tasks = load_tasks_json(json_path, logged=not shared)
+    write_pack(pack_path, tasks, compress)
+    return len(tasks)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Callable
+from collections import deque
+from functools import wraps
+import io, os, json, time, pstats, cProfile, threading
+
+# Spans: (name, started epoch, duration ms, thread name) in a bounded ring
+# buffer, so recording is an append and memory stays flat. Counters are
+# plain running totals. Set TASKPILOT_PERF=0 to turn both off, and
+# TASKPILOT_PERF_LOG=<path> to also append every span to a JSON lines file.
+
+ENABLED = os.getenv("TASKPILOT_PERF", "1") != "0"
+BUFFER = int(os.getenv("TASKPILOT_PERF_BUFFER", "5000"))
+LOG_PATH = os.getenv("TASKPILOT_PERF_LOG") or None
+
+_spans: deque = deque(maxlen=BUFFER)
+_counters: Dict[str, float] = {}
+_counter_lock = threading.Lock()
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def _record(name: str, start: float, ms: float):
+    entry = (name, start, ms, threading.current_thread().name)
+    _spans.append(entry)
+    if LOG_PATH:
+        _log(entry)
+
+
+def _log(entry):
+    global _log_file
+    line = json.dumps({"name": entry[0], "at": entry[1], "ms": round(entry[2], 3), "thread": entry[3]}) + "\n"
+    with _log_lock:
+        if _log_file is None:
+            d = os.path.dirname(LOG_PATH)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            _log_file = open(LOG_PATH, "a", buffering=1)
+        _log_file.write(line)
+
+
+class span:
+    """`with span("name"):` records how long the block took (also when it raises)."""
+    __slots__ = ("name", "_t", "_at")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._at = time.time()
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            _record(self.name, self._at, (time.perf_counter() - self._t) * 1000)
+
+
+def timed(fn: Callable | None = None, name: str | None = None):
+    """Decorator recording a span per call, named `<module>.<function>` by default."""
+    def wrap(f):
+        label = name or f"{f.__module__.rsplit('.', 1)[-1]}.{f.__name__}"
+        @wraps(f)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return f(*args, **kwargs)
+            at, t = time.time(), time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _record(label, at, (time.perf_counter() - t) * 1000)
+        return inner
+    return wrap(fn) if fn is not None else wrap
+
+
+def record(name: str, ms: float):
+    """Record a span measured elsewhere (e.g. across a generator's yields) that just ended."""
+    if ENABLED:
+        _record(name, time.time() - ms / 1000, ms)
+
+
+def incr(name: str, n: float = 1):
+    if ENABLED:
+        with _counter_lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+# ---------- page runs ----------
+# Streamlit has no end-of-run hook, so pages call page_begin() first and
+# page_end() last. A run cut short by st.stop()/st.rerun() never reaches
+# page_end(); the next page_begin() on that thread discards it.
+
+PROFILE = os.getenv("TASKPILOT_PROFILE", "0") == "1"
+PROFILES_KEPT = 20
+_profiles: deque = deque(maxlen=PROFILES_KEPT)
+_page = threading.local()
+
+
+def set_profiling(on: bool):
+    global PROFILE
+    PROFILE = bool(on)
+
+
+def page_begin(name: str):
+    _discard_page()
+    prof = None
+    if PROFILE:
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:      # another profiler is already active on this thread
+            prof = None
+    _page.run = (name, time.time(), time.perf_counter(), prof)
+
+
+def page_end():
+    run = getattr(_page, "run", None)
+    if run is None:
+        return
+    _page.run = None
+    name, at, t, prof = run
+    ms = (time.perf_counter() - t) * 1000
+    if prof is not None:
+        prof.disable()
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(40)
+        _profiles.append({"page": name, "at": at, "ms": ms, "stats": out.getvalue()})
+    if ENABLED:
+        _record(f"page.{name}", at, ms)
+
+
+def _discard_page():
+    run = getattr(_page, "run", None)
+    if run is not None and run[3] is not None:
+        run[3].disable()
+    _page.run = None
+
+
+# ---------- reading it back ----------
+
+def spans(prefix: str = "") -> List[tuple]:
+    return [s for s in list(_spans) if s[0].startswith(prefix)]
+
+
+def counters() -> Dict[str, float]:
+    with _counter_lock:
+        return dict(_counters)
+
+
+def profiles() -> List[Dict[str,Any]]:
+    return list(_profiles)
+
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q * (len(sorted_ms) - 1))))]
+
+
+def summary(prefix: str = "") -> List[Dict[str,Any]]:
+    """Per span name: count, p50/p95/max and total ms over what is in the buffer, slowest p95 first."""
+    by_name: Dict[str, List[float]] = {}
+    for name, _, ms, _ in spans(prefix):
+        by_name.setdefault(name, []).append(ms)
+    rows = []
+    for name, ms in by_name.items():
+        ms.sort()
+        rows.append({"name": name, "count": len(ms), "p50_ms": _pct(ms, 0.5), "p95_ms": _pct(ms, 0.95),
+                     "max_ms": ms[-1], "total_ms": sum(ms)})
+    rows.sort(key=lambda r: -r["p95_ms"])
+    return rows
+
+
+def export_jsonl(prefix: str = "") -> str:
+    return "".join(json.dumps({"name": n, "at": at, "ms": round(ms, 3), "thread": th}) + "\n"
+                   for n, at, ms, th in spans(prefix))
+
+
+def reset():
+    _spans.clear()
+    _profiles.clear()
+    with _counter_lock:
+        _counters.clear()
@@ -0,0 +1,236 @@
+from __future__ import annotations
+from typing import List, Dict, Tuple, Iterable, Callable
+from collections import Counter
+import os, re, json, math, heapq, pickle, threading
+from .durable import FileLock, atomic_write
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its of on or our so that the
+their then there these this to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _TOKEN_RE.findall((text or "").lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+class InvertedIndex:
+    """In-memory inverted index with BM25 ranking.
+
+    Documents only ever grow (new activity is appended to the task's
+    document) or disappear, so updates touch just the new tokens.
+    """
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, doc: str, text: str):
+        toks = tokenize(text)
+        if not toks and doc in self.doc_len:
+            return
+        for term, tf in Counter(toks).items():
+            p = self.postings.get(term)
+            if p is None:
+                p = self.postings[term] = {}
+            p[doc] = p.get(doc, 0) + tf
+        self.doc_len[doc] = self.doc_len.get(doc, 0) + len(toks)
+        self.total_len += len(toks)
+
+    def remove(self, doc: str, text: str | None = None):
+        """Drop `doc`. Given everything that was added under it as `text`,
+        only its own terms are visited instead of the whole vocabulary."""
+        n = self.doc_len.pop(doc, None)
+        if n is None:
+            return
+        self.total_len -= n
+        terms = set(tokenize(text)) if text is not None else [t for t, p in self.postings.items() if doc in p]
+        for term in terms:
+            p = self.postings.get(term)
+            if p is None or p.pop(doc, None) is None:
+                continue
+            if not p:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        terms = set(tokenize(query))
+        n = len(self.doc_len)
+        if not terms or not n:
+            return []
+        avg = self.total_len / n or 1.0
+        k1, b = self.k1, self.b
+        dl = self.doc_len
+        scores: Dict[str, float] = {}
+        for term in terms:
+            p = self.postings.get(term)
+            if not p:
+                continue
+            idf = math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for doc, tf in p.items():
+                norm = k1 * (1 - b + b * dl[doc] / avg)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+
+
+class SearchIndex:
+    """InvertedIndex persisted next to the task store.
+
+    `index.pkl` is a snapshot; `journal.jsonl` holds the add/remove ops
+    since. Writers only append to the journal, so indexing a new task or
+    activity line is O(its tokens). Readers replay journal entries written
+    by other processes before answering, and the journal is folded into a
+    fresh snapshot once it grows past `compact_every` ops.
+    """
+
+    def __init__(self, root: str, compact_every: int = 5000):
+        self.root = root
+        self.snap_path = os.path.join(root, "index.pkl")
+        self.journal_path = os.path.join(root, "journal.jsonl")
+        self.compact_every = compact_every
+        self._flock = FileLock(os.path.join(root, "index"))
+        self._lock = threading.RLock()
+        self.index: InvertedIndex | None = None
+        self._gen = None
+        self._offset = 0
+        self._ops = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snap_path)
+
+    # ---- persistence ----
+    def _journal_gen(self):
+        try:
+            with open(self.journal_path, "rb") as f:
+                head = f.readline()
+            return json.loads(head).get("gen") if head else None
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _replay(self):
+        try:
+            size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return
+        if size <= self._offset:
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b"\n") + 1        # ignore a half-written last line
+        for line in chunk[:end].splitlines():
+            op = json.loads(line)
+            if "gen" in op:
+                continue
+            if op[0] == "add":
+                self.index.add(op[1], op[2])
+            elif op[0] == "del":
+                self.index.remove(*op[1:])
+            self._ops += 1
+        self._offset += end
+
+    def _load(self):
+        with open(self.snap_path, "rb") as f:
+            self._gen, self.index = pickle.load(f)
+        self._offset = 0
+        self._ops = 0
+        if self._journal_gen() == self._gen:
+            self._replay()
+
+    def _write_snapshot(self):
+        gen = (self._gen or 0) + 1
+        atomic_write(self.snap_path, lambda f: pickle.dump((gen, self.index), f, protocol=pickle.HIGHEST_PROTOCOL), "wb")
+        header = (json.dumps({"gen": gen}) + "\n").encode()
+        atomic_write(self.journal_path, lambda f: f.write(header), "wb")
+        self._gen, self._offset, self._ops = gen, len(header), 0
+
+    def version(self):
+        """Moves whenever the index on disk changes (a new snapshot or a journal append)."""
+        try:
+            return self._journal_gen(), os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return None
+
+    def build(self, docs: Iterable[Tuple[str, str]]):
+        """Rebuild from scratch out of (doc_id, text) pairs; text for one doc may repeat."""
+        idx = InvertedIndex()
+        for doc, text in docs:
+            idx.add(doc, text)
+        with self._lock, self._flock:
+            self.index = idx
+            self._write_snapshot()
+
+    def refresh(self):
+        """Bring the in-memory index up to date with the files on disk."""
+        with self._lock:
+            if self.index is None or self._journal_gen() != self._gen:
+                self._load()
+            else:
+                self._replay()
+
+    def compact(self):
+        with self._lock, self._flock:
+            self.refresh()
+            self._write_snapshot()
+
+    # ---- updates ----
+    def _append(self, ops: List[list]):
+        if not ops or not self.exists():
+            # Not built yet: the first search builds it from the store.
+            return
+        data = "".join(json.dumps(op) + "\n" for op in ops).encode()
+        with self._lock, self._flock:
+            if self.index is not None:
+                self.refresh()
+            with open(self.journal_path, "ab") as f:
+                f.write(data)
+            if self.index is not None:
+                for op in ops:
+                    if op[0] == "add":
+                        self.index.add(op[1], op[2])
+                    else:
+                        self.index.remove(*op[1:])
+                self._offset += len(data)
+                self._ops += len(ops)
+                if self._ops >= self.compact_every:
+                    self._write_snapshot()
+
+    def add(self, doc: str, text: str):
+        self.add_many([(doc, text)])
+
+    def add_many(self, docs: Iterable[Tuple[str, str]]):
+        self._append([["add", d, t] for d, t in docs if t])
+
+    def remove(self, doc: str, text: str | None = None):
+        self.remove_many([(doc, text)])
+
+    def remove_many(self, docs: Iterable[Tuple[str, str | None]]):
+        self._append([["del", d] if t is None else ["del", d, t] for d, t in docs])
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        with self._lock:
+            self.refresh()
+            return self.index.search(query, limit)
+
+
+def task_text(t) -> str:
+    return f"{t.get('title') or ''}\n{t.get('description') or ''}"
+
+
+def ensure_built(index: SearchIndex, tasks: Callable[[], Iterable], activity: Callable[[str], Iterable]):
+    """Build the index from the store on first use."""
+    if index.exists():
+        return
+    def docs():
+        for t in tasks():
+            tid = t.get("id")
+            yield tid, task_text(t)
+            for a in activity(tid):
+                yield tid, a.get("text") or ""
+    index.build(docs())
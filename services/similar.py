@@ -0,0 +1,361 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Mapping, Tuple, TYPE_CHECKING
+from functools import lru_cache
+import os, json, zlib, logging, threading
+from .durable import FileLock, atomic_write
+from .search import tokenize
+from .temporal import is_closed
+from .task_manager import list_tasks, get_tasks, iter_activity, subscribe
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SIMILAR_DIR = os.path.join("data", "similar")
+DIM = int(os.getenv("TASKPILOT_SIMILAR_DIM", "128"))
+ACTIVITY_LINES = 50       # newest activity entries embedded per task
+MIN_SCORE = 0.2
+
+
+@lru_cache(maxsize=1 << 17)
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    # crc32 is stable across processes (unlike hash()), so stored vectors stay valid.
+    h = zlib.crc32(feature.encode())
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+
+def embed(texts: Iterable[str], dim: int = DIM) -> np.ndarray:
+    """Signed feature hashing of unigrams + bigrams, log-tf weighted, L2-normalised rows."""
+    import numpy as np
+    texts = list(texts)
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    rows: List[int] = []
+    cols: List[int] = []
+    vals: List[float] = []
+    for i, text in enumerate(texts):
+        toks = tokenize(text)
+        counts: Dict[str, int] = {}
+        for f in toks + [a + " " + b for a, b in zip(toks, toks[1:])]:
+            counts[f] = counts.get(f, 0) + 1
+        for f, tf in counts.items():
+            c, sign = _bucket(f, dim)
+            rows.append(i)
+            cols.append(c)
+            vals.append(sign * (1.0 + np.log(tf)))
+    if rows:
+        np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(vals, dtype=np.float32))
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+class VectorIndex:
+    """Unit vectors of closed tasks in one growable NumPy matrix.
+
+    `vectors.f32` is an append-only array of rows and `ids.jsonl` says which
+    task each row belongs to (["add", id]) or that a task's rows are dead
+    (["del", id]); re-adding a task appends a fresh row. Other processes'
+    appends are picked up by reading past the last offset seen, and the
+    files are rewritten without dead rows once those outnumber live ones.
+    """
+
+    def __init__(self, root: str, dim: int = DIM):
+        self.root = root
+        self.dim = dim
+        self.vec_path = os.path.join(root, "vectors.f32")
+        self.ids_path = os.path.join(root, "ids.jsonl")
+        self._flock = FileLock(os.path.join(root, "index"))
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset(None)
+
+    def _reset(self, gen):
+        self._gen = gen
+        self._offset = 0
+        # Allocated by the first row, so opening the index doesn't import NumPy.
+        self._mat: np.ndarray | None = None
+        self._live: np.ndarray | None = None
+        self._n = 0
+        self.row_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.ids_path)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, task_id):
+        return task_id in self.rows
+
+    # ---- in-memory ----
+    def _grow(self, n: int):
+        if self._mat is not None and n <= len(self._mat):
+            return
+        import numpy as np
+        cap = 1024 if self._mat is None else len(self._mat)
+        while cap < n:
+            cap *= 2
+        mat = np.zeros((cap, self.dim), dtype=np.float32)
+        live = np.zeros(cap, dtype=bool)
+        if self._n:
+            mat[: self._n] = self._mat[: self._n]
+            live[: self._n] = self._live[: self._n]
+        self._mat, self._live = mat, live
+
+    def _apply(self, ops: List[list], vecs: np.ndarray):
+        k = 0
+        for op in ops:
+            tid = op[1]
+            old = self.rows.pop(tid, None)
+            if old is not None:
+                self._live[old] = False
+            if op[0] == "add":
+                self._grow(self._n + 1)
+                self._mat[self._n] = vecs[k]
+                self._live[self._n] = True
+                self.rows[tid] = self._n
+                self.row_ids.append(tid)
+                self._n += 1
+                k += 1
+
+    # ---- persistence ----
+    def _header(self):
+        try:
+            with open(self.ids_path, "rb") as f:
+                return json.loads(f.readline() or b"null")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _header_gen(self):
+        head = self._header()
+        return head.get("gen") if head else None
+
+    def _replay(self):
+        try:
+            size = os.path.getsize(self.ids_path)
+        except FileNotFoundError:
+            return
+        if size <= self._offset:
+            return
+        import numpy as np
+        with open(self.ids_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        end = chunk.rfind(b"\n") + 1        # ignore a half-written last line
+        ops = [json.loads(line) for line in chunk[:end].splitlines()]
+        if ops and isinstance(ops[0], dict):
+            ops = ops[1:]
+        adds = sum(1 for op in ops if op[0] == "add")
+        vecs = np.fromfile(self.vec_path, dtype=np.float32, count=adds * self.dim,
+                           offset=self._n * self.dim * 4).reshape(adds, self.dim)
+        self._apply(ops, vecs)
+        self._offset += end
+
+    def refresh(self):
+        """Bring the in-memory matrix up to date with the files on disk."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.ids_path)
+            except FileNotFoundError:
+                return
+            if self._loaded and size == self._offset and self._header_gen() == self._gen:
+                return
+            # Writers hold the file lock across both files, so take it to
+            # read rows and ids that belong together.
+            with self._flock:
+                head = self._header()
+                if head is None:
+                    return
+                if not self._loaded or head.get("gen") != self._gen:
+                    self._reset(head.get("gen"))
+                self._replay()
+                self._loaded = True
+
+    def _write(self, ids: List[str], mat: np.ndarray):
+        import numpy as np
+        gen = max(self._gen or 0, self._header_gen() or 0) + 1
+        header = {"gen": gen, "dim": self.dim}
+        lines = [json.dumps(header)] + [json.dumps(["add", tid]) for tid in ids]
+        atomic_write(self.vec_path, lambda f: f.write(np.ascontiguousarray(mat, dtype=np.float32).tobytes()), "wb")
+        atomic_write(self.ids_path, lambda f: f.write(("\n".join(lines) + "\n").encode()), "wb")
+        self._reset(gen)
+        self._replay()
+        self._loaded = True
+
+    def build(self, docs: Iterable[Tuple[str, str]], batch: int = 5000):
+        import numpy as np
+        ids: List[str] = []
+        parts: List[np.ndarray] = []
+        buf: List[Tuple[str, str]] = []
+        for doc in docs:
+            buf.append(doc)
+            if len(buf) >= batch:
+                ids += [d for d, _ in buf]
+                parts.append(embed([t for _, t in buf], self.dim))
+                buf = []
+        if buf:
+            ids += [d for d, _ in buf]
+            parts.append(embed([t for _, t in buf], self.dim))
+        mat = np.concatenate(parts) if parts else np.zeros((0, self.dim), dtype=np.float32)
+        with self._lock, self._flock:
+            self._write(ids, mat)
+
+    def compact(self):
+        import numpy as np
+        with self._lock, self._flock:
+            self.refresh()
+            self._grow(self._n)
+            live = np.flatnonzero(self._live[: self._n])
+            self._write([self.row_ids[i] for i in live], self._mat[live])
+
+    # ---- updates ----
+    def upsert_many(self, docs: Iterable[Tuple[str, str]]):
+        docs = list(docs)
+        if docs:
+            self._append([["add", d] for d, _ in docs], embed([t for _, t in docs], self.dim))
+
+    def remove_many(self, task_ids: Iterable[str]):
+        import numpy as np
+        self._append([["del", tid] for tid in task_ids], np.zeros((0, self.dim), dtype=np.float32))
+
+    def _append(self, ops: List[list], vecs: np.ndarray):
+        if not ops or not self.exists():
+            # Not built yet: the first lookup builds it from the store.
+            return
+        with self._lock, self._flock:
+            self.refresh()
+            ops = [op for op in ops if op[0] == "add" or op[1] in self.rows]
+            if not ops:
+                return
+            with open(self.vec_path, "r+b") as f:
+                # Drop rows a crashed writer appended without their ids.
+                f.truncate(self._n * self.dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(vecs.tobytes())
+            data = "".join(json.dumps(op) + "\n" for op in ops).encode()
+            with open(self.ids_path, "ab") as f:
+                f.write(data)
+            self._apply(ops, vecs)
+            self._offset += len(data)
+            if self._n > 1024 and self._n > 2 * len(self.rows):
+                self.compact()
+
+    # ---- lookups ----
+    def query(self, vecs: np.ndarray, k: int = 5, exclude: Iterable[str] = ()) -> List[List[Tuple[str, float]]]:
+        """Top-k (task_id, cosine) for each row of `vecs`, in one matrix product."""
+        import numpy as np
+        with self._lock:
+            self.refresh()
+            n = self._n
+            if not n or not len(vecs):
+                return [[] for _ in range(len(vecs))]
+            scores = vecs @ self._mat[:n].T            # (q, n)
+            scores[:, ~self._live[:n]] = -np.inf
+            for tid in exclude:
+                r = self.rows.get(tid)
+                if r is not None:
+                    scores[:, r] = -np.inf
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            out = []
+            for qi, cand in enumerate(top):
+                cand = cand[np.argsort(-scores[qi, cand])]
+                out.append([(self.row_ids[c], float(scores[qi, c])) for c in cand if np.isfinite(scores[qi, c])])
+            return out
+
+
+def task_doc(t: Mapping[str,Any]) -> str:
+    acts = iter_activity(t["id"], limit=ACTIVITY_LINES)
+    # Title twice: it is the most telling part of a short ticket.
+    return "\n".join([t.get("title") or "", t.get("title") or "", t.get("description") or ""]
+                     + [a.get("text") or "" for a in acts])
+
+
+_index: VectorIndex | None = None
+_index_lock = threading.Lock()
+
+def _vectors() -> VectorIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(SIMILAR_DIR)
+    return _index
+
+_build_lock = threading.Lock()
+
+def _built(idx: VectorIndex) -> bool:
+    head = idx._header() if idx.exists() else None
+    return head is not None and head.get("dim") == idx.dim
+
+def _ensure_built() -> VectorIndex:
+    idx = _vectors()
+    if not _built(idx):
+        with _build_lock:
+            if not _built(idx):
+                idx.build((t["id"], task_doc(t)) for t in list_tasks(include_archived=True) if is_closed(t.get("status")))
+    return idx
+
+def ready() -> bool:
+    """Whether lookups can run without building the index first."""
+    return _built(_vectors())
+
+def warm():
+    """Start building the index on a background thread, unless it is built or being built."""
+    if ready() or _build_lock.locked():
+        return
+    def run():
+        try:
+            _ensure_built()
+        except Exception:
+            logging.getLogger(__name__).exception("building the similar-task index failed")
+    threading.Thread(target=run, name="taskpilot-similar-build", daemon=True).start()
+
+
+def similar_tasks(task: Mapping[str,Any], k: int = 5, min_score: float = MIN_SCORE) -> List[Dict[str,Any]]:
+    """Closed tasks most like `task`, best first, with how each one ended."""
+    idx = _ensure_built()
+    q = embed([task_doc(task)], idx.dim)
+    hits = [(tid, s) for tid, s in idx.query(q, k, exclude=[task["id"]])[0] if s >= min_score]
+    found = {t["id"]: t for t in get_tasks([tid for tid, _ in hits])}
+    out = []
+    for tid, score in hits:
+        t = found.get(tid)
+        if t is None:
+            continue
+        last = iter_activity(tid, limit=1)
+        out.append({"id": tid, "title": t.get("title"), "status": t.get("status"),
+                    "completed_at": t.get("completed_at"), "score": score,
+                    "resolution": last[0].get("text") if last else ""})
+    return out
+
+
+def similar_text(similar: List[Dict[str,Any]]) -> str:
+    lines = []
+    for s in similar:
+        when = f", closed {str(s['completed_at'])[:10]}" if s.get("completed_at") else ""
+        res = " ".join((s.get("resolution") or "").split())[:300]
+        lines.append(f"- {s['title']} ({s['id']}{when})" + (f": {res}" if res else ""))
+    return "\n".join(lines)
+
+
+def _on_change(event: str, task_ids: List[str]):
+    idx = _vectors()
+    if not idx.exists() or event == "archive":
+        # Archived tasks are closed and unchanged; their vectors stay as they are.
+        return
+    if event == "delete":
+        idx.remove_many(task_ids)
+        return
+    if event == "activity":
+        # Only closed tasks are indexed; a late note on one refreshes its vector.
+        idx.refresh()
+        task_ids = [tid for tid in task_ids if tid in idx]
+        if not task_ids:
+            return
+    tasks = get_tasks(task_ids)
+    idx.upsert_many((t["id"], task_doc(t)) for t in tasks if is_closed(t.get("status")))
+    if event == "status":
+        idx.remove_many(t["id"] for t in tasks if not is_closed(t.get("status")))
+
+subscribe(_on_change)
@@ -0,0 +1,805 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Iterator, Callable, TYPE_CHECKING
+from contextlib import contextmanager
+from itertools import islice
+import os, re, json, logging, sqlite3, threading, argparse
+from .durable import FileLock, GroupCommit, atomic_write, atomic_write_json
+from .activity_log import ActivityLog, load_tasks_json
+from .perf import incr
+
+if TYPE_CHECKING:
+    from .packfile import PackReader
+# packfile (and NumPy with it) is imported by PackedStore and the pack/unpack
+# commands only, so the SQLite and JSON stores open without it.
+
+# Columns that live in their own SQLite column/table; anything else a task
+# carries is round-tripped through the `extra` JSON column.
+_CORE = ("id", "title", "description", "status", "created_at", "completed_at", "due_days")
+_NESTED = ("activity", "tags")
+_ID_RE = re.compile(r"^TASK-(\d+)$")
+# query() sort names -> (column, descending)
+SORTS = {
+    "newest": ("created_at", True),
+    "oldest": ("created_at", False),
+    "title": ("title", False),
+    "status": ("status", False),
+}
+
+
+def _next_id_after(ids: Iterable[str]) -> int:
+    # Seed the allocator above every existing TASK-<n>, including the legacy
+    # timestamp-derived ones, so allocated ids never collide with old data.
+    hi = 0
+    for i in ids:
+        m = _ID_RE.match(str(i or ""))
+        if m:
+            hi = max(hi, int(m.group(1)))
+    return hi + 1
+
+
+def _apply_fields(t: Dict[str,Any], fields: Dict[str,Any], drop: Iterable[str], defaults: Dict[str,Any] | None):
+    for k, v in (defaults or {}).items():
+        if not t.get(k):
+            t[k] = v
+    t.update(fields)
+    for k in drop:
+        t.pop(k, None)
+
+
+class JsonStore:
+    """Whole-file JSON backend (the original data/tasks.json layout).
+
+    Every write is a locked read-modify-write followed by an atomic rename, so
+    concurrent sessions don't lose each other's updates and a crash mid-write
+    leaves the previous file intact. With `group_commit_ms` set, mutations
+    arriving within that window share one load/save cycle.
+    """
+    name = "json"
+
+    def __init__(self, path: str, group_commit_ms: float = 0):
+        self.path = path
+        self._lock = FileLock(path)
+        self._group = GroupCommit(self._apply, group_commit_ms / 1000.0) if group_commit_ms else None
+        self.activity = ActivityLog(os.path.join(os.path.dirname(path), "activity"))
+        self._checked = False
+        self._load()
+
+    def _ensure(self):
+        if not os.path.exists(self.path):
+            with self._lock:
+                if not os.path.exists(self.path):
+                    atomic_write_json(self.path, [])
+
+    def _load(self) -> List[Dict[str,Any]]:
+        self._ensure()
+        with open(self.path) as f:
+            incr("store.bytes_read", os.fstat(f.fileno()).st_size)
+            tasks = json.load(f)
+        if not self._checked:
+            self._checked = True
+            if any("activity" in t for t in tasks):
+                self._mutate(self._move_activity)
+                return self._load()
+        return tasks
+
+    def _move_activity(self, tasks: List[Dict[str,Any]]):
+        # Older files nest activity inside each task; move it to the per-task log.
+        # A log that is already as long holds these entries (a move cut short
+        # by a crash); a shorter one is superseded, e.g. by a file written with
+        # `storage unpack`, which nests the log's entries too. Tasks sharing a
+        # legacy id share a log, so their entries are kept together.
+        nested: Dict[str, list] = {}
+        for t in tasks:
+            acts = t.pop("activity", None)
+            if acts:
+                nested.setdefault(t.get("id"), []).extend(acts)
+        for tid, acts in nested.items():
+            if len(acts) > self.activity.count(tid):
+                self.activity.delete(tid)
+                self.activity.append_many(tid, acts)
+
+    def _save(self, tasks: List[Dict[str,Any]]):
+        atomic_write_json(self.path, tasks, indent=2)
+        incr("store.bytes_written", os.path.getsize(self.path))
+
+    def _apply(self, mutations: List[Callable]) -> List[Any]:
+        with self._lock:
+            tasks = self._load()
+            results = []
+            for m in mutations:
+                try:
+                    results.append(m(tasks))
+                except Exception as e:
+                    results.append(e)
+            self._save(tasks)
+        return results
+
+    def _mutate(self, fn: Callable[[List[Dict[str,Any]]], Any]):
+        if self._group:
+            return self._group.submit(fn)
+        r = self._apply([fn])[0]
+        if isinstance(r, BaseException):
+            raise r
+        return r
+
+    def version(self):
+        # Cheap change token: any rewrite of the file moves mtime and/or size.
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def all(self, with_description: bool = True) -> List[Dict[str,Any]]:
+        return self._load()
+
+    def iter_all(self, batch: int = 1000) -> Iterator[List[Dict[str,Any]]]:
+        """Every task in store order, `batch` at a time. The JSON file is read whole."""
+        tasks = self._load()
+        for i in range(0, len(tasks), batch):
+            yield tasks[i:i + batch]
+
+    def activity_many(self, task_ids: Iterable[str]) -> Dict[str, List[Dict[str,Any]]]:
+        """Full activity of each task, oldest first."""
+        return {tid: self.iter_activity(tid, limit=None)[::-1] for tid in task_ids}
+
+    def get(self, task_id: str) -> Dict[str,Any] | None:
+        for t in self._load():
+            if t.get("id") == task_id:
+                return t
+        return None
+
+    def get_many(self, task_ids: Iterable[str]) -> List[Dict[str,Any]]:
+        ids = set(task_ids)
+        return [t for t in self._load() if t.get("id") in ids]
+
+    def by_status(self, prefix: str) -> List[Dict[str,Any]]:
+        p = (prefix or "").lower()
+        return [t for t in self._load() if (t.get("status") or "").lower().startswith(p)]
+
+    def insert(self, task: Dict[str,Any]):
+        self.insert_many([task])
+
+    def insert_many(self, new: Iterable[Dict[str,Any]]):
+        rows = []
+        for t in new:
+            t = dict(t)
+            acts = t.pop("activity", None)
+            if acts:
+                self.activity.append_many(t.get("id"), acts)
+            rows.append(t)
+        self._mutate(lambda tasks: tasks.extend(rows))
+
+    def update(self, task_id: str, fields: Dict[str,Any], drop: Iterable[str] = (), defaults: Dict[str,Any] | None = None):
+        self.update_many([task_id], fields, drop, defaults)
+
+    def update_many(self, task_ids: Iterable[str], fields: Dict[str,Any], drop: Iterable[str] = (), defaults: Dict[str,Any] | None = None):
+        ids = set(task_ids)
+        drop = tuple(drop)
+        def fn(tasks):
+            for t in tasks:
+                if t.get("id") in ids:
+                    _apply_fields(t, fields, drop, defaults)
+        self._mutate(fn)
+
+    def allocate_ids(self, n: int) -> List[int]:
+        seq_path = self.path + ".seq"
+        with self._lock:
+            try:
+                with open(seq_path) as f:
+                    start = int(f.read().strip())
+            except (FileNotFoundError, ValueError):
+                start = _next_id_after(t.get("id") for t in self._load())
+            atomic_write(seq_path, lambda f: f.write(str(start + n)))
+        return list(range(start, start + n))
+
+    def append_activity(self, task_id: str, entry: Dict[str,Any]):
+        self.activity.append(task_id, entry)
+
+    def append_activity_many(self, entries: Iterable[tuple]):
+        by_task: Dict[str, list] = {}
+        for task_id, entry in entries:
+            by_task.setdefault(task_id, []).append(entry)
+        for task_id, acts in by_task.items():
+            self.activity.append_many(task_id, acts)
+
+    def iter_activity(self, task_id: str, before: int | None = None, limit: int | None = 20):
+        return self.activity.page(task_id, before, limit)
+
+    def activity_count(self, task_id: str) -> int:
+        return self.activity.count(task_id)
+
+    def delete(self, task_id: str):
+        self.delete_many([task_id])
+
+    def delete_many(self, task_ids: Iterable[str]):
+        ids = set(task_ids)
+        def fn(tasks):
+            tasks[:] = [t for t in tasks if t.get("id") not in ids]
+        self._mutate(fn)
+        for task_id in ids:
+            self.activity.delete(task_id)
+
+
+class PackedStore(JsonStore):
+    """The JSON store's semantics on a compact, memory-mapped pack file (see packfile.py).
+
+    Reads map the file and decode only the tasks they touch, so opening a
+    large store costs the record index, not a parse of every task. Writes
+    are the same locked whole-file rewrite as JsonStore; descriptions are
+    re-encoded but activity blobs are copied across as-is. Activity that
+    came with the pack (or with inserted tasks) is read from it, and anything
+    appended later goes to the per-task ActivityLog, numbered after the
+    packed entries.
+    `compress=None` keeps whatever the existing file uses.
+    """
+    name = "packed"
+
+    def __init__(self, path: str, group_commit_ms: float = 0, compress: bool | None = None):
+        self.path = path
+        self.compress = compress
+        self._lock = FileLock(path)
+        self._group = GroupCommit(self._apply, group_commit_ms / 1000.0) if group_commit_ms else None
+        self.activity = ActivityLog(os.path.join(os.path.dirname(path), "activity"))
+        self._reader: PackReader | None = None
+        self._reader_version = None
+        self._ensure()
+
+    def _ensure(self):
+        if not os.path.exists(self.path):
+            from .packfile import write_pack
+            with self._lock:
+                if not os.path.exists(self.path):
+                    write_pack(self.path, [], bool(self.compress))
+
+    def _open(self) -> PackReader:
+        self._ensure()
+        v = self.version()
+        r = self._reader
+        if r is None or self._reader_version != v:
+            from .packfile import PackReader
+            r = PackReader(self.path)
+            self._reader, self._reader_version = r, v
+        return r
+
+    def _load(self) -> List[Dict[str,Any]]:
+        return list(self._open().tasks())
+
+    def _save(self, tasks: List[Dict[str,Any]]):
+        from .packfile import write_pack
+        old = self._open()
+        compress = old.compressed if self.compress is None else self.compress
+        write_pack(self.path, tasks, compress, old.raw_activity)
+
+    def insert_many(self, new: Iterable[Dict[str,Any]]):
+        # Unlike JsonStore, nested activity stays with the task, in the pack.
+        # Re-inserting an id replaces the packed copy.
+        rows = [{**t, "activity": list(t.get("activity") or [])} for t in new]
+        ids = {t.get("id") for t in rows}
+        def fn(tasks):
+            tasks[:] = [t for t in tasks if t.get("id") not in ids] + rows
+        self._mutate(fn)
+
+    def all(self, with_description: bool = True) -> List[Dict[str,Any]]:
+        return list(self._open().tasks(with_description))
+
+    def iter_all(self, batch: int = 1000) -> Iterator[List[Dict[str,Any]]]:
+        it = self._open().tasks()
+        while True:
+            chunk = list(islice(it, batch))
+            if not chunk:
+                return
+            yield chunk
+
+    def count(self) -> int:
+        return len(self._open())
+
+    def descriptions(self, task_ids: Iterable[str]) -> Dict[str,str]:
+        r = self._open()
+        out = {}
+        for tid in task_ids:
+            i = r.row_of(tid)
+            if i is not None:
+                out[tid] = r.description(i)
+        return out
+
+    def get(self, task_id: str) -> Dict[str,Any] | None:
+        r = self._open()
+        i = r.row_of(task_id)
+        return None if i is None else r.task(i)
+
+    def present(self, task_ids: Iterable[str]) -> List[str]:
+        """Those of `task_ids` that are in the pack, found through the id index without decoding a task."""
+        r = self._open()
+        return [i for i in task_ids if r.row_of(i) is not None]
+
+    def get_many(self, task_ids: Iterable[str]) -> List[Dict[str,Any]]:
+        r = self._open()
+        rows = sorted({i for i in map(r.row_of, task_ids) if i is not None})
+        return [r.task(i) for i in rows]
+
+    def by_status(self, prefix: str) -> List[Dict[str,Any]]:
+        r = self._open()
+        return [r.task(int(i)) for i in r.status_rows(prefix)]
+
+    def _packed_activity(self, task_id: str):
+        r = self._open()
+        i = r.row_of(task_id)
+        return (r, i, r.activity_count(i)) if i is not None else (r, None, 0)
+
+    def activity_count(self, task_id: str) -> int:
+        return self._packed_activity(task_id)[2] + self.activity.count(task_id)
+
+    def iter_activity(self, task_id: str, before: int | None = None, limit: int | None = 20):
+        r, i, base = self._packed_activity(task_id)
+        logged = self.activity.count(task_id)
+        hi = base + logged if before is None else max(0, min(int(before), base + logged))
+        lo = 0 if limit is None else max(0, hi - limit)
+        out = []
+        if hi > base:
+            out = [{**e, "seq": e["seq"] + base}
+                   for e in self.activity.page(task_id, hi - base, (hi - max(lo, base)))]
+        if lo < base:
+            packed = r.activity(i)
+            out += [{**packed[s], "seq": s} for s in range(min(hi, base) - 1, lo - 1, -1)]
+        return out
+
+    def export_json(self, json_path: str, activity: bool = True) -> int:
+        """Write every task to `json_path` in the tasks.json layout, activity nested. Returns the count."""
+        r = self._open()
+        n = 0
+        def tasks():
+            nonlocal n
+            for i in range(len(r)):
+                t = r.task(i)
+                if activity:
+                    tid = t.get("id")
+                    acts = r.activity(i) + self.activity.page(tid, None, None)[::-1]
+                    if acts:
+                        t["activity"] = [{k: v for k, v in a.items() if k != "seq"} for a in acts]
+                n += 1
+                yield t
+        from .packfile import export_json
+        export_json(json_path, tasks())
+        return n
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id           TEXT PRIMARY KEY,
+    title        TEXT NOT NULL DEFAULT '',
+    description  TEXT NOT NULL DEFAULT '',
+    status       TEXT NOT NULL DEFAULT 'Open' COLLATE NOCASE,
+    created_at   TEXT,
+    completed_at TEXT,
+    due_days     INTEGER,
+    extra        TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS ix_tasks_status_created ON tasks(status, created_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_created ON tasks(created_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_title ON tasks(title COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS activity (
+    task_id TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    at      TEXT,
+    who     TEXT,
+    text    TEXT,
+    PRIMARY KEY (task_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tags (
+    task_id TEXT NOT NULL,
+    pos     INTEGER NOT NULL,
+    tag     TEXT NOT NULL,
+    PRIMARY KEY (task_id, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_tags_tag ON tags(tag);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+
+class SqliteStore:
+    """Embedded SQLite backend in WAL mode: one row per task, activity and tags in side tables.
+
+    Writes run in BEGIN IMMEDIATE transactions so a read-modify-write can't
+    interleave with another process. With `group_commit_ms` set, mutations
+    arriving within that window share one transaction (and one fsync).
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str, group_commit_ms: float = 0):
+        self.path = path
+        self._local = threading.local()
+        self._group = GroupCommit(self._apply, group_commit_ms / 1000.0) if group_commit_ms else None
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # Streamlit runs each session's script on its own thread; sqlite
+        # connections can't be shared across threads, so keep one per thread.
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            c.row_factory = sqlite3.Row
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.execute("PRAGMA foreign_keys=OFF")
+            self._local.conn = c
+        return c
+
+    # ---- row <-> dict ----
+    @staticmethod
+    def _row_to_task(r: sqlite3.Row, tags=None) -> Dict[str,Any]:
+        t = {
+            "id": r["id"],
+            "title": r["title"],
+            "description": r["description"] if "description" in r.keys() else None,
+            "status": r["status"],
+            "created_at": r["created_at"],
+            "due_days": r["due_days"],
+            "tags": tags if tags is not None else [],
+        }
+        if r["completed_at"]:
+            t["completed_at"] = r["completed_at"]
+        if r["extra"]:
+            t.update(json.loads(r["extra"]))
+        return t
+
+    @staticmethod
+    def _task_params(task: Dict[str,Any]):
+        extra = {k: v for k, v in task.items() if k not in _CORE and k not in _NESTED}
+        return (
+            task.get("id"), task.get("title") or "", task.get("description") or "",
+            task.get("status") or "Open", task.get("created_at"), task.get("completed_at"),
+            task.get("due_days"), json.dumps(extra) if extra else None,
+        )
+
+    def _attach(self, c, rows) -> List[Dict[str,Any]]:
+        if not rows:
+            return []
+        ids = [r["id"] for r in rows]
+        tags: Dict[str, list] = {i: [] for i in ids}
+        if len(ids) <= 500:
+            where, args = f"task_id IN ({','.join('?' * len(ids))})", ids
+        else:
+            # Bulk reads: pulling the tags table once beats one query per task.
+            where, args = "1", []
+        for g in c.execute(f"SELECT task_id, tag FROM tags WHERE {where} ORDER BY task_id, pos", args):
+            if g["task_id"] in tags:
+                tags[g["task_id"]].append(g["tag"])
+        incr("store.rows_read", len(rows))
+        return [self._row_to_task(r, tags[r["id"]]) for r in rows]
+
+    @staticmethod
+    def _bump(c):
+        c.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @contextmanager
+    def _reading(self):
+        # Multi-statement reads see one consistent snapshot.
+        c = self._conn()
+        if c.in_transaction:
+            yield c
+            return
+        c.execute("BEGIN")
+        try:
+            yield c
+        finally:
+            c.execute("COMMIT")
+
+    def _apply(self, mutations: List[Callable]) -> List[Any]:
+        c = self._conn()
+        results = []
+        changes = c.total_changes
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            for m in mutations:
+                c.execute("SAVEPOINT m")
+                try:
+                    results.append(m(c))
+                    c.execute("RELEASE m")
+                except Exception as e:
+                    c.execute("ROLLBACK TO m")
+                    c.execute("RELEASE m")
+                    results.append(e)
+            if any(getattr(m, "bumps", True) for m in mutations):
+                self._bump(c)
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        incr("store.rows_written", c.total_changes - changes)
+        return results
+
+    def _write(self, fn: Callable[[sqlite3.Connection], Any]):
+        if self._group:
+            return self._group.submit(fn)
+        r = self._apply([fn])[0]
+        if isinstance(r, BaseException):
+            raise r
+        return r
+
+    # ---- reads ----
+    def all(self, with_description: bool = True) -> List[Dict[str,Any]]:
+        cols = "*" if with_description else "id, title, status, created_at, completed_at, due_days, extra"
+        with self._reading() as c:
+            return self._attach(c, c.execute(f"SELECT {cols} FROM tasks ORDER BY rowid").fetchall())
+
+    def iter_all(self, batch: int = 1000) -> Iterator[List[Dict[str,Any]]]:
+        # Keyset pages of 500 rows (small enough for _attach to look tags up
+        # by id), each in its own short transaction, so a long export never
+        # pins the WAL or holds up writers.
+        last, chunk = 0, []
+        while True:
+            with self._reading() as c:
+                rows = c.execute("SELECT rowid AS rid, * FROM tasks WHERE rowid > ? ORDER BY rowid LIMIT 500",
+                                 (last,)).fetchall()
+                if rows:
+                    last = rows[-1]["rid"]
+                    chunk += self._attach(c, rows)
+            if chunk and (not rows or len(chunk) >= batch):
+                yield chunk
+                chunk = []
+            if not rows:
+                return
+
+    def activity_many(self, task_ids: Iterable[str]) -> Dict[str, List[Dict[str,Any]]]:
+        ids = list(task_ids)
+        out: Dict[str, List[Dict[str,Any]]] = {i: [] for i in ids}
+        c = self._conn()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for r in c.execute(f"SELECT task_id, seq, at, who, text FROM activity WHERE task_id IN "
+                               f"({','.join('?' * len(chunk))}) ORDER BY task_id, seq", chunk):
+                out[r["task_id"]].append({"seq": r["seq"], "at": r["at"], "who": r["who"], "text": r["text"]})
+        return out
+
+    def descriptions(self, task_ids: Iterable[str]) -> Dict[str,str]:
+        ids = list(task_ids)
+        out: Dict[str,str] = {}
+        c = self._conn()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            out.update(c.execute(f"SELECT id, description FROM tasks WHERE id IN ({','.join('?' * len(chunk))})",
+                                 chunk).fetchall())
+        return out
+
+    def get(self, task_id: str) -> Dict[str,Any] | None:
+        with self._reading() as c:
+            r = c.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            return self._attach(c, [r])[0] if r else None
+
+    def get_many(self, task_ids: Iterable[str]) -> List[Dict[str,Any]]:
+        ids = list(task_ids)
+        out: List[Dict[str,Any]] = []
+        with self._reading() as c:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = c.execute(f"SELECT * FROM tasks WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                out.extend(self._attach(c, rows))
+        return out
+
+    def by_status(self, prefix: str) -> List[Dict[str,Any]]:
+        p = (prefix or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._reading() as c:
+            rows = c.execute(
+                "SELECT * FROM tasks WHERE status LIKE ? ESCAPE '\\' ORDER BY rowid", (p + "%",)
+            ).fetchall()
+            return self._attach(c, rows)
+
+    def query(self, status=None, tag: str | None = None, text: str | None = None, sort: str = "newest",
+              offset: int = 0, limit: int | None = 50):
+        """One page of matching tasks plus the total match count, straight from the indexes."""
+        where, args = [], []
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            where.append(f"status IN ({','.join('?' * len(statuses))})")
+            args += statuses
+        if tag:
+            where.append("id IN (SELECT task_id FROM tags WHERE tag = ?)")
+            args.append(tag)
+        if text:
+            like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')")
+            args += [like, like]
+        col, desc = SORTS.get(sort, SORTS["newest"])
+        order = f"{col} COLLATE NOCASE" if col == "title" else col
+        direction = "DESC" if desc else "ASC"
+        sql_where = (" WHERE " + " AND ".join(where)) if where else ""
+        with self._reading() as c:
+            total = c.execute(f"SELECT COUNT(*) FROM tasks{sql_where}", args).fetchone()[0]
+            rows = c.execute(
+                f"SELECT * FROM tasks{sql_where} ORDER BY {order} {direction}, rowid {direction} LIMIT ? OFFSET ?",
+                args + [-1 if limit is None else int(limit), int(offset)],
+            ).fetchall()
+            return self._attach(c, rows), total
+
+    def list_tags(self) -> List[str]:
+        return [r[0] for r in self._conn().execute("SELECT DISTINCT tag FROM tags ORDER BY tag")]
+
+    # ---- writes ----
+    def _insert(self, c, task: Dict[str,Any]):
+        # Plain INSERT: an id that is already taken is an error, not an overwrite.
+        c.execute("INSERT INTO tasks (id, title, description, status, created_at, completed_at, due_days, extra) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._task_params(task))
+        tid = task.get("id")
+        if "activity" in task:
+            c.execute("DELETE FROM activity WHERE task_id = ?", (tid,))
+            c.executemany("INSERT INTO activity (task_id, seq, at, who, text) VALUES (?, ?, ?, ?, ?)",
+                          [(tid, i, a.get("at"), a.get("who"), a.get("text")) for i, a in enumerate(task["activity"] or [])])
+        c.execute("DELETE FROM tags WHERE task_id = ?", (tid,))
+        c.executemany("INSERT INTO tags (task_id, pos, tag) VALUES (?, ?, ?)",
+                      [(tid, i, str(g)) for i, g in enumerate(task.get("tags") or [])])
+
+    def insert(self, task: Dict[str,Any]):
+        self._write(lambda c: self._insert(c, task))
+
+    def insert_many(self, tasks: Iterable[Dict[str,Any]]):
+        tasks = list(tasks)
+        def fn(c):
+            for t in tasks:
+                self._insert(c, t)
+        self._write(fn)
+
+    def update(self, task_id: str, fields: Dict[str,Any], drop: Iterable[str] = (), defaults: Dict[str,Any] | None = None):
+        self.update_many([task_id], fields, drop, defaults)
+
+    def update_many(self, task_ids: Iterable[str], fields: Dict[str,Any], drop: Iterable[str] = (), defaults: Dict[str,Any] | None = None):
+        ids = list(task_ids)
+        drop = tuple(drop)
+        def fn(c):
+            for task_id in ids:
+                r = c.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+                if not r:
+                    continue
+                t = self._row_to_task(r)
+                _apply_fields(t, fields, drop, defaults)
+                c.execute("UPDATE tasks SET title = ?, description = ?, status = ?, created_at = ?, completed_at = ?, "
+                          "due_days = ?, extra = ? WHERE id = ?", self._task_params(t)[1:] + (task_id,))
+                if "tags" in fields:
+                    c.execute("DELETE FROM tags WHERE task_id = ?", (task_id,))
+                    c.executemany("INSERT INTO tags (task_id, pos, tag) VALUES (?, ?, ?)",
+                                  [(task_id, i, str(g)) for i, g in enumerate(fields["tags"] or [])])
+        self._write(fn)
+
+    def allocate_ids(self, n: int) -> List[int]:
+        c = self._conn()
+        # Runs in its own BEGIN IMMEDIATE so concurrent allocators serialise.
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            r = c.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+            start = r[0] if r else _next_id_after(row[0] for row in c.execute("SELECT id FROM tasks"))
+            c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (start + n,))
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        return list(range(start, start + n))
+
+    def append_activity(self, task_id: str, entry: Dict[str,Any]):
+        self.append_activity_many([(task_id, entry)])
+
+    def append_activity_many(self, entries: Iterable[tuple]):
+        entries = list(entries)
+        def fn(c):
+            for task_id, entry in entries:
+                if not c.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone():
+                    continue
+                c.execute("INSERT INTO activity (task_id, seq, at, who, text) "
+                          "SELECT ?, COALESCE(MAX(seq), -1) + 1, ?, ?, ? FROM activity WHERE task_id = ?",
+                          (task_id, entry.get("at"), entry.get("who"), entry.get("text"), task_id))
+        # Activity lives outside the task rows, so appends leave the task
+        # version (and every cached task snapshot) untouched.
+        fn.bumps = False
+        self._write(fn)
+
+    def iter_activity(self, task_id: str, before: int | None = None, limit: int | None = 20) -> List[Dict[str,Any]]:
+        sql = "SELECT seq, at, who, text FROM activity WHERE task_id = ?"
+        args: list = [task_id]
+        if before is not None:
+            sql += " AND seq < ?"
+            args.append(int(before))
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return [dict(r) for r in self._conn().execute(sql, args)]
+
+    def activity_count(self, task_id: str) -> int:
+        r = self._conn().execute("SELECT MAX(seq) FROM activity WHERE task_id = ?", (task_id,)).fetchone()
+        return 0 if r[0] is None else r[0] + 1
+
+    def delete(self, task_id: str):
+        self.delete_many([task_id])
+
+    def delete_many(self, task_ids: Iterable[str]):
+        ids = [(i,) for i in task_ids]
+        def fn(c):
+            c.executemany("DELETE FROM tasks WHERE id = ?", ids)
+            c.executemany("DELETE FROM activity WHERE task_id = ?", ids)
+            c.executemany("DELETE FROM tags WHERE task_id = ?", ids)
+        self._write(fn)
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+
+BACKENDS = {"json": JsonStore, "sqlite": SqliteStore, "packed": PackedStore}
+
+
+def open_store(backend: str, path: str, **opts):
+    try:
+        cls = BACKENDS[(backend or "").lower()]
+    except KeyError:
+        raise ValueError(f"Unknown task store backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return cls(path, **opts)
+
+
+def migrate_json(json_path: str, store) -> int:
+    """Copy every task from a tasks.json file, with its activity, into `store`. Returns the number of tasks copied.
+
+    Legacy files can hold the same id twice (ids used to be derived from the
+    creation time). The first task keeps it; every later one gets a fresh
+    `TASK-<n>` from the store's allocator and keeps the old id as `legacy_id`.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    tasks = load_tasks_json(json_path)
+    seen, first, extra = set(), [], []
+    for t in tasks:
+        tid = t.get("id")
+        (extra if not tid or tid in seen else first).append(t)
+        seen.add(tid)
+    store.insert_many(first)
+    if extra:
+        # Allocated only after the first copies are in, so a fresh counter is
+        # seeded above every id in the file.
+        ids = store.allocate_ids(len(extra))
+        store.insert_many([dict(t, id=f"TASK-{n}", **({"legacy_id": t["id"]} if t.get("id") else {}))
+                           for t, n in zip(extra, ids)])
+        logging.getLogger(__name__).warning(
+            "%s: %d tasks had a duplicate or missing id and were given new ids (old id kept as legacy_id)",
+            json_path, len(extra))
+    return len(tasks)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m services.storage", description="TaskPilot task store utilities")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="one-shot copy of data/tasks.json into the SQLite store")
+    m.add_argument("--json", default=os.path.join("data", "tasks.json"))
+    m.add_argument("--db", default=os.path.join("data", "tasks.db"))
+    p = sub.add_parser("pack", help="convert a tasks.json file to the packed format")
+    p.add_argument("--json", default=os.path.join("data", "tasks.json"))
+    p.add_argument("--pack", default=os.path.join("data", "tasks.pack"))
+    p.add_argument("--compress", action="store_true", help="zlib-compress descriptions and activity")
+    u = sub.add_parser("unpack", help="export a packed store back to the tasks.json format")
+    u.add_argument("--pack", default=os.path.join("data", "tasks.pack"))
+    u.add_argument("--json", default=os.path.join("data", "tasks.json"))
+    args = ap.parse_args(argv)
+    if args.cmd == "migrate":
+        logging.basicConfig(format="%(levelname)s %(message)s")
+        n = migrate_json(args.json, SqliteStore(args.db))
+        print(f"Migrated {n} tasks from {args.json} to {args.db}")
+    elif args.cmd == "pack":
+        from .packfile import convert_json
+        n = convert_json(args.json, args.pack, args.compress)
+        print(f"Packed {n} tasks from {args.json} into {args.pack}")
+    elif args.cmd == "unpack":
+        if not os.path.exists(args.pack):
+            raise SystemExit(f"{args.pack} does not exist")
+        n = PackedStore(args.pack).export_json(args.json)
+        print(f"Exported {n} tasks from {args.pack} to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Mapping, Callable, Tuple
+from collections.abc import Mapping as MappingABC
+import re, sys, datetime as dtm
+import numpy as np
+from .temporal import parse_epoch, is_closed
+
+MISSING = np.iinfo(np.int64).min
+_EPOCH = dtm.datetime(1970, 1, 1, tzinfo=dtm.timezone.utc)
+_DESC_CHUNK = 256            # lazily loaded descriptions are fetched in runs of rows
+_DESC_CACHE = 20000
+_NO_DUE = np.iinfo(np.int32).min
+
+
+# A string shaped like datetime.isoformat() output for UTC. Those parse in
+# bulk and need no side table; numpy rejects the batch if one is malformed.
+def _canonical(v) -> bool:
+    return (type(v) is str and v.endswith("+00:00") and v[10:11] == "T"
+            and (len(v) == 25 or (len(v) == 32 and v[19] == "." and v[20:26] != "000000")))
+
+
+def _to_us(value) -> int:
+    e = parse_epoch(value)
+    return MISSING if e != e else int(round(e * 1e6))
+
+
+def _id_number(tid) -> int | None:
+    # TASK-<n> with no leading zeros (so the id round-trips) -> n; checked once per task per rebuild.
+    if type(tid) is str and tid.startswith("TASK-"):
+        num = tid[5:]
+        if num.isascii() and num.isdigit() and num[0] != "0":
+            return int(num)
+    return None
+
+
+def _iso(us: int) -> str:
+    return (_EPOCH + dtm.timedelta(microseconds=int(us))).isoformat()
+
+
+class _Blob:
+    """Strings packed as one UTF-8 buffer plus offsets; decoded on access."""
+    __slots__ = ("data", "offs")
+
+    def __init__(self, strings: List[str]):
+        enc = [s.encode() for s in strings]
+        self.data = b"".join(enc)
+        self.offs = np.zeros(len(enc) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in enc], out=self.offs[1:])
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offs[i]:self.offs[i + 1]].decode()
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.offs.nbytes
+
+
+class TaskView(MappingABC):
+    """Read-only, dict-compatible row of a TaskTable."""
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: "TaskTable", row: int):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.table.value(self.row, key)
+
+    def get(self, key, default=None):
+        try:
+            return self.table.value(self.row, key)
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.table.keys(self.row)
+
+    def __iter__(self):
+        return iter(self.table.keys(self.row))
+
+    def __len__(self):
+        return len(self.table.keys(self.row))
+
+    def __repr__(self):
+        return f"TaskView({dict(self)!r})"
+
+
+class TaskTable:
+    """All tasks as columns: the shared in-memory snapshot behind list_tasks.
+
+    Ids of the usual TASK-<n> form are an int64 column, statuses small
+    integer codes, created/completed int64 microseconds, due_days int32,
+    titles (and descriptions, when the store handed them over) one packed
+    UTF-8 buffer each; identical tag tuples are shared. Values that would
+    not round-trip through those encodings (odd ids, non-UTC timestamps,
+    non-integer due_days) are kept verbatim in small side tables. With
+    `load_descriptions`, descriptions are fetched from the store on first
+    access instead, a run of rows at a time.
+    """
+
+    def __init__(self, tasks: Iterable[Mapping[str,Any]],
+                 load_descriptions: Callable[[List[str]], Dict[str,str]] | None = None):
+        tasks = tasks if isinstance(tasks, list) else list(tasks)
+        self.n = len(tasks)
+        ids: List[int] = []
+        self._odd_ids: Dict[int, str] = {}
+        self.status_vocab: List[Any] = []
+        vocab: Dict[Any, int] = {}
+        codes: List[int] = []
+        stamps: Dict[str, List[Any]] = {"created_at": [], "completed_at": []}
+        dues: List[int] = []
+        self._raw: Dict[Tuple[int, str], Any] = {}
+        self._extra: Dict[int, Dict[str,Any]] = {}
+        self.tags: List[tuple] = []
+        shared: Dict[tuple, tuple] = {}
+        titles: List[str] = []
+        descs: List[str] | None = None if load_descriptions else []
+        core = {"id", "title", "description", "status", "created_at", "completed_at", "due_days", "tags"}
+
+        for i, t in enumerate(tasks):
+            tid = t.get("id")
+            num = _id_number(tid)
+            if num is not None:
+                ids.append(num)
+            else:
+                ids.append(-1)
+                self._odd_ids[i] = tid
+            st = t.get("status")
+            c = vocab.get(st)
+            if c is None:
+                c = vocab[st] = len(self.status_vocab)
+                self.status_vocab.append(sys.intern(st) if isinstance(st, str) else st)
+            codes.append(c)
+            stamps["created_at"].append(t.get("created_at"))
+            stamps["completed_at"].append(t.get("completed_at"))
+            d = t.get("due_days")
+            if d is None:
+                dues.append(_NO_DUE)
+            elif type(d) is int and _NO_DUE < d < 2**31:
+                dues.append(d)
+            else:
+                dues.append(_NO_DUE)
+                self._raw[(i, "due_days")] = d
+            title = t.get("title")
+            if not isinstance(title, str):
+                self._raw[(i, "title")] = title
+                title = ""
+            titles.append(title)
+            if descs is not None:
+                desc = t.get("description")
+                if not isinstance(desc, str):
+                    self._raw[(i, "description")] = desc
+                    desc = ""
+                descs.append(desc)
+            tg = tuple(t.get("tags") or ())
+            self.tags.append(shared.setdefault(tg, tg))
+            if not core.issuperset(t):
+                extra = {k: v for k, v in t.items() if k not in core}
+                if extra:
+                    self._extra[i] = extra
+
+        self.id_num = np.array(ids, dtype=np.int64)
+        self.created = self._stamps("created_at", stamps["created_at"])
+        self.completed = self._stamps("completed_at", stamps["completed_at"])
+        self.due = np.array(dues, dtype=np.int32)
+        codes = np.array(codes, dtype=np.int32)
+        self.status = codes.astype(np.int16) if len(self.status_vocab) < 2**15 else codes
+        self._titles = _Blob(titles)
+        self._descs = _Blob(descs) if descs is not None else None
+        self._load_descs = load_descriptions
+        self._desc_cache: Dict[int, str] = {}
+        # id -> row: binary search over the numeric ids, a dict for the rest.
+        # Stores hand rows over in id order, so usually the column itself is the index.
+        if self.n < 2 or bool(np.all(self.id_num[1:] > self.id_num[:-1])):
+            self._id_order, self._id_sorted = None, self.id_num
+        else:
+            self._id_order = np.argsort(self.id_num, kind="stable")
+            self._id_sorted = self.id_num[self._id_order]
+        self._odd_rows = {v: k for k, v in self._odd_ids.items()}
+        self._views: tuple | None = None
+        self._getters = {
+            "id": self.task_id, "title": self._title, "description": self.description,
+            "status": self.status_of, "created_at": self._created_at, "completed_at": self._completed_at,
+            "due_days": self._due_days, "tags": self.tags.__getitem__,
+        }
+
+    def _stamps(self, key: str, values: List[Any]) -> np.ndarray:
+        col = np.full(self.n, MISSING, dtype=np.int64)
+        fast = [i for i, v in enumerate(values) if _canonical(v)]
+        try:
+            col[fast] = np.array([values[i][:-6] for i in fast], dtype="datetime64[us]").astype(np.int64)
+        except ValueError:
+            fast = []
+        if len(fast) < self.n:
+            quick = set(fast)
+            for i, v in enumerate(values):
+                if v is None or i in quick:
+                    continue
+                us = _to_us(v)
+                if us == MISSING or _iso(us) != v:
+                    self._raw[(i, key)] = v
+                if us != MISSING:
+                    col[i] = us
+        return col
+
+    def __len__(self):
+        return self.n
+
+    # ---- cells ----
+    def task_id(self, i: int):
+        return self._odd_ids[i] if i in self._odd_ids else f"TASK-{self.id_num[i]}"
+
+    def status_of(self, i: int):
+        return self.status_vocab[self.status[i]]
+
+    def _title(self, i: int):
+        return self._raw[(i, "title")] if (i, "title") in self._raw else self._titles[i]
+
+    def description(self, i: int):
+        if (i, "description") in self._raw:
+            return self._raw[(i, "description")]
+        if self._descs is not None:
+            return self._descs[i]
+        d = self._desc_cache.get(i)
+        if d is None:
+            if len(self._desc_cache) > _DESC_CACHE:
+                self._desc_cache.clear()
+            rows = range(i, min(self.n, i + _DESC_CHUNK))
+            found = self._load_descs([self.task_id(r) for r in rows])
+            for r in rows:
+                self._desc_cache[r] = found.get(self.task_id(r)) or ""
+            # Not read back from the cache: the snapshot is shared, and another
+            # thread may clear it in between.
+            d = found.get(self.task_id(i)) or ""
+        return d
+
+    def _stamp(self, i: int, key: str, col: np.ndarray, required: bool):
+        if (i, key) in self._raw:
+            return self._raw[(i, key)]
+        us = col[i]
+        if us == MISSING:
+            if required:
+                return None
+            raise KeyError(key)
+        return _iso(us)
+
+    def _created_at(self, i: int):
+        return self._stamp(i, "created_at", self.created, True)
+
+    def _completed_at(self, i: int):
+        return self._stamp(i, "completed_at", self.completed, False)
+
+    def _due_days(self, i: int):
+        if (i, "due_days") in self._raw:
+            return self._raw[(i, "due_days")]
+        d = self.due[i]
+        if d == _NO_DUE:
+            raise KeyError("due_days")
+        return int(d)
+
+    def value(self, i: int, key: str):
+        g = self._getters.get(key)
+        if g is not None:
+            return g(i)
+        extra = self._extra.get(i)
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def keys(self, i: int) -> List[str]:
+        keys = ["id", "title", "description", "status", "created_at", "due_days", "tags"]
+        if self.due[i] == _NO_DUE and (i, "due_days") not in self._raw:
+            keys.remove("due_days")
+        if self.completed[i] != MISSING or (i, "completed_at") in self._raw:
+            keys.append("completed_at")
+        if i in self._extra:
+            keys += list(self._extra[i])
+        return keys
+
+    # ---- rows ----
+    def views(self) -> tuple:
+        if self._views is None:
+            self._views = tuple(TaskView(self, i) for i in range(self.n))
+        return self._views
+
+    def row_of(self, task_id: str) -> int | None:
+        num = _id_number(task_id)
+        if num is None:
+            return self._odd_rows.get(task_id)
+        j = int(np.searchsorted(self._id_sorted, num))
+        if j < self.n and self._id_sorted[j] == num:
+            return j if self._id_order is None else int(self._id_order[j])
+        return None
+
+    def get(self, task_id: str) -> TaskView | None:
+        i = self.row_of(task_id)
+        return None if i is None else self.views()[i]
+
+    def take(self, rows: Iterable[int]) -> List[TaskView]:
+        v = self.views()
+        return [v[i] for i in rows]
+
+    # ---- column operations ----
+    def status_codes(self, match: Callable[[str], bool]) -> np.ndarray:
+        return np.array([c for c, s in enumerate(self.status_vocab) if match((s or "").lower())], dtype=self.status.dtype)
+
+    def status_rows(self, match: Callable[[str], bool]) -> np.ndarray:
+        """Row numbers whose lower-cased status satisfies `match`, in table order."""
+        return np.flatnonzero(np.isin(self.status, self.status_codes(match)))
+
+    def closed_mask(self) -> np.ndarray:
+        return np.isin(self.status, self.status_codes(is_closed))
+
+    def created_seconds(self, rows=None) -> np.ndarray:
+        """created_at as float epoch seconds, NaN where missing or unparseable."""
+        us = self.created if rows is None else self.created[rows]
+        out = us / 1e6
+        out[us == MISSING] = np.nan
+        return out
+
+    def completed_seconds(self, rows=None) -> np.ndarray:
+        us = self.completed if rows is None else self.completed[rows]
+        out = us / 1e6
+        out[us == MISSING] = np.nan
+        return out
+
+    def due_days(self, rows=None, default: int = 5) -> np.ndarray:
+        d = (self.due if rows is None else self.due[rows]).astype(np.float64)
+        d[d == _NO_DUE] = default
+        return d
+
+    def order(self, rows: np.ndarray, sort: str, desc: bool) -> np.ndarray:
+        """`rows` sorted like list.sort(key=..., reverse=desc) on the named column."""
+        if sort == "created_at":
+            key = self.created[rows].copy()
+            key[key == MISSING] = np.iinfo(np.int64).max     # unparseable sorts as newest
+            idx = np.argsort(key[::-1] if desc else key, kind="stable")
+            return rows[::-1][idx][::-1] if desc else rows[idx]
+        get = self._title if sort == "title" else self.status_of
+        return np.array(sorted(rows.tolist(), key=lambda i: (get(i) or "").lower(), reverse=desc), dtype=np.int64)
+
+    def nbytes(self) -> int:
+        arrays = [self.id_num, self.status, self.created, self.completed, self.due]
+        if self._id_order is not None:
+            arrays += [self._id_order, self._id_sorted]
+        n = sum(a.nbytes for a in arrays) + self._titles.nbytes + (self._descs.nbytes if self._descs else 0)
+        n += sys.getsizeof(self.tags) + sum(sys.getsizeof(t) for t in {id(t): t for t in self.tags}.values())
+        return n
+
+
+def table_rows(tasks: List[Any]) -> Tuple[TaskTable, np.ndarray] | None:
+    """(table, row numbers) when every item is a view into the same TaskTable."""
+    if not tasks or type(tasks[0]) is not TaskView:
+        return None
+    table = tasks[0].table
+    if not all(type(t) is TaskView and t.table is table for t in tasks):
+        return None
+    return table, np.fromiter((t.row for t in tasks), dtype=np.int64, count=len(tasks))
@@ -1,81 +1,620 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import os, json, datetime as dtm
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Tuple, Callable, TYPE_CHECKING
+from types import MappingProxyType
+import os, json, time, logging, importlib, threading, datetime as dtm
+from .storage import open_store, migrate_json, SORTS
+from .temporal import DAY, parse_epoch, is_closed
+from .search import SearchIndex, ensure_built, task_text
+from . import llm_cache
+from .perf import timed, incr
+
+if TYPE_CHECKING:
+    from .aggregates import TaskAggregates
+    from .table import TaskTable
+
+# NumPy, the columnar table and the aggregates load with the first snapshot,
+# not with this module: importing it (every page does) stays cheap.
 
 DATA_PATH = os.path.join("data", "tasks.json")
+DB_PATH = os.path.join("data", "tasks.db")
+PACK_PATH = os.path.join("data", "tasks.pack")
+SEARCH_DIR = os.path.join("data", "search")
+ARCHIVE_PATH = os.path.join("data", "archive", "tasks.pack")
+# "sqlite" (default), "json" for the original whole-file layout, or "packed"
+# for the memory-mapped pack file.
+BACKEND = os.getenv("TASKPILOT_STORE", "sqlite").lower()
+# New pack files zlib-compress descriptions and activity.
+PACK_COMPRESS = os.getenv("TASKPILOT_PACK_COMPRESS", "0") == "1"
+# >0 batches writes that arrive within this many milliseconds into one commit.
+GROUP_COMMIT_MS = float(os.getenv("TASKPILOT_GROUP_COMMIT_MS", "0") or 0)
+# Tasks closed more than this many days ago move to the cold archive. Off
+# (0) unless set: archiving moves data, so a deployment has to opt in.
+ARCHIVE_AFTER_DAYS = float(os.getenv("TASKPILOT_ARCHIVE_DAYS", "0") or 0)
+ARCHIVE_CHECK_SECONDS = 3600
+
+_store = None
+
+def _get_store():
+    global _store
+    if _store is None:
+        if BACKEND == "json":
+            _store = open_store("json", DATA_PATH, group_commit_ms=GROUP_COMMIT_MS)
+        elif BACKEND == "packed":
+            if not os.path.exists(PACK_PATH) and os.path.exists(DATA_PATH):
+                # Same one-shot migration, keeping nested activity in the pack.
+                from .packfile import convert_json
+                convert_json(DATA_PATH, PACK_PATH, PACK_COMPRESS)
+            _store = open_store("packed", PACK_PATH, group_commit_ms=GROUP_COMMIT_MS, compress=PACK_COMPRESS)
+        else:
+            fresh = not os.path.exists(DB_PATH)
+            _store = open_store(BACKEND, DB_PATH, group_commit_ms=GROUP_COMMIT_MS)
+            if fresh:
+                # One-shot migration: the first time the database is created,
+                # carry over whatever is in the legacy JSON file.
+                migrate_json(DATA_PATH, _store)
+    return _store
+
+# ---------- cold archive ----------
+# Long-closed tasks live in a compressed pack file of their own (activity
+# included), so the snapshot, aggregates and every default query cover only
+# the hot working set. Lookups by id, activity and search fall through to the
+# archive; a status change on an archived task moves it back first.
+
+_archive = None
+_archive_lock = threading.Lock()
+_archive_checked = 0.0
+
+def _get_archive(create: bool = True):
+    """The archive store, or None when there is none yet and `create` is False."""
+    global _archive
+    if _archive is None:
+        if not create and not os.path.exists(ARCHIVE_PATH):
+            return None
+        _archive = open_store("packed", ARCHIVE_PATH, compress=True)
+    return _archive
+
+def _archived(task_ids: Iterable[str]) -> List[str]:
+    """Those of `task_ids` that are not in the hot store but are in the archive."""
+    cold = _get_archive(create=False)
+    if cold is None:
+        return []
+    # Checked against the archive's own id index: going through the snapshot
+    # would rebuild it on every write. Only archive hits touch the hot store.
+    ids = cold.present(task_ids)
+    if ids:
+        hot = {t["id"] for t in _get_store().get_many(ids)}
+        ids = [i for i in ids if i not in hot]
+    return ids
+
+def archived_count() -> int:
+    cold = _get_archive(create=False)
+    return cold.count() if cold is not None else 0
+
+def _with_activity(store, tasks: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
+    for t in tasks:
+        acts = store.iter_activity(t["id"], limit=None)
+        if acts:
+            t["activity"] = [{k: v for k, v in a.items() if k != "seq"} for a in reversed(acts)]
+    return tasks
+
+@timed
+def archive_closed(older_than_days: float | None = None, now: float | None = None, batch: int = 10000) -> int:
+    """Move tasks closed more than `older_than_days` (default TASKPILOT_ARCHIVE_DAYS) ago to the archive.
+
+    Returns how many moved. Each batch is written to the archive before it is
+    deleted from the hot store, so a crash in between leaves a task in both
+    places (the hot copy wins, and the next run finishes the move).
+    """
+    import numpy as np
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    if days <= 0:
+        return 0
+    table = _cached().table
+    now = time.time() if now is None else now
+    done = table.completed_seconds()
+    done = np.where(np.isnan(done), table.created_seconds(), done)    # legacy rows without completed_at
+    with np.errstate(invalid="ignore"):
+        rows = np.flatnonzero(table.closed_mask() & (done < now - days * DAY))
+    ids = [table.task_id(i) for i in rows.tolist()]
+    if not ids:
+        return 0
+    store, cold = _get_store(), _get_archive()
+    for i in range(0, len(ids), batch):
+        chunk = ids[i:i + batch]
+        cold.insert_many(_with_activity(store, store.get_many(chunk)))
+        store.delete_many(chunk)
+    invalidate_cache()
+    _agg_apply(removes=ids)
+    _notify("archive", ids)
+    logging.getLogger(__name__).info("archived %d tasks closed more than %g days ago", len(ids), days)
+    return len(ids)
+
+def _promote(task_ids: List[str]):
+    cold = _get_archive()
+    tasks = _with_activity(cold, cold.get_many(task_ids))
+    if tasks:
+        _get_store().insert_many(tasks)
+        cold.delete_many([t["id"] for t in tasks])
+        invalidate_cache()
+
+def _maybe_archive():
+    # Checked after snapshot rebuilds, at most once an hour per process, off
+    # the request thread.
+    global _archive_checked
+    if ARCHIVE_AFTER_DAYS <= 0 or time.time() - _archive_checked < ARCHIVE_CHECK_SECONDS:
+        return
+    if not _archive_lock.acquire(blocking=False):
+        return
+    _archive_checked = time.time()
+    def run():
+        try:
+            archive_closed()
+        except Exception:
+            logging.getLogger(__name__).exception("archiving closed tasks failed")
+        finally:
+            _archive_lock.release()
+    threading.Thread(target=run, name="taskpilot-archive", daemon=True).start()
+
+# ---------- shared read cache ----------
+# One snapshot of the store per process, shared by every Streamlit session.
+# It is keyed on the store's version token (SQLite write counter / JSON file
+# mtime+size), so it is rebuilt only after somebody writes. Tasks live in a
+# columnar TaskTable and are handed out as read-only row views, so a caller
+# can't corrupt what others see and 100k tasks cost megabytes, not gigabytes.
+
+class _Snapshot:
+    __slots__ = ("version", "table", "memo")
+
+    def __init__(self, version, table: TaskTable):
+        self.version = version
+        self.table = table
+        # Derived views (status prefixes, query results) computed on demand.
+        self.memo: Dict[tuple, tuple] = {}
+
+    @property
+    def tasks(self) -> tuple:
+        return self.table.views()
+
+_snapshot: _Snapshot | None = None
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+def _freeze(t: Dict[str,Any]) -> Mapping[str,Any]:
+    d = dict(t)
+    if "activity" in d:
+        d["activity"] = tuple(MappingProxyType(dict(a)) for a in d["activity"] or [])
+    if "tags" in d:
+        d["tags"] = tuple(d["tags"] or [])
+    return MappingProxyType(d)
+
+def _cached() -> _Snapshot:
+    global _snapshot
+    store = _get_store()
+    v = store.version()
+    snap = _snapshot
+    if snap is not None and snap.version == v:
+        _cache_stats["hits"] += 1
+        incr("cache.snapshot.hit")
+        return snap
+    with _cache_lock:
+        # Another session may have reloaded while we waited for the lock.
+        snap = _snapshot
+        if snap is not None and snap.version == v:
+            _cache_stats["hits"] += 1
+            incr("cache.snapshot.hit")
+            return snap
+        _cache_stats["misses"] += 1
+        incr("cache.snapshot.miss")
+        from .table import TaskTable
+        if hasattr(store, "descriptions"):
+            # Descriptions stay in the store until a page actually shows one.
+            table = TaskTable(store.all(with_description=False), store.descriptions)
+        else:
+            table = TaskTable(store.all())
+        snap = _Snapshot(v, table)
+        _snapshot = snap
+    _maybe_archive()
+    return snap
+
+def invalidate_cache():
+    global _snapshot
+    with _cache_lock:
+        _snapshot = None
+
+def cache_stats() -> Dict[str,Any]:
+    snap = _snapshot
+    hits, misses = _cache_stats["hits"], _cache_stats["misses"]
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "version": snap.version if snap else None,
+        "tasks": len(snap.table) if snap else 0,
+        "table_bytes": snap.table.nbytes() if snap else 0,
+        "archived": archived_count(),
+    }
+
+# ---------- materialized dashboard aggregates ----------
+# Built once from the snapshot, then patched by this process's writes. A
+# version mismatch (another process wrote) triggers a rebuild.
+
+_agg: TaskAggregates | None = None
+_agg_lock = threading.Lock()
+
+def _aggregates() -> TaskAggregates:
+    global _agg
+    v = _get_store().version()
+    agg = _agg
+    if agg is not None and agg.version == v:
+        return agg
+    with _agg_lock:
+        if _agg is None or _agg.version != v:
+            from .aggregates import TaskAggregates
+            snap = _cached()
+            _agg = TaskAggregates.build(snap.table, snap.version)
+        return _agg
+
+def _agg_apply(upserts=(), removes=()):
+    agg = _agg
+    if agg is None:
+        return
+    for t in upserts:
+        agg.upsert(t)
+    for tid in removes:
+        agg.remove(tid)
+    agg.version = _get_store().version()
+
+@timed
+def task_kpis(now: float | None = None) -> Dict[str,int]:
+    """{"total", "open", "closed", "overdue", "nearing"} without scanning tasks (archived ones count as closed)."""
+    k = _aggregates().kpis(now)
+    n = archived_count()
+    k["total"] += n
+    k["closed"] += n
+    return k
 
-def _ensure_store():
-    os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-    if not os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "w") as f:
-            json.dump([], f)
+@timed
+def overdue_tasks(limit: int | None = None, now: float | None = None) -> List[Dict[str,Any]]:
+    """Open tasks older than 5 days, oldest first (id, title, status, created_at)."""
+    return _aggregates().overdue(limit, now)
 
-def _load() -> List[Dict[str,Any]]:
-    _ensure_store()
-    with open(DATA_PATH) as f:
-        return json.load(f)
+# ---------- change listeners ----------
+# Derived state outside this module (prompt summaries, similarity index)
+# subscribes here. Events: "create", "status", "activity", "delete" and
+# "archive" (moved to the cold archive), each with the list of task ids it
+# touched.
 
-def _save(tasks: List[Dict[str,Any]]):
-    _ensure_store()
-    with open(DATA_PATH, "w") as f:
-        json.dump(tasks, f, indent=2)
+_listeners: List[Callable[[str, List[str]], None]] = []
+# Modules that subscribe at import. They are loaded before the first event is
+# sent rather than at startup, so read-only page runs never import them.
+LISTENER_MODULES = ("services.context", "services.similar", "services.changes")
+_listeners_loaded = False
 
-def list_tasks() -> List[Dict[str,Any]]:
-    return _load()
+def subscribe(fn: Callable[[str, List[str]], None]):
+    if fn not in _listeners:
+        _listeners.append(fn)
+    return fn
 
-def get_task(task_id: str) -> Dict[str,Any] | None:
-    for t in _load():
-        if t.get("id") == task_id:
-            return t
-    return None
+def _load_listeners():
+    global _listeners_loaded
+    if not _listeners_loaded:
+        _listeners_loaded = True
+        for name in LISTENER_MODULES:
+            importlib.import_module(name)
+
+def _notify(event: str, task_ids: List[str]):
+    _load_listeners()
+    for fn in list(_listeners):
+        try:
+            fn(event, task_ids)
+        except Exception:
+            # A derived index must never fail the write that triggered it.
+            logging.getLogger(__name__).exception("task listener %r failed on %s", fn, event)
+
+# ---------- full-text search ----------
+
+_search_index: SearchIndex | None = None
+
+def _search() -> SearchIndex:
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex(SEARCH_DIR)
+    return _search_index
+
+@timed
+def search_tasks(query: str, limit: int = 20) -> List[Mapping[str,Any]]:
+    """Tasks ranked by BM25 over title, description and activity text."""
+    idx = _search()
+    store = _get_store()
+    cold = _get_archive(create=False)
+    ensure_built(idx, lambda: store.all() + (cold.all() if cold else []), lambda tid: iter_activity(tid, limit=None))
+    out = []
+    for tid, _ in idx.search(query, limit):
+        t = get_task(tid)
+        if t is not None:
+            out.append(t)
+    return out
+
+@timed
+def list_tasks(include_archived: bool = False) -> List[Mapping[str,Any]]:
+    out = list(_cached().tasks)
+    cold = _get_archive(create=False) if include_archived else None
+    if cold is not None:
+        out += [_freeze(t) for t in cold.all()]
+    return out
+
+@timed
+def get_task(task_id: str) -> Mapping[str,Any] | None:
+    t = _cached().table.get(task_id)
+    if t is None:
+        cold = _get_archive(create=False)
+        t = cold.get(task_id) if cold is not None else None
+        return _freeze(t) if t is not None else None
+    return t
+
+@timed
+def get_tasks(task_ids: Iterable[str]) -> List[Mapping[str,Any]]:
+    """Tasks by id straight from the store (missing ids are skipped), without rebuilding the snapshot."""
+    task_ids = list(task_ids)
+    found = _get_store().get_many(task_ids)
+    cold = _get_archive(create=False)
+    if cold is not None and len(found) < len(set(task_ids)):
+        have = {t["id"] for t in found}
+        found += cold.get_many([i for i in task_ids if i not in have])
+    return [_freeze(t) for t in found]
+
+def _new_ids(n: int) -> List[str]:
+    # The store hands out blocks from a persistent counter under its write
+    # lock, so ids are unique across sessions, processes and bulk imports.
+    return [f"TASK-{i}" for i in _get_store().allocate_ids(n)]
 
 def _new_id() -> str:
-    return f"TASK-{int(dtm.datetime.now(dtm.timezone.utc).timestamp())%10000000}"
+    return _new_ids(1)[0]
 
+def _now() -> str:
+    return dtm.datetime.now(dtm.timezone.utc).isoformat()
+
+@timed
 def create_task(title: str, description: str, tags=None, due_days: int = 5) -> Dict[str,Any]:
-    tasks = _load()
     t = {
         "id": _new_id(),
         "title": title,
         "description": description,
         "status": "Open",
-        "created_at": dtm.datetime.now(dtm.timezone.utc).isoformat(),
+        "created_at": _now(),
         "due_days": due_days,
-        "activity": [],
         "tags": tags or []
     }
-    tasks.append(t)
-    _save(tasks)
+    _get_store().insert(t)
+    invalidate_cache()
+    _agg_apply(upserts=[t])
+    _search().add(t["id"], task_text(t))
+    _notify("create", [t["id"]])
     return t
 
+@timed
+def create_tasks(items: Iterable[Dict[str,Any]]) -> List[Dict[str,Any]]:
+    """Create many tasks with one id allocation and one store write.
+
+    Each item needs a title; description, tags, due_days, status, created_at,
+    completed_at and activity are optional, and any other keys are kept.
+    """
+    items = list(items)
+    if not items:
+        return []
+    now = _now()
+    tasks = []
+    for tid, it in zip(_new_ids(len(items)), items):
+        t = {
+            "id": tid,
+            "title": it.get("title") or "Untitled",
+            "description": it.get("description") or "",
+            "status": it.get("status") or "Open",
+            "created_at": it.get("created_at") or now,
+            "due_days": it.get("due_days", 5),
+            "tags": list(it.get("tags") or []),
+        }
+        for k, v in it.items():
+            if k not in t and k != "id":
+                t[k] = v
+        tasks.append(t)
+    _get_store().insert_many(tasks)
+    invalidate_cache()
+    _agg_apply(upserts=tasks)
+    _search().add_many([(t["id"], task_text(t)) for t in tasks]
+                       + [(t["id"], a.get("text") or "") for t in tasks for a in t.get("activity") or ()])
+    _notify("create", [t["id"] for t in tasks])
+    return tasks
+
+@timed
 def set_status(task_id: str, status: str):
-    tasks = _load()
-    for t in tasks:
-        if t.get("id") == task_id:
-            t["status"] = status
-            if status in ("Closed","Completed") and not t.get("completed_at"):
-                t["completed_at"] = dtm.datetime.now(dtm.timezone.utc).isoformat()
-            elif status not in ("Closed","Completed"):
-                t.pop("completed_at", None)
-            break
-    _save(tasks)
+    set_status_many([task_id], status)
+
+@timed
+def set_status_many(task_ids: Iterable[str], status: str):
+    task_ids = list(task_ids)
+    store = _get_store()
+    cold = _archived(task_ids)
+    if cold:
+        _promote(cold)
+    if is_closed(status):
+        # completed_at is only stamped if missing; the store checks that under
+        # its write lock so a concurrent close can't overwrite the first stamp.
+        store.update_many(task_ids, {"status": status}, defaults={"completed_at": _now()})
+    else:
+        store.update_many(task_ids, {"status": status}, drop=("completed_at",))
+    invalidate_cache()
+    if _agg is not None:
+        _agg_apply(upserts=store.get_many(task_ids))
+    _notify("status", task_ids)
 
+@timed
 def add_activity(task_id: str, who: str, text: str):
-    tasks = _load()
-    for t in tasks:
-        if t.get("id") == task_id:
-            t.setdefault("activity", []).append({
-                "at": dtm.datetime.now(dtm.timezone.utc).isoformat(),
-                "who": who,
-                "text": text
-            })
-            break
-    _save(tasks)
+    add_activity_many([(task_id, who, text)])
+
+@timed
+def add_activity_many(entries: Iterable[tuple]):
+    """Append many (task_id, who, text) entries in one store write."""
+    entries = list(entries)
+    now = _now()
+    cold = set(_archived({e[0] for e in entries}))
+    # Activity lives in its own append-only log, so cached task snapshots stay valid.
+    _get_store().append_activity_many(
+        (task_id, {"at": now, "who": who, "text": text}) for task_id, who, text in entries if task_id not in cold
+    )
+    if cold:
+        _get_archive().append_activity_many(
+            (task_id, {"at": now, "who": who, "text": text}) for task_id, who, text in entries if task_id in cold
+        )
+    _search().add_many((task_id, text) for task_id, _, text in entries)
+    touched = list(dict.fromkeys(e[0] for e in entries))
+    for task_id in touched:
+        llm_cache.invalidate_task(task_id)
+    _notify("activity", touched)
+
+@timed
+def iter_activity(task_id: str, before: int | None = None, limit: int | None = 20) -> List[Dict[str,Any]]:
+    """Newest-first page of a task's activity. Pass the last entry's `seq` as `before` for the next page."""
+    return _store_of(task_id).iter_activity(task_id, before, limit)
+
+@timed
+def activity_count(task_id: str) -> int:
+    return _store_of(task_id).activity_count(task_id)
 
+def _store_of(task_id: str):
+    return _get_archive() if _archived([task_id]) else _get_store()
+
+@timed
 def delete_task(task_id: str):
-    tasks = [t for t in _load() if t.get("id") != task_id]
-    _save(tasks)
+    store = _store_of(task_id)
+    t = store.get(task_id)
+    # Everything indexed under the task, so removal visits only its own terms
+    # instead of scanning the whole vocabulary.
+    text = None if t is None else "\n".join(
+        [task_text(t)] + [a.get("text") or "" for a in store.iter_activity(task_id, limit=None)])
+    if store is not _get_store():
+        store.delete(task_id)
+    _get_store().delete(task_id)
+    invalidate_cache()
+    _agg_apply(removes=[task_id])
+    _search().remove(task_id, text)
+    llm_cache.invalidate_task(task_id)
+    _notify("delete", [task_id])
 
-def by_status(prefix: str) -> List[Dict[str,Any]]:
+@timed
+def by_status(prefix: str, include_archived: bool = False) -> List[Mapping[str,Any]]:
+    snap = _cached()
     p = (prefix or "").lower()
-    return [t for t in _load() if (t.get("status") or "").lower().startswith(p)]
\ No newline at end of file
+    hit = snap.memo.get(("prefix", p))
+    if hit is None:
+        hit = snap.memo[("prefix", p)] = tuple(snap.table.take(snap.table.status_rows(lambda s: s.startswith(p))))
+    out = list(hit)
+    cold = _get_archive(create=False) if include_archived else None
+    if cold is not None:
+        out += [_freeze(t) for t in cold.by_status(prefix)]
+    return out
+
+@timed
+def query_tasks(status=None, tag: str | None = None, text: str | None = None, sort: str = "newest",
+                offset: int = 0, limit: int | None = 50) -> Tuple[List[Mapping[str,Any]], int]:
+    """Filtered, sorted page of tasks: returns (page, total_matches).
+
+    status is one status or a list of them (case-insensitive), tag an exact
+    tag, text a case-insensitive substring of title/description. sort is one
+    of "newest", "oldest", "title", "status".
+    """
+    store = _get_store()
+    if hasattr(store, "query"):
+        rows, total = store.query(status, tag, text, sort, offset, limit)
+        return [_freeze(t) for t in rows], total
+    # Stores without indexes: filter the shared snapshot once per distinct
+    # query and reuse the ordered result for every page until the next write.
+    statuses = None if not status else tuple(sorted(s.lower() for s in ([status] if isinstance(status, str) else status)))
+    needle = (text or "").lower()
+    snap = _cached()
+    key = ("query", statuses, tag or None, needle, sort)
+    hit = snap.memo.get(key)
+    if hit is None:
+        import numpy as np
+        table = snap.table
+        rows = np.arange(len(table)) if statuses is None else table.status_rows(lambda s: s in statuses)
+        if tag:
+            rows = rows[[tag in table.tags[i] for i in rows.tolist()]]
+        if needle:
+            rows = rows[[needle in (table.value(i, "title") or "").lower()
+                         or needle in (table.value(i, "description") or "").lower() for i in rows.tolist()]]
+        col, desc = SORTS.get(sort, SORTS["newest"])
+        hit = snap.memo[key] = tuple(table.take(table.order(rows, col, desc)))
+    end = None if limit is None else offset + limit
+    return list(hit[offset:end]), len(hit)
+
+@timed
+def list_tags() -> List[str]:
+    store = _get_store()
+    if hasattr(store, "list_tags"):
+        return store.list_tags()
+    snap = _cached()
+    hit = snap.memo.get(("tags",))
+    if hit is None:
+        hit = snap.memo[("tags",)] = tuple(sorted({g for tg in set(snap.table.tags) for g in tg}))
+    return list(hit)
+
+# ---------- export ----------
+# Flat task and activity rows for reporting jobs, read straight from the
+# store(s) a batch at a time. Nothing goes through the snapshot, so an export
+# of millions of tasks runs in memory proportional to `batch`.
+
+EXPORT_TASK_FIELDS = ("id", "title", "description", "status", "tags", "due_days", "created_at", "completed_at",
+                      "source_id", "archived", "activity_count", "extra")
+EXPORT_ACTIVITY_FIELDS = ("task_id", "seq", "at", "who", "text")
+_EXPORT_KNOWN = frozenset(EXPORT_TASK_FIELDS) | {"activity"}
+
+def _changed_since(since: float) -> set | None:
+    from . import changes
+    return changes.feed().ids_since(since)
+
+def _touched(t: Dict[str,Any], acts: List[Dict[str,Any]], since: float) -> bool:
+    # Without the change feed, timestamps are all there is: a bare status
+    # change that didn't close the task goes unnoticed.
+    return (parse_epoch(t.get("created_at")) >= since or parse_epoch(t.get("completed_at")) >= since
+            or any(parse_epoch(a.get("at")) >= since for a in acts))
+
+def _export_row(t: Dict[str,Any], archived: bool, n_acts: int) -> Dict[str,Any]:
+    extra = {k: v for k, v in t.items() if k not in _EXPORT_KNOWN}
+    return {"id": t.get("id"), "title": t.get("title"), "description": t.get("description"),
+            "status": t.get("status"), "tags": ",".join(t.get("tags") or []), "due_days": t.get("due_days"),
+            "created_at": t.get("created_at"), "completed_at": t.get("completed_at"),
+            "source_id": None if t.get("source_id") is None else str(t["source_id"]),
+            "archived": archived, "activity_count": n_acts,
+            "extra": json.dumps(extra, default=str) if extra else None}
+
+def iter_export(since: float | None = None, batch: int = 1000, include_archived: bool = True
+                ) -> Iterator[Tuple[List[Dict[str,Any]], List[Dict[str,Any]]]]:
+    """(task rows, activity rows) per batch of tasks, flattened to EXPORT_*_FIELDS.
+
+    With `since` (epoch seconds) only tasks written at or after it are
+    exported, each with its full activity. The change feed says which; if it
+    no longer reaches back that far, tasks are picked by their created,
+    completed and activity timestamps instead.
+    """
+    changed = None if since is None else _changed_since(since)
+    stores = [(_get_store(), False)]
+    if include_archived and _get_archive(create=False) is not None:
+        stores.append((_get_archive(), True))
+    for store, archived in stores:
+        for chunk in store.iter_all(batch):
+            if changed is not None:
+                chunk = [t for t in chunk if t.get("id") in changed]
+            acts = store.activity_many([t["id"] for t in chunk])
+            if since is not None and changed is None:
+                chunk = [t for t in chunk if _touched(t, acts[t["id"]], since)]
+            if not chunk:
+                continue
+            tasks, rows = [], []
+            for t in chunk:
+                a = acts[t["id"]]
+                tasks.append(_export_row(t, archived, len(a)))
+                rows.extend({"task_id": t["id"], "seq": e.get("seq"), "at": e.get("at"), "who": e.get("who"),
+                             "text": e.get("text")} for e in a)
+            incr("export.tasks", len(tasks))
+            yield tasks, rows
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Mapping
+from functools import lru_cache
+import math, time, datetime as dtm
+from dateutil import tz
+
+DAY = 86400
+OVERDUE_AFTER_DAYS = 5     # older than this -> overdue
+NEARING_FROM_DAYS = 3      # 3..5 days old -> nearing deadline
+CLOSED_STATUSES = ("closed", "completed")
+DEFAULT_ZONE = "Asia/Kolkata"
+DISPLAY_FORMAT = "%b %d, %Y, %I:%M %p"
+_NAN = float("nan")
+
+
+def is_closed(status) -> bool:
+    """Whether a status counts as closed. Statuses are stored as entered or
+    imported, so case and surrounding spaces are ignored; the snapshot table,
+    aggregates, archive and similarity index all decide through this."""
+    return str(status or "").strip().lower() in CLOSED_STATUSES
+
+
+@lru_cache(maxsize=None)
+def tzinfo(zone: str):
+    return tz.gettz(zone)
+
+
+@lru_cache(maxsize=1 << 17)
+def _parse(s: str) -> float:
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        d = dtm.datetime.fromisoformat(s)
+    except ValueError:
+        try:
+            d = dtm.datetime.strptime(s, "%Y-%m-%d")
+        except ValueError:
+            return _NAN
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=dtm.timezone.utc)
+    return d.timestamp()
+
+
+def parse_epoch(value) -> float:
+    """ISO timestamp (or date) as epoch seconds; naive means UTC, missing/garbage is NaN.
+
+    Parses are memoized, so re-rendering the same tasks costs a dict lookup each.
+    """
+    if value is None or value == "":
+        return _NAN
+    if isinstance(value, (int, float)):
+        return float(value)
+    return _parse(str(value).strip())
+
+
+@lru_cache(maxsize=1 << 16)
+def _fmt_minute(minute: int, zone: str) -> str:
+    return dtm.datetime.fromtimestamp(minute * 60, tzinfo(zone)).strftime(DISPLAY_FORMAT)
+
+
+def format_epoch(e: float, zone: str = DEFAULT_ZONE) -> str:
+    # The display has minute resolution, so everything in one minute shares a cache entry.
+    return "-" if math.isnan(e) else _fmt_minute(int(e // 60), zone)
+
+
+def to_local(dt_iso, zone: str = DEFAULT_ZONE) -> str:
+    if not dt_iso:
+        return "-"
+    e = parse_epoch(dt_iso)
+    if math.isnan(e):
+        raise ValueError(f"Invalid isoformat string: {dt_iso!r}")
+    return format_epoch(e, zone)
+
+
+def age_days(created_at, now: float | None = None) -> int:
+    e = parse_epoch(created_at)
+    if math.isnan(e):
+        return 0
+    now = time.time() if now is None else now
+    return max(0, int((now - e) // DAY))
+
+
+def pct_complete(created_at, due_days=5, now: float | None = None) -> float:
+    """How much of the task's due window has elapsed, 0-100."""
+    e = parse_epoch(created_at)
+    if math.isnan(e):
+        return 0.0
+    window = float(due_days or 0) * DAY
+    if window <= 0:
+        return 100.0
+    now = time.time() if now is None else now
+    return min(100.0, max(0.0, (now - e) / window * 100.0))
+
+
+def urgency(age: int, closed: bool = False) -> str:
+    if closed:
+        return "closed"
+    if age > OVERDUE_AFTER_DAYS:
+        return "overdue"
+    return "nearing" if age >= NEARING_FROM_DAYS else "on track"
+
+
+def task_times(tasks: Iterable[Mapping[str,Any]], now: float | None = None,
+               zone: str = DEFAULT_ZONE) -> Dict[str, Any]:
+    """Ages, progress, urgency and display strings for a list of tasks in one pass.
+
+    Returns column arrays aligned with `tasks`: created / completed (epoch,
+    NaN if missing), age_days, progress (0-100), urgency and the
+    created_local / completed_local display strings.
+    """
+    import numpy as np
+    from .table import table_rows
+    tasks = list(tasks)
+    n = len(tasks)
+    now = time.time() if now is None else now
+    cols = table_rows(tasks)
+    if cols is not None:
+        # Rows of the shared task table: read the columns, no parsing at all.
+        table, rows = cols
+        created, completed = table.created_seconds(rows), table.completed_seconds(rows)
+        due = np.nan_to_num(table.due_days(rows))
+        closed = table.closed_mask()[rows]
+    else:
+        created = np.fromiter((parse_epoch(t.get("created_at")) for t in tasks), dtype=np.float64, count=n)
+        completed = np.fromiter((parse_epoch(t.get("completed_at")) for t in tasks), dtype=np.float64, count=n)
+        due = np.fromiter((float(t.get("due_days", 5) or 0) for t in tasks), dtype=np.float64, count=n)
+        closed = np.fromiter((is_closed(t.get("status")) for t in tasks), dtype=bool, count=n)
+
+    elapsed = np.nan_to_num(now - created, nan=0.0)
+    age = np.maximum(elapsed // DAY, 0).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        progress = np.where(due > 0, np.clip(elapsed / (due * DAY) * 100.0, 0.0, 100.0), 100.0)
+    progress[np.isnan(created)] = 0.0
+    bucket = np.select([closed, age > OVERDUE_AFTER_DAYS, age >= NEARING_FROM_DAYS],
+                       ["closed", "overdue", "nearing"], "on track")
+
+    def local(col):
+        minutes = np.floor_divide(col, 60)
+        return ["-" if m != m else _fmt_minute(int(m), zone) for m in minutes.tolist()]
+
+    return {
+        "created": created,
+        "completed": completed,
+        "age_days": age,
+        "progress": progress,
+        "urgency": bucket,
+        "created_local": local(created),
+        "completed_local": local(completed),
+    }
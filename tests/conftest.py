@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture
+def tm(tmp_path, monkeypatch):
+    """task_manager on a fresh SQLite store under tmp_path (paths are relative to the working directory)."""
+    monkeypatch.chdir(tmp_path)
+    from services import task_manager, changes, context, similar, llm_cache
+    singletons = {task_manager: ("_store", "_archive", "_snapshot", "_agg", "_search_index"),
+                  changes: ("_feed", "_watcher"), context: ("_store",), similar: ("_index",), llm_cache: ("_cache",)}
+    for mod, names in singletons.items():
+        for name in names:
+            monkeypatch.setattr(mod, name, None)
+    monkeypatch.setattr(task_manager, "BACKEND", "sqlite")
+    monkeypatch.setattr(task_manager, "ARCHIVE_AFTER_DAYS", 0)
+    return task_manager
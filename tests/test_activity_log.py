@@ -0,0 +1,65 @@
+import os
+from services.activity_log import ActivityLog
+
+
+def _fill(log, tid, n):
+    log.append_many(tid, [{"who": "ana", "text": f"note {i}"} for i in range(n)])
+
+
+def _texts(entries):
+    return [e["text"] for e in entries]
+
+
+def test_pages_walk_back_from_newest(tmp_path):
+    log = ActivityLog(str(tmp_path))
+    _fill(log, "TASK-1", 45)
+    seen, before = [], None
+    while True:
+        page = log.page("TASK-1", before, 20)
+        if not page:
+            break
+        assert [e["seq"] for e in page] == sorted((e["seq"] for e in page), reverse=True)
+        seen.append(len(page))
+        before = page[-1]["seq"]
+    assert seen == [20, 20, 5]
+    assert _texts(log.page("TASK-1", None, 2)) == ["note 44", "note 43"]
+    assert _texts(log.page("TASK-1", 1, 20)) == ["note 0"]
+    assert log.page("TASK-1", 0, 20) == []
+    assert len(log.page("TASK-1", 10_000, 5)) == 5
+    assert _texts(log.page("TASK-1", None, None)) == [f"note {i}" for i in reversed(range(45))]
+    assert log.count("TASK-1") == 45 and log.page("TASK-2") == [] and log.count("TASK-2") == 0
+
+
+def test_append_returns_seq_and_keeps_text_intact(tmp_path):
+    log = ActivityLog(str(tmp_path))
+    assert log.append("TASK-1", {"who": "ana", "text": "first"}) == 0
+    text = "line one\nline two — ünïcode ✓"
+    assert log.append("TASK-1", {"who": "bo", "text": text}) == 1
+    assert log.page("TASK-1") == [{"who": "bo", "text": text, "seq": 1}, {"who": "ana", "text": "first", "seq": 0}]
+
+
+def test_torn_tail_is_dropped_on_next_append(tmp_path):
+    log = ActivityLog(str(tmp_path))
+    _fill(log, "TASK-1", 3)
+    # A crash after writing the entry but before recording its offset.
+    with open(tmp_path / "TASK-1.jsonl", "ab") as f:
+        f.write(b'{"who": "ana", "text": "half')
+    assert log.count("TASK-1") == 3
+    log.append("TASK-1", {"who": "ana", "text": "after crash"})
+    assert _texts(log.page("TASK-1")) == ["after crash", "note 2", "note 1", "note 0"]
+
+
+def test_ids_map_to_distinct_safe_files(tmp_path):
+    log = ActivityLog(str(tmp_path))
+    for tid in ("a/b", "a_b", "../x"):
+        log.append(tid, {"text": tid})
+    assert {tid: _texts(log.page(tid)) for tid in ("a/b", "a_b", "../x")} == {"a/b": ["a/b"], "a_b": ["a_b"], "../x": ["../x"]}
+    assert all(os.path.dirname(os.path.abspath(p)) == str(tmp_path) for p in log._paths("../x"))
+
+
+def test_delete(tmp_path):
+    log = ActivityLog(str(tmp_path))
+    _fill(log, "TASK-1", 2)
+    log.delete("TASK-1")
+    log.delete("TASK-1")
+    assert log.count("TASK-1") == 0 and log.page("TASK-1") == []
@@ -0,0 +1,87 @@
+import random, time, datetime as dtm
+from services.aggregates import TaskAggregates
+from services.storage import open_store
+from services.table import TaskTable
+from services.temporal import DAY, age_days, urgency, is_closed
+
+NOW = dtm.datetime(2024, 6, 1, 12, tzinfo=dtm.timezone.utc).timestamp()
+
+
+def _iso(days_ago):
+    return dtm.datetime.fromtimestamp(NOW - days_ago * DAY, dtm.timezone.utc).isoformat()
+
+
+def _random_tasks(n=300, seed=7):
+    rnd = random.Random(seed)
+    tasks = []
+    for i in range(n):
+        created = rnd.choice([_iso(rnd.uniform(0, 12)), _iso(rnd.randint(0, 12)), "", "not a date"])
+        tasks.append({"id": f"TASK-{i}", "title": f"t{i}", "created_at": created,
+                      "status": rnd.choice(["Open", "In Progress", "Closed", " completed"])})
+    return tasks
+
+
+def _scan(tasks):
+    buckets = [urgency(age_days(t["created_at"], NOW), is_closed(t["status"])) for t in tasks]
+    return {"total": len(tasks), "open": len(tasks) - buckets.count("closed"), "closed": buckets.count("closed"),
+            "overdue": buckets.count("overdue"), "nearing": buckets.count("nearing")}
+
+
+def test_kpis_match_a_full_scan():
+    tasks = _random_tasks()
+    expected = _scan(tasks)
+    assert TaskAggregates.build(tasks).kpis(NOW) == expected
+    assert TaskAggregates.build(TaskTable(tasks)).kpis(NOW) == expected
+
+
+def test_updates_match_a_rebuild():
+    tasks = _random_tasks()
+    agg = TaskAggregates.build(tasks[:200])
+    rnd = random.Random(3)
+    live = {t["id"]: t for t in tasks[:200]}
+    for t in tasks[200:]:
+        agg.upsert(t)
+        live[t["id"]] = t
+    for tid in rnd.sample(sorted(live), 40):
+        t = dict(live[tid], status=rnd.choice(["Open", "Closed"]))
+        agg.upsert(t)
+        live[tid] = t
+    for tid in rnd.sample(sorted(live), 30):
+        agg.remove(tid)
+        del live[tid]
+    agg.remove("TASK-missing")
+    assert agg.kpis(NOW) == _scan(list(live.values()))
+    assert agg.overdue(now=NOW) == TaskAggregates.build(list(live.values())).overdue(now=NOW)
+
+
+def test_bucket_boundaries_follow_age_days():
+    ages = [6.0, 5.99, 3.0, 2.99, 0]
+    agg = TaskAggregates.build([{"id": f"TASK-{i}", "title": str(a), "status": "Open", "created_at": _iso(a)}
+                                for i, a in enumerate(ages)])
+    assert agg.kpis(NOW) == {"total": 5, "open": 5, "closed": 0, "overdue": 1, "nearing": 2}
+    assert [t["title"] for t in agg.overdue(now=NOW)] == ["6.0"]
+
+
+def test_overdue_oldest_first_with_limit():
+    tasks = [{"id": f"TASK-{i}", "title": f"t{i}", "status": "Open", "created_at": _iso(d)}
+             for i, d in enumerate([9, 30, 7, 1, 12])]
+    agg = TaskAggregates.build(tasks)
+    assert [t["id"] for t in agg.overdue(now=NOW)] == ["TASK-1", "TASK-4", "TASK-0", "TASK-2"]
+    assert [t["id"] for t in agg.overdue(2, now=NOW)] == ["TASK-1", "TASK-4"]
+    assert agg.overdue(now=NOW)[0] == {"id": "TASK-1", "title": "t1", "status": "Open", "created_at": _iso(30)}
+
+
+def test_task_kpis_follow_writes(tm):
+    old = (dtm.datetime.now(dtm.timezone.utc) - dtm.timedelta(days=20)).isoformat()
+    a, b, c = tm.create_tasks([{"title": "a", "created_at": old}, {"title": "b", "created_at": old}, {"title": "c"}])
+    assert tm.task_kpis() == {"total": 3, "open": 3, "closed": 0, "overdue": 2, "nearing": 0}
+    tm.set_status(a["id"], "Closed")
+    tm.delete_task(c["id"])
+    assert tm.task_kpis() == {"total": 2, "open": 1, "closed": 1, "overdue": 1, "nearing": 0}
+    assert [t["id"] for t in tm.overdue_tasks()] == [b["id"]]
+    # Written by another process: the version moves and the aggregates are rebuilt.
+    open_store("sqlite", tm.DB_PATH).update(b["id"], {"status": "Closed"})
+    assert tm.task_kpis()["closed"] == 2 and tm.overdue_tasks() == []
+    # Archived tasks still count as closed.
+    assert tm.archive_closed(1, now=time.time() + 10 * DAY) == 2
+    assert tm.task_kpis() == {"total": 2, "open": 0, "closed": 2, "overdue": 0, "nearing": 0}
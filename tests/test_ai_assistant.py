@@ -0,0 +1,162 @@
+import json, time
+import pytest
+from benchmarks.stub_server import StubServer, _Handler
+from services import ai_assistant
+from services.ai_assistant import ChatClient, ChatError, RateLimiter
+
+MESSAGES = [{"role": "user", "content": "Why is the pipe stuck?"}]
+
+
+def _serve(replies=(), events=None):
+    """Stub server that first answers with `replies` ((status, headers, body) each), then normally.
+
+    `events` replaces the streamed body with these raw SSE lines.
+    """
+    seen = []
+
+    class Handler(_Handler):
+        def do_POST(self):
+            seen.append(time.monotonic())
+            if len(seen) <= len(replies):
+                status, headers, body = replies[len(seen) - 1]
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if events is None:
+                return super().do_POST()
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.send_response(200)
+            # No charset, as many servers send it.
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for line in events:
+                self._chunk(line if isinstance(line, bytes) else line.encode("utf-8"))
+            self.wfile.write(b"0\r\n\r\n")
+
+    srv = StubServer()
+    srv.httpd.RequestHandlerClass = Handler
+    return srv, seen
+
+
+def _client(url, **kw):
+    kw.setdefault("backoff", 0.0)
+    return ChatClient(api_key="k", url=url, read_timeout=5.0, **kw)
+
+
+def _event(tok):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": tok}}]}, ensure_ascii=False) + "\n\n"
+
+
+def test_chat_and_stream():
+    srv, _ = _serve()
+    with srv:
+        c = _client(srv.url)
+        assert c.chat(MESSAGES) == "Check the query profile first."
+        assert list(c.stream_chat(MESSAGES)) == _Handler.tokens
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_transient_statuses(status):
+    srv, seen = _serve([(status, {}, b"busy")] * 2)
+    with srv:
+        assert _client(srv.url, max_retries=2).chat(MESSAGES) == "Check the query profile first."
+    assert len(seen) == 3
+
+
+def test_retry_after_is_honoured():
+    limiter = RateLimiter(6000)
+    srv, seen = _serve([(429, {"Retry-After": "0.3"}, b"slow down")])
+    with srv:
+        assert list(_client(srv.url, limiter=limiter).stream_chat(MESSAGES)) == _Handler.tokens
+    assert seen[1] - seen[0] >= 0.3
+    # The whole client backs off, not just this request.
+    assert limiter.paused_until >= seen[0] + 0.3
+
+
+def test_retry_after_is_capped():
+    srv, seen = _serve([(503, {"Retry-After": "3600"}, b"")])
+    with srv:
+        _client(srv.url, max_backoff=0.1).chat(MESSAGES)
+    assert seen[1] - seen[0] < 5
+
+
+def test_gives_up_after_max_retries():
+    srv, seen = _serve([(503, {}, b"still down")] * 3)
+    with srv:
+        with pytest.raises(ChatError) as e:
+            _client(srv.url, max_retries=2).chat(MESSAGES)
+    assert (e.value.status, e.value.text) == (503, "still down")
+    assert str(e.value) == "503 still down"
+    assert len(seen) == 3
+
+
+def test_client_errors_are_not_retried():
+    srv, seen = _serve([(400, {}, b'{"error": "model not found"}')])
+    with srv:
+        with pytest.raises(ChatError) as e:
+            _client(srv.url).chat(MESSAGES)
+    assert e.value.status == 400 and "model not found" in e.value.text
+    assert len(seen) == 1
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Point groq_chat/groq_chat_stream at a client for `url`, with the answer cache off."""
+    monkeypatch.setenv("GROQ_API_KEY", "k")
+    monkeypatch.setenv("TASKPILOT_LLM_CACHE", "0")
+
+    def use(url, **kw):
+        monkeypatch.setattr(ai_assistant, "_client", _client(url, **kw))
+    return use
+
+
+def test_terminal_error_strings(groq):
+    srv, _ = _serve([(401, {}, b"invalid api key")] * 2)
+    with srv:
+        groq(srv.url)
+        assert ai_assistant.groq_chat(MESSAGES, use_cache=False) == "Groq API error: 401 invalid api key"
+        assert list(ai_assistant.groq_chat_stream(MESSAGES, use_cache=False)) == ["Groq API error: 401 invalid api key"]
+
+
+def test_connection_error_string(groq):
+    srv, _ = _serve()
+    url = srv.url
+    srv.httpd.server_close()
+    groq(url, max_retries=1)
+    assert ai_assistant.groq_chat(MESSAGES, use_cache=False).startswith("Groq API error: ")
+    out = list(ai_assistant.groq_chat_stream(MESSAGES, use_cache=False))
+    assert len(out) == 1 and out[0].startswith("Groq API error: ")
+
+
+def test_no_key(monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.delenv("groq_api_key", raising=False)
+    assert ai_assistant.groq_chat(MESSAGES).startswith("Set groq_api_key")
+
+
+def test_sse_parsing():
+    events = [": keep-alive\n\n", "event: message\n", _event("Re"), "data: not json\n\n",
+              "data: " + json.dumps({"choices": [{"delta": {}}, {"delta": {"content": "start"}}]}) + "\n\n",
+              # One network chunk can carry several events, and one event can span chunks.
+              _event(" the") + _event(" task"), 'data: {"choices": [{"del', 'ta": {"content": "."}}]}\n\n',
+              "data: [DONE]\n\n", _event("after done")]
+    srv, _ = _serve(events=events)
+    with srv:
+        assert list(_client(srv.url).stream_chat(MESSAGES)) == ["Re", "start", " the", " task", "."]
+
+
+def test_stream_decodes_utf8():
+    # Raw (unescaped) UTF-8 in a text/event-stream response with no charset,
+    # including a character split across two network chunks.
+    toks = ["Café", " → ", "données ", "✓"]
+    split = _event("日本").encode("utf-8")
+    cut = split.index("日".encode("utf-8")) + 1
+    srv, _ = _serve(events=[_event(t) for t in toks] + [split[:cut], split[cut:], "data: [DONE]\n\n"])
+    with srv:
+        assert list(_client(srv.url).stream_chat(MESSAGES)) == toks + ["日本"]
@@ -0,0 +1,85 @@
+import time
+from services import similar
+
+
+def _closed_tasks(tm, n=3):
+    tasks = tm.create_tasks([{"title": f"snowpipe stopped loading {i}", "description": "pipe paused"} for i in range(n)]
+                            + [{"title": "still open"}])
+    ids = [t["id"] for t in tasks]
+    tm.set_status_many(ids[:n], "Closed")
+    return ids
+
+
+def _later(days=10):
+    return time.time() + days * 86400
+
+
+def test_archive_leaves_similar_vectors_alone(tm):
+    ids = _closed_tasks(tm)
+    idx = similar._ensure_built()
+    rows = idx._n
+    assert tm.archive_closed(1, now=_later()) == 3
+    idx.refresh()
+    assert idx._n == rows
+    hits = similar.similar_tasks({"id": "query", "title": "snowpipe stopped loading"}, k=5)
+    assert {h["id"] for h in hits} == set(ids[:3])
+
+
+def test_archive_moves_only_long_closed_tasks(tm):
+    old, recent, still_open = tm.create_tasks([
+        {"title": "old", "status": "Closed", "completed_at": "2020-01-01T00:00:00+00:00",
+         "activity": [{"at": "2020-01-01T00:00:00+00:00", "who": "ana", "text": "fixed the stage"}]},
+        {"title": "recent", "status": "Closed"},
+        {"title": "still open", "created_at": "2020-01-01T00:00:00+00:00"}])
+    assert tm.archive_closed(0) == 0
+    assert tm.archive_closed(30) == 1
+    assert tm.archived_count() == 1
+    assert [t["id"] for t in tm.list_tasks()] == [recent["id"], still_open["id"]]
+    assert {t["id"] for t in tm.list_tasks(include_archived=True)} == {old["id"], recent["id"], still_open["id"]}
+    assert [t["id"] for t in tm.by_status("closed", include_archived=True)] == [recent["id"], old["id"]]
+    # Lookups, activity and search fall through to the archive.
+    assert tm.get_task(old["id"])["title"] == "old"
+    assert [t["id"] for t in tm.get_tasks([old["id"], recent["id"]])] == [recent["id"], old["id"]]
+    assert [a["text"] for a in tm.iter_activity(old["id"])] == ["fixed the stage"]
+    assert [t["id"] for t in tm.search_tasks("stage")] == [old["id"]]
+    assert tm.archive_closed(30) == 0
+
+
+def test_note_on_archived_task_stays_in_archive(tm):
+    ids = _closed_tasks(tm, n=1)
+    tm.archive_closed(1, now=_later())
+    tm.add_activity(ids[0], "ana", "linked from the postmortem")
+    assert tm.archived_count() == 1 and tm.get_task(ids[0]) is not None
+    assert [a["text"] for a in tm.iter_activity(ids[0])] == ["linked from the postmortem"]
+    assert tm.activity_count(ids[0]) == 1
+
+
+def test_reopening_promotes_with_activity(tm):
+    ids = _closed_tasks(tm, n=2)
+    tm.add_activity(ids[0], "ana", "root cause: paused pipe")
+    tm.archive_closed(1, now=_later())
+    kpis = tm.task_kpis()
+    tm.set_status(ids[0], "Open")
+    assert tm.archived_count() == 1
+    t = tm.get_task(ids[0])
+    assert t["status"] == "Open" and "completed_at" not in t
+    assert ids[0] in {x["id"] for x in tm.list_tasks()}
+    assert [a["text"] for a in tm.iter_activity(ids[0])] == ["root cause: paused pipe"]
+    after = tm.task_kpis()
+    assert (after["open"], after["closed"], after["total"]) == (kpis["open"] + 1, kpis["closed"] - 1, kpis["total"])
+    # Closing it again keeps it hot until the next archive run.
+    tm.set_status(ids[0], "Closed")
+    assert tm.archived_count() == 1 and tm.archive_closed(1, now=_later()) == 1
+
+
+def test_archive_runs_in_background_when_enabled(tm, monkeypatch):
+    _closed_tasks(tm, n=2)
+    monkeypatch.setattr(tm, "ARCHIVE_AFTER_DAYS", 1)
+    monkeypatch.setattr(tm, "_archive_checked", 0.0)
+    monkeypatch.setattr(tm.time, "time", lambda real=time.time: real() + 10 * 86400)
+    tm.invalidate_cache()
+    tm.list_tasks()
+    # The run holds the archive lock until it finishes.
+    assert tm._archive_lock.acquire(timeout=10)
+    tm._archive_lock.release()
+    assert tm.archived_count() == 2
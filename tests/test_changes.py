@@ -0,0 +1,95 @@
+import time
+import pytest
+from services import changes
+from services.changes import ChangeFeed, LiveView
+
+
+@pytest.fixture
+def view(tm):
+    # Open tasks only, like the dashboard's working list.
+    return LiveView(lambda: [t for t in tm.list_tasks() if t["status"] != "Closed"],
+                    lambda t: t["status"] != "Closed")
+
+
+def _ids(view):
+    return sorted(t["id"] for t in view.tasks())
+
+
+def test_live_view_patches_only_what_changed(tm, view):
+    a, b, c = tm.create_tasks([{"title": "a"}, {"title": "b"}, {"title": "c"}])
+    assert view.refresh() == -1 and _ids(view) == sorted([a["id"], b["id"], c["id"]])
+    assert view.refresh() == 0
+
+    (d,) = tm.create_tasks([{"title": "d"}])
+    tm.set_status(a["id"], "Closed")
+    tm.add_activity(b["id"], "ana", "note")
+    assert view.refresh() == 3
+    assert _ids(view) == sorted([b["id"], c["id"], d["id"]])
+
+    tm.set_status(a["id"], "Open")
+    tm.delete_task(c["id"])
+    assert view.refresh() == 2
+    assert _ids(view) == sorted([a["id"], b["id"], d["id"]])
+
+
+def test_live_view_agrees_with_a_full_load(tm, view):
+    tasks = tm.create_tasks([{"title": f"t{i}"} for i in range(30)])
+    view.refresh()
+    for i, t in enumerate(tasks):
+        if i % 3 == 0:
+            tm.set_status(t["id"], "Closed")
+        elif i % 3 == 1:
+            tm.set_status(t["id"], "In Progress")
+        if i % 7 == 0:
+            tm.delete_task(t["id"])
+    tm.create_tasks([{"title": "late"}])
+    view.refresh()
+    fresh = LiveView(view.load, view.keep)
+    fresh.refresh()
+    assert {t["id"]: t["status"] for t in view.tasks()} == {t["id"]: t["status"] for t in fresh.tasks()}
+
+
+def test_archived_tasks_drop_out(tm):
+    view = LiveView(lambda: tm.list_tasks(), lambda t: True)
+    (a, b) = tm.create_tasks([{"title": "a", "status": "Closed", "completed_at": "2020-01-01T00:00:00+00:00"},
+                              {"title": "b"}])
+    view.refresh()
+    tm.archive_closed(30)
+    assert view.refresh() == 1 and _ids(view) == [b["id"]]
+
+
+def test_reloads_when_the_feed_cannot_answer(tm, view, monkeypatch):
+    tm.create_tasks([{"title": "a"}])
+    view.refresh()
+    # The feed was reset under the view (e.g. the data directory was restored).
+    view.version = 10 ** 6
+    assert view.refresh() == -1
+    monkeypatch.setattr(changes, "MAX_PATCHED", 1)
+    tm.create_tasks([{"title": "b"}, {"title": "c"}])
+    assert view.refresh() == 2
+    assert view.refresh() == -1 and len(view.tasks()) == 3
+
+
+def test_watcher_sees_other_processes(tm):
+    w = changes.watcher()
+    v = w.version
+    # A second connection stands in for another server process.
+    ChangeFeed(changes.FEED_PATH).append("create", ["TASK-99"])
+    assert w.wait(v, timeout=5) == v + 1
+    tm.create_tasks([{"title": "local"}])
+    # This process's own writes bump the version at once.
+    assert w.version == v + 2
+
+
+def test_ids_since(tmp_path):
+    f = ChangeFeed(str(tmp_path / "changes.db"))
+    start = f.created_at()
+    assert f.ids_since(start - 1) is None
+    f.append("create", ["TASK-1", "TASK-2"])
+    mid = time.time()
+    time.sleep(0.01)
+    f.append("status", ["TASK-2", "TASK-3"])
+    assert f.ids_since(start) == {"TASK-1", "TASK-2", "TASK-3"}
+    assert f.ids_since(mid) == {"TASK-2", "TASK-3"}
+    assert f.since(1) == (2, {"TASK-2": "status", "TASK-3": "status"})
+    assert f.since(0)[1] == {"TASK-1": "create", "TASK-2": "status", "TASK-3": "status"}
@@ -0,0 +1,67 @@
+import pytest
+from services import context
+from services.context import build_prompt, estimate_tokens, truncate_tokens, RECENT_WINDOW
+
+
+def _task(tm, n_acts, description="files queued behind a paused pipe"):
+    (t,) = tm.create_tasks([{"title": "Snowpipe backlog", "description": description}])
+    tm.add_activity_many([(t["id"], "ana" if i % 3 else "bo", f"update {i}. " + "detail " * 30) for i in range(n_acts)])
+    return tm.get_task(t["id"])
+
+
+def test_truncate_tokens():
+    assert truncate_tokens("short", 10) == "short"
+    assert truncate_tokens("x" * 100, 0) == ""
+    cut = truncate_tokens("word " * 100, 10)
+    assert cut.endswith("…") and estimate_tokens(cut) <= 10
+
+
+@pytest.mark.parametrize("budget", [200, 500, 1500, 4000])
+def test_prompt_stays_within_budget(tm, budget):
+    task = _task(tm, 300, description="word " * 3000)
+    prompt = build_prompt(task, "What next?", ["Be brief."], budget=budget,
+                          extra_sections=[("Similar past tasks:", "x " * 2000)])
+    assert estimate_tokens(prompt) <= budget
+    # Instructions, title and question always make it in.
+    assert prompt.startswith("Be brief.\n\nTask: Snowpipe backlog") and prompt.endswith("Question: What next?")
+
+
+def test_recent_activity_verbatim_older_summarised(tm):
+    task = _task(tm, 30)
+    prompt = build_prompt(task, "What next?", ["Be brief."], budget=10_000)
+    recent = prompt.split("Recent Activity:\n")[1].split("\n\nQuestion")[0].splitlines()
+    # Oldest first, exactly the last RECENT_WINDOW entries.
+    assert [line.split(": ", 1)[1].split(".")[0] for line in recent] == [f"update {i}" for i in range(20, 30)]
+    summary = prompt.split("Earlier Activity (summary):\n")[1].split("\nRecent Activity:")[0]
+    assert summary.startswith("20 earlier updates") and "update 19" in summary and "update 20" not in summary
+    assert context._summaries().get(task["id"]).covered == 30 - RECENT_WINDOW
+
+
+def test_summary_folds_only_new_entries(tm, monkeypatch):
+    task = _task(tm, 25)
+    build_prompt(task, "q", [], budget=2000)
+    read = []
+    iter_activity = context.iter_activity
+    def spy(task_id, before=None, limit=20):
+        out = iter_activity(task_id, before, limit)
+        read.append(len(out))
+        return out
+    monkeypatch.setattr(context, "iter_activity", spy)
+    tm.add_activity(task["id"], "ana", "one more")
+    # The listener folded just the entry that slid out of the window.
+    assert read == [1]
+    assert context._summaries().get(task["id"]).state["count"] == 16
+
+
+def test_no_activity(tm):
+    task = _task(tm, 0)
+    prompt = build_prompt(task, "q", ["i"], budget=500)
+    assert "Activity" not in prompt and "Description: files queued" in prompt
+
+
+def test_delete_drops_summary(tm):
+    task = _task(tm, 15)
+    tm.add_activity(task["id"], "ana", "closing")
+    assert context._summaries().get(task["id"]).covered == 6
+    tm.delete_task(task["id"])
+    assert context._summaries().get(task["id"]).covered == 0
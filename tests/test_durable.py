@@ -0,0 +1,100 @@
+import os, stat, threading
+import multiprocessing as mp
+import pytest
+from services.durable import FileLock, GroupCommit, atomic_write, atomic_write_json
+from services.storage import open_store
+
+
+def _run(n, fn):
+    threads = [threading.Thread(target=fn, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_group_commit_batches_concurrent_callers():
+    batches = []
+    def apply(batch):
+        batches.append(list(batch))
+        return [m * 10 for m in batch]
+    gc = GroupCommit(apply, window=0.05)
+    out = {}
+    _run(8, lambda i: out.__setitem__(i, gc.submit(i)))
+    assert out == {i: i * 10 for i in range(8)}
+    assert sorted(m for b in batches for m in b) == list(range(8))
+    assert len(batches) < 8 and (gc.batches, gc.mutations) == (len(batches), 8)
+
+
+def test_group_commit_errors_reach_their_callers():
+    gc = GroupCommit(lambda batch: [ValueError(m) if m == "bad" else m for m in batch], window=0.05)
+    out = {}
+    def submit(i):
+        try:
+            out[i] = gc.submit("bad" if i == 0 else i)
+        except ValueError as e:
+            out[i] = e
+    _run(4, submit)
+    assert isinstance(out[0], ValueError) and [out[i] for i in (1, 2, 3)] == [1, 2, 3]
+
+    def boom(batch):
+        raise OSError("disk full")
+    with pytest.raises(OSError):
+        GroupCommit(boom, window=0).submit(1)
+
+
+@pytest.mark.parametrize("backend, name", [("sqlite", "tasks.db"), ("json", "tasks.json"), ("packed", "tasks.pack")])
+def test_store_group_commit_keeps_every_write(tmp_path, backend, name):
+    store = open_store(backend, str(tmp_path / name), group_commit_ms=20)
+    ids = [f"TASK-{i}" for i in range(1, 21)]
+    _run(20, lambda i: store.insert({"id": ids[i], "title": f"t{i}", "status": "Open"}))
+    assert store._group.mutations == 20 and store._group.batches < 20
+    assert sorted(t["id"] for t in open_store(backend, str(tmp_path / name)).all()) == sorted(ids)
+
+
+def test_file_lock_is_reentrant(tmp_path):
+    lock = FileLock(str(tmp_path / "x"))
+    with lock:
+        with lock:
+            assert lock._depth == 2
+    assert lock._depth == 0 and lock._fd is None
+
+
+def _bump(path, times):
+    lock = FileLock(path)
+    for _ in range(times):
+        with lock:
+            with open(path) as f:
+                n = int(f.read())
+            with open(path, "w") as f:
+                f.write(str(n + 1))
+
+
+def test_file_lock_serialises_processes_and_threads(tmp_path):
+    path = str(tmp_path / "counter")
+    with open(path, "w") as f:
+        f.write("0")
+    procs = [mp.get_context("spawn").Process(target=_bump, args=(path, 50)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    _run(3, lambda i: _bump(path, 50))
+    for p in procs:
+        p.join()
+    with open(path) as f:
+        assert int(f.read()) == 250
+
+
+def test_atomic_write_failure_keeps_old_file(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    atomic_write_json(path, [{"id": "TASK-1"}])
+    os.chmod(path, 0o640)
+    def half(f):
+        f.write("[{")
+        raise RuntimeError("crashed mid-write")
+    with pytest.raises(RuntimeError):
+        atomic_write(path, half)
+    with open(path) as f:
+        assert f.read() == '[{"id": "TASK-1"}]'
+    assert os.listdir(tmp_path) == ["tasks.json"]
+    atomic_write_json(path, [])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
@@ -0,0 +1,117 @@
+import csv, json, time
+import pytest
+from services import exporter, changes
+
+
+def _jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _seed(tm):
+    tasks = tm.create_tasks([
+        {"title": "Snowpipe backlog", "tags": ["snowflake", "etl"], "source_id": 42, "priority": "high",
+         "activity": [{"at": "2024-05-01T10:00:00+00:00", "who": "ana", "text": "paused — resumed"}]},
+        {"title": "Matillion job hangs"},
+        {"title": "Old credit spike", "status": "Closed", "completed_at": "2020-01-01T00:00:00+00:00"}])
+    tm.archive_closed(30)
+    return tasks
+
+
+def test_full_export(tm, tmp_path):
+    snow, mat, old = _seed(tm)
+    r = exporter.export(str(tmp_path / "out"), "jsonl", batch=1)
+    assert (r["tasks"], r["activity"], r["since"]) == (3, 1, None)
+    rows = {t["id"]: t for t in _jsonl(tmp_path / "out" / "tasks.jsonl")}
+    assert rows[snow["id"]]["tags"] == "snowflake,etl" and rows[snow["id"]]["source_id"] == "42"
+    assert json.loads(rows[snow["id"]]["extra"]) == {"priority": "high"} and rows[snow["id"]]["activity_count"] == 1
+    assert (rows[old["id"]]["archived"], rows[mat["id"]]["archived"]) == (True, False)
+    assert _jsonl(tmp_path / "out" / "activity.jsonl") == [
+        {"task_id": snow["id"], "seq": 0, "at": "2024-05-01T10:00:00+00:00", "who": "ana", "text": "paused — resumed"}]
+    assert exporter.export(str(tmp_path / "hot"), "jsonl", include_archived=False)["tasks"] == 2
+
+
+def test_since_picks_up_every_write(tm, tmp_path):
+    snow, mat, old = _seed(tm)
+    exporter.export(str(tmp_path / "out"), "csv")
+    since = time.time()
+    tm.set_status(mat["id"], "In Progress")          # no timestamp on the task moves
+    tm.add_activity(old["id"], "bo", "linked from the postmortem")
+    (new,) = tm.create_tasks([{"title": "New stream lag"}])
+    r = exporter.export(str(tmp_path / "out"), "csv", since=since)
+    with open(tmp_path / "out" / "tasks.csv", newline="") as f:
+        got = {row["id"]: row for row in csv.DictReader(f)}
+    assert set(got) == {mat["id"], old["id"], new["id"]}
+    assert got[mat["id"]]["status"] == "In Progress" and got[old["id"]]["archived"] == "True"
+    with open(tmp_path / "out" / "activity.csv", newline="") as f:
+        assert [row["text"] for row in csv.DictReader(f)] == ["linked from the postmortem"]
+    assert r["tasks"] == 3
+
+
+def test_since_before_the_feed_falls_back_to_timestamps(tm, tmp_path):
+    snow, mat, old = _seed(tm)
+    tm.set_status(mat["id"], "In Progress")
+    since = changes.feed().created_at() - 3600
+    # Every task was created after `since`, so all of them count as touched.
+    assert exporter.export(str(tmp_path / "out"), "jsonl", since=since)["tasks"] == 3
+    far_future = time.time() + 3600
+    assert exporter.export(str(tmp_path / "none"), "jsonl", since=far_future)["tasks"] == 0
+
+
+def test_watermark(tm, tmp_path, monkeypatch):
+    # A fresh feed can't answer for anything before it started.
+    t = time.time()
+    r = exporter.export(str(tmp_path / "out"), "jsonl")
+    born = changes.feed().created_at()
+    assert r["watermark"] == born and changes.feed().ids_since(r["watermark"]) == set()
+    # Otherwise the next run overlaps this one by OVERLAP_SECONDS.
+    monkeypatch.setattr(changes.ChangeFeed, "created_at", lambda self: 0.0)
+    r = exporter.export(str(tmp_path / "out"), "jsonl")
+    assert t - exporter.OVERLAP_SECONDS <= r["watermark"] <= time.time() - exporter.OVERLAP_SECONDS
+
+
+def test_state_file_round_trip(tm, tmp_path, capsys):
+    _seed(tm)
+    state = str(tmp_path / "export.state")
+    exporter.main([str(tmp_path / "out"), "--format", "jsonl", "--state", state, "--nice", "0"])
+    assert "Exported 3 tasks" in capsys.readouterr().out
+    mark = exporter._read_state(state)
+    assert mark is not None
+    # The overlap would re-export the seed (loads are upserts); move the
+    # mark past it to see that the next run reads the state file.
+    with open(state, "w") as f:
+        json.dump({"watermark": time.time()}, f)
+    tm.create_tasks([{"title": "after the first run"}])
+    exporter.main([str(tmp_path / "out"), "--format", "jsonl", "--state", state, "--nice", "0"])
+    assert "Exported 1 tasks" in capsys.readouterr().out
+    assert [t["title"] for t in _jsonl(tmp_path / "out" / "tasks.jsonl")] == ["after the first run"]
+    assert exporter._read_state(state) >= mark
+    assert exporter._read_state(str(tmp_path / "missing")) is None
+
+
+def test_failed_export_keeps_previous_files(tm, tmp_path, monkeypatch):
+    _seed(tm)
+    out = tmp_path / "out"
+    exporter.export(str(out), "jsonl")
+    before = (out / "tasks.jsonl").read_bytes()
+    def broken(*a):
+        yield [{"id": "TASK-x"}], []
+        raise OSError("store went away")
+    monkeypatch.setattr(exporter, "iter_export", broken)
+    with pytest.raises(OSError):
+        exporter.export(str(out), "jsonl")
+    assert (out / "tasks.jsonl").read_bytes() == before
+    assert sorted(p.name for p in out.iterdir()) == ["activity.jsonl", "tasks.jsonl"]
+
+
+def test_parquet(tm, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _seed(tm)
+    exporter.export(str(tmp_path / "out"), "parquet", batch=2)
+    table = pq.read_table(str(tmp_path / "out" / "tasks.parquet"))
+    assert table.num_rows == 3 and str(table.schema.field("archived").type) == "bool"
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        exporter.export(str(tmp_path), "xlsx")
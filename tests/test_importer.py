@@ -0,0 +1,92 @@
+import json, threading
+import multiprocessing as mp
+import pytest
+from services.storage import open_store
+from services import importer
+
+FILES = {"json": "tasks.json", "sqlite": "tasks.db", "packed": "tasks.pack"}
+
+
+def _allocate(backend, path, rounds, out):
+    store = open_store(backend, path)
+    for _ in range(rounds):
+        out.extend(store.allocate_ids(3))
+
+
+def _allocate_to_queue(backend, path, rounds, q):
+    got = []
+    _allocate(backend, path, rounds, got)
+    q.put(got)
+
+
+@pytest.mark.parametrize("backend", sorted(FILES))
+def test_allocate_ids_unique_across_threads_and_processes(tmp_path, backend):
+    path = str(tmp_path / FILES[backend])
+    open_store(backend, path).insert({"id": "TASK-7", "title": "existing", "status": "Open"})
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    procs = [ctx.Process(target=_allocate_to_queue, args=(backend, path, 10, q)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    got = []
+    threads = [threading.Thread(target=_allocate, args=(backend, path, 10, got)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for _ in procs:
+        got += q.get(timeout=60)
+    for p in procs:
+        p.join()
+    assert sorted(got) == list(range(8, 8 + 6 * 10 * 3))
+
+
+def test_concurrent_create_task_ids_are_unique(tm):
+    out = []
+    threads = [threading.Thread(target=lambda i=i: out.append(tm.create_task(f"t{i}", "")["id"])) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(out)) == 10 and len(tm.list_tasks()) == 10
+
+
+CSV = ("\ufeffSummary,Details,State,Labels,Due_Days,Created,Key\n"
+       "Snowpipe backlog,\"files queued, pipe paused\",Open,\"snowflake; etl\",3,2024-05-01T10:00:00+00:00,OPS-1\n"
+       ",no title so skipped,Open,,,,OPS-2\n"
+       "Matillion job hangs,,Closed,matillion,soon,,OPS-3\n")
+
+
+def test_import_csv(tm, tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(CSV, encoding="utf-8")
+    assert importer.import_file(str(path)) == 2
+    tasks = {t["title"]: t for t in tm.list_tasks()}
+    snow, mat = tasks["Snowpipe backlog"], tasks["Matillion job hangs"]
+    assert (snow["description"], snow["status"], list(snow["tags"]), snow["due_days"]) == \
+        ("files queued, pipe paused", "Open", ["snowflake", "etl"], 3)
+    assert snow["created_at"] == "2024-05-01T10:00:00+00:00" and snow["source_id"] == "OPS-1"
+    # An unparsable due_days falls back to the default.
+    assert (mat["status"], mat["due_days"], mat["source_id"]) == ("Closed", 5, "OPS-3")
+
+
+def test_import_jsonl_in_batches(tm, tmp_path, monkeypatch):
+    path = tmp_path / "export.jsonl"
+    rows = [{"title": f"task {i}", "labels": ["etl"], "activity": [{"at": "2024-05-01T10:00:00+00:00", "who": "ana", "text": f"note {i}"}]}
+            for i in range(25)]
+    path.write_text("\n".join(json.dumps(r) for r in rows[:10]) + "\n\n" + "\n".join(json.dumps(r) for r in rows[10:]) + "\n")
+    calls = []
+    create = importer.create_tasks
+    monkeypatch.setattr(importer, "create_tasks", lambda chunk: calls.append(len(chunk)) or create(chunk))
+    assert importer.main([str(path), "--batch-size", "10"]) is None
+    assert calls == [10, 10, 5]
+    tasks = {t["title"]: t for t in tm.list_tasks()}
+    assert len(tasks) == 25
+    t = tasks["task 24"]
+    assert list(t["tags"]) == ["etl"] and [a["text"] for a in tm.iter_activity(t["id"])] == ["note 24"]
+    assert [x["id"] for x in tm.search_tasks("note 24")][:1] == [t["id"]]
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        importer.read_records(str(tmp_path / "export.xlsx"))
@@ -0,0 +1,124 @@
+import os
+import pytest
+from services.kb import KnowledgeBase, normalize_url, parse
+
+RUNBOOK = """---
+title: Snowpipe runbook
+url: https://Docs.Example.com/runbooks/snowpipe/?utm_source=wiki#top
+---
+# Snowpipe
+
+## Backlog
+Check SYSTEM$PIPE_STATUS and resume the paused pipe.
+
+## Credits
+Warehouse credit spikes usually mean auto-suspend is off.
+"""
+
+COPY = """<html><head><title>Snowpipe (mirror)</title>
+<link rel="canonical" href="https://docs.example.com:443/runbooks/snowpipe"></head>
+<body><h2>Backlog</h2><p>Mirror of the pipe backlog notes.</p><script>var x = 1;</script></body></html>
+"""
+
+
+@pytest.mark.parametrize("url, want", [
+    ("https://Docs.Example.com/a/", "https://docs.example.com/a"),
+    ("docs.example.com/a", "https://docs.example.com/a"),
+    ("http://example.com:80/a#frag", "http://example.com/a"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://example.com/a?b=2&a=1&utm_source=x&gclid=y", "https://example.com/a?a=1&b=2"),
+    ("  ", ""),
+])
+def test_normalize_url(url, want):
+    assert normalize_url(url) == want
+
+
+def test_parsers():
+    doc = parse("snowpipe.md", RUNBOOK.encode())
+    assert (doc.title, [h for h, _ in doc.sections]) == ("Snowpipe runbook", ["Backlog", "Credits"])
+    html = parse("copy.html", COPY.encode())
+    assert (html.title, html.url, html.sections) == ("Snowpipe (mirror)", "https://docs.example.com:443/runbooks/snowpipe",
+                                                     [("Backlog", ["Mirror of the pipe backlog notes."])])
+    assert parse("notes.txt", b"Matillion tips\n\nUse grid variables.").title == "Matillion tips"
+
+
+def _write(path, text, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _titles(kb, q):
+    return [h["title"] for h in kb.search(q)]
+
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "docs"
+    _write(str(root / "snowpipe.md"), RUNBOOK)
+    _write(str(root / "sub" / "matillion.txt"), "Matillion tips\n\nUse grid variables for environments.")
+    _write(str(root / ".git" / "ignored.md"), "# Hidden\n\nnever indexed")
+    _write(str(root / "image.png"), "not text")
+    return root
+
+
+def test_ingest_is_incremental(tmp_path, docs):
+    kb = KnowledgeBase(str(tmp_path / "kb"))
+    first = kb.ingest(str(docs))
+    assert (first["added"], first.get("unchanged", 0)) == (2, 0)
+    assert _titles(kb, "paused pipe") == ["Snowpipe runbook"] and kb.search("hidden") == []
+    v = kb.version()
+
+    assert kb.ingest(str(docs)) == {"unchanged": 2, "chunks_added": 0, "chunks_removed": 0}
+    assert kb.version() == v
+
+    # Same bytes, new mtime: only the stat is refreshed.
+    _write(str(docs / "sub" / "matillion.txt"), "Matillion tips\n\nUse grid variables for environments.", mtime=1)
+    assert kb.ingest(str(docs))["touched"] == 1 and kb.version() == v
+
+    _write(str(docs / "sub" / "matillion.txt"), "Matillion tips\n\nUse shared jobs for retries.", mtime=2)
+    out = kb.ingest(str(docs))
+    assert (out["updated"], out["unchanged"]) == (1, 1) and kb.version() != v
+    assert kb.search("grid variables") == [] and _titles(kb, "shared jobs") == ["Matillion tips"]
+
+    os.remove(docs / "snowpipe.md")
+    assert kb.ingest(str(docs))["removed"] == 1
+    assert kb.search("paused pipe") == []
+    assert kb.stats()["docs"] == 1
+
+    # Another process (a fresh instance) sees the same index.
+    assert _titles(KnowledgeBase(str(tmp_path / "kb")), "shared jobs") == ["Matillion tips"]
+
+
+def test_same_url_is_indexed_once(tmp_path, docs):
+    _write(str(docs / "mirror" / "copy.html"), COPY)
+    kb = KnowledgeBase(str(tmp_path / "kb"))
+    kb.ingest(str(docs))
+    assert kb.stats()["duplicates"] == 1
+    hits = kb.search("backlog")
+    assert len(hits) == 1 and hits[0]["url"] == "https://docs.example.com/runbooks/snowpipe"
+    # When the original goes, the duplicate takes its place.
+    os.remove(docs / "snowpipe.md")
+    kb.ingest(str(docs))
+    assert kb.stats()["duplicates"] == 0 and _titles(kb, "backlog") == ["Snowpipe (mirror)"]
+
+
+def test_index_out_of_step_is_rebuilt(tmp_path, docs):
+    kb = KnowledgeBase(str(tmp_path / "kb"))
+    kb.ingest(str(docs))
+    # As if a crash hit between the SQLite commit and the index journal.
+    kb.index.build([])
+    assert _titles(KnowledgeBase(str(tmp_path / "kb")), "paused pipe") == ["Snowpipe runbook"]
+
+
+def test_links_are_deduplicated(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / "kb"))
+    assert kb.add_link("https://docs.snowflake.com/en/user-guide/data-load-snowpipe/", "Snowpipe docs")
+    assert not kb.add_link("docs.snowflake.com/en/user-guide/data-load-snowpipe?utm_campaign=x")
+    assert [(l["url"], l["note"]) for l in kb.links()] == [("https://docs.snowflake.com/en/user-guide/data-load-snowpipe", "Snowpipe docs")]
+    kb.remove_link("HTTPS://docs.snowflake.com/en/user-guide/data-load-snowpipe#top")
+    assert kb.links() == []
+    with pytest.raises(ValueError):
+        kb.add_link(" ")
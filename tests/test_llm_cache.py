@@ -0,0 +1,71 @@
+import time
+from services import llm_cache, ai_assistant
+from services.llm_cache import ResponseCache, cache_key
+
+MESSAGES = [{"role": "user", "content": "Why is the pipe stuck?"}]
+
+
+def test_cache_key_covers_the_whole_request():
+    base = cache_key("m", 0.2, "sys", MESSAGES)
+    assert base == cache_key("m", 0.2, "sys", [dict(MESSAGES[0])])
+    others = {cache_key("m2", 0.2, "sys", MESSAGES), cache_key("m", 0.3, "sys", MESSAGES),
+              cache_key("m", 0.2, "sys2", MESSAGES), cache_key("m", 0.2, "sys", MESSAGES + MESSAGES)}
+    assert base not in others and len(others) == 4
+
+
+def test_memory_then_disk_hits(tmp_path):
+    path = str(tmp_path / "llm.db")
+    a = ResponseCache(path)
+    a.put("k", "answer", "TASK-1")
+    assert a.get("k") == "answer" and a.get("other") is None
+    b = ResponseCache(path)
+    assert b.get("k") == "answer" and b.get("k") == "answer"
+    assert (a.stats["memory_hits"], a.stats["misses"]) == (1, 1)
+    assert (b.stats["disk_hits"], b.stats["memory_hits"]) == (1, 1)
+    assert b.hit_stats()["hit_rate"] == 1.0
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    c = ResponseCache(str(tmp_path / "llm.db"), ttl=60)
+    c.put("k", "answer")
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 61)
+    assert c.get("k") is None and ResponseCache(c.path).get("k") is None
+
+
+def test_disk_trimmed_to_most_recently_used(tmp_path):
+    c = ResponseCache(str(tmp_path / "llm.db"), max_memory=2, max_disk=3)
+    for i in range(5):
+        c.put(f"k{i}", f"v{i}")
+        time.sleep(0.002)
+    c.get("k0")
+    c.evict()
+    fresh = ResponseCache(c.path)
+    assert [fresh.get(f"k{i}") for i in range(5)] == ["v0", None, None, "v3", "v4"]
+
+
+def test_invalidate_task_drops_memory_and_disk(tmp_path):
+    a = ResponseCache(str(tmp_path / "llm.db"))
+    a.put("k1", "about task 1", "TASK-1")
+    a.put("k2", "about task 2", "TASK-2")
+    b = ResponseCache(a.path)
+    a.invalidate_task("TASK-1")
+    assert a.get("k1") is None and b.get("k1") is None
+    assert a.get("k2") == "about task 2"
+
+
+def test_task_writes_invalidate_answers(tm, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "k")
+    monkeypatch.setattr(ai_assistant, "_client", ai_assistant.ChatClient(api_key="k", url="http://127.0.0.1:9"))
+    calls = []
+    monkeypatch.setattr(ai_assistant.ChatClient, "chat", lambda self, *a: calls.append(a) or f"answer {len(calls)}")
+    a, b = tm.create_tasks([{"title": "Snowpipe backlog"}, {"title": "Matillion job hangs"}])
+
+    def ask(t):
+        return ai_assistant.groq_chat(MESSAGES + [{"role": "user", "content": t["title"]}], task_id=t["id"])
+    assert ask(a) == ask(a) == "answer 1"
+    assert ask(b) == "answer 2"
+    tm.add_activity(a["id"], "ana", "pipe resumed")
+    assert ask(a) == "answer 3" and ask(b) == "answer 2"
+    tm.delete_task(b["id"])
+    assert ask(b) == "answer 4"
@@ -0,0 +1,84 @@
+import random
+import pytest
+
+STATUS_CASES = ["Open", "open", "In Progress", "Closed", "CLOSED"]
+TAGS = ["etl", "snowflake", "matillion", "100%_done"]
+
+
+def _items(n=120, seed=11):
+    rnd = random.Random(seed)
+    words = ["snowpipe", "backlog", "Matillion", "hang", "warehouse", "lag", "50%", "a_b"]
+    out = []
+    for i in range(n):
+        out.append({"title": f"{rnd.choice(words)} {rnd.choice(words)} #{i:03d}",
+                    "description": " ".join(rnd.sample(words, 3)),
+                    "status": rnd.choice(STATUS_CASES),
+                    "tags": rnd.sample(TAGS, rnd.randint(0, 2)),
+                    "created_at": f"2024-05-{rnd.randint(1, 28):02d}T{i // 60:02d}:{i % 60:02d}:00+00:00"})
+    return out
+
+
+def _expected(tasks, status=None, tag=None, text=None, sort="newest"):
+    wanted = None if status is None else {s.lower() for s in ([status] if isinstance(status, str) else status)}
+    needle = (text or "").lower()
+    rows = [t for t in tasks if (wanted is None or t["status"].lower() in wanted)
+            and (tag is None or tag in t["tags"])
+            and (needle in t["title"].lower() or needle in t["description"].lower())]
+    key, desc = {"newest": ("created_at", True), "oldest": ("created_at", False),
+                 "title": ("title", False), "status": ("status", False)}[sort]
+    if key == "status":
+        # Only the status order is compared; ties may come back in any order.
+        return sorted((t["status"].lower() for t in rows)), len(rows)
+    rows.sort(key=lambda t: t[key].lower(), reverse=desc)
+    return [t["title"] for t in rows], len(rows)
+
+
+@pytest.fixture(params=["sqlite", "json", "packed"])
+def loaded(tm, monkeypatch, request):
+    monkeypatch.setattr(tm, "BACKEND", request.param)
+    items = _items()
+    tm.create_tasks(items)
+    return tm, items
+
+
+QUERIES = [
+    {},
+    {"status": "open"},
+    {"status": ["Open", "in progress"]},
+    {"tag": "etl"},
+    {"tag": "100%_done", "sort": "oldest"},
+    {"text": "SNOWPIPE", "sort": "title"},
+    {"text": "50%"},
+    {"text": "a_b", "status": "closed"},
+    {"status": "closed", "sort": "status"},
+    {"tag": "nope"},
+]
+
+
+@pytest.mark.parametrize("q", QUERIES, ids=[str(q) for q in QUERIES])
+def test_query_tasks_matches_a_plain_filter(loaded, q):
+    tm, items = loaded
+    want, total = _expected(items, **q)
+    pages, offset = [], 0
+    while True:
+        rows, n = tm.query_tasks(offset=offset, limit=25, **q)
+        assert n == total
+        if not rows:
+            break
+        pages += rows
+        offset += 25
+    got = [r["status"].lower() for r in pages] if q.get("sort") == "status" else [r["title"] for r in pages]
+    assert got == want
+    everything, n = tm.query_tasks(limit=None, **q)
+    assert n == total and [r["id"] for r in everything] == [r["id"] for r in pages]
+
+
+def test_query_sees_writes(loaded):
+    tm, items = loaded
+    before = tm.query_tasks(status="closed")[1]
+    (t,) = tm.create_tasks([{"title": "fresh", "status": "Closed", "tags": ["etl"]}])
+    assert tm.query_tasks(status="closed")[1] == before + 1
+    tm.set_status(t["id"], "Open")
+    assert tm.query_tasks(status="closed")[1] == before
+    tm.delete_task(t["id"])
+    assert tm.query_tasks(text="fresh") == ([], 0)
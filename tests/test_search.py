@@ -0,0 +1,96 @@
+import os, json
+from services.search import InvertedIndex, SearchIndex
+
+
+def test_delete_task_removes_only_its_terms(tm, monkeypatch):
+    keep, gone = tm.create_tasks([{"title": "Snowpipe backlog", "description": "files queued"},
+                                  {"title": "Matillion job hangs", "description": "stuck on a lock"}])
+    tm.add_activity(gone["id"], "ana", "killed the zombie session")
+    assert [t["id"] for t in tm.search_tasks("zombie")] == [gone["id"]]
+
+    seen = []
+    remove = InvertedIndex.remove
+    def spy(self, doc, text=None):
+        seen.append(text)
+        return remove(self, doc, text)
+    monkeypatch.setattr(InvertedIndex, "remove", spy)
+    tm.delete_task(gone["id"])
+    tm._search().refresh()
+
+    # The indexed text is passed along, so no scan of the whole vocabulary.
+    assert seen and all(t is not None and "zombie" in t and "Matillion" in t for t in seen)
+    for word in ("zombie", "matillion", "lock"):
+        assert tm.search_tasks(word) == []
+        assert word not in tm._search().index.postings
+    assert [t["id"] for t in tm.search_tasks("snowpipe")] == [keep["id"]]
+
+
+def test_delete_archived_task(tm):
+    (t,) = tm.create_tasks([{"title": "Old stream lag", "status": "Closed", "completed_at": "2020-01-01T00:00:00+00:00"}])
+    assert tm.archive_closed(1) == 1
+    assert [x["id"] for x in tm.search_tasks("stream lag")] == [t["id"]]
+    tm.delete_task(t["id"])
+    assert tm.get_task(t["id"]) is None and tm.archived_count() == 0
+    assert tm.search_tasks("stream lag") == []
+
+
+DOCS = [("TASK-1", "Snowpipe backlog\nfiles queued behind a paused pipe"),
+        ("TASK-2", "Matillion job hangs\nstuck on a table lock"),
+        ("TASK-3", "Warehouse credit spike\nauto-suspend was off")]
+
+
+def _same(a, b):
+    return {d: round(s, 9) for d, s in a} == {d: round(s, 9) for d, s in b}
+
+
+def test_writes_before_build_are_skipped(tmp_path):
+    idx = SearchIndex(str(tmp_path))
+    idx.add("TASK-1", "snowpipe")
+    assert not idx.exists() and not os.path.exists(idx.journal_path)
+
+
+def test_other_instances_replay_the_journal(tmp_path):
+    a, b = SearchIndex(str(tmp_path)), SearchIndex(str(tmp_path))
+    a.build(DOCS)
+    assert [d for d, _ in b.search("lock")] == ["TASK-2"]
+    v = b.version()
+    a.add("TASK-1", "retried after the lock cleared")
+    a.remove("TASK-2", DOCS[1][1])
+    assert a.version() != v
+    assert [d for d, _ in b.search("lock")] == ["TASK-1"]
+    assert b.search("matillion") == []
+    # A third process starting now loads the snapshot plus the journal.
+    c = SearchIndex(str(tmp_path))
+    assert _same(c.search("lock pipe", 10), b.search("lock pipe", 10))
+
+
+def test_compaction_matches_a_fresh_build(tmp_path):
+    a, b = SearchIndex(str(tmp_path / "live"), compact_every=5), SearchIndex(str(tmp_path / "live"))
+    a.build(DOCS[:1])
+    b.search("snowpipe")
+    final = {"TASK-1": DOCS[0][1]}
+    for i in range(12):
+        tid = f"TASK-{100 + i}"
+        a.add(tid, f"note {i} about warehouse lag")
+        final[tid] = f"note {i} about warehouse lag"
+        if i % 3 == 0:
+            a.remove(tid, final.pop(tid))
+    assert a._journal_gen() > 2 and a._ops < 5
+    fresh = SearchIndex(str(tmp_path / "fresh"))
+    fresh.build(final.items())
+    for q in ("warehouse lag", "note 4", "snowpipe"):
+        assert _same(b.search(q, 50), fresh.search(q, 50))
+        assert _same(a.search(q, 50), fresh.search(q, 50))
+
+
+def test_half_written_journal_line_waits(tmp_path):
+    a, b = SearchIndex(str(tmp_path)), SearchIndex(str(tmp_path))
+    a.build(DOCS)
+    b.search("lock")
+    line = json.dumps(["add", "TASK-9", "zombie session"]) + "\n"
+    with open(a.journal_path, "a") as f:
+        f.write(line[:10])
+    assert b.search("zombie") == []
+    with open(a.journal_path, "a") as f:
+        f.write(line[10:])
+    assert [d for d, _ in b.search("zombie")] == ["TASK-9"]
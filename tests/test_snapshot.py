@@ -0,0 +1,51 @@
+import pytest
+from services.storage import open_store
+
+
+@pytest.fixture(params=["sqlite", "json", "packed"])
+def store_tm(tm, monkeypatch, request):
+    monkeypatch.setattr(tm, "BACKEND", request.param)
+    monkeypatch.setitem(tm._cache_stats, "hits", 0)
+    monkeypatch.setitem(tm._cache_stats, "misses", 0)
+    return tm
+
+
+def test_reads_share_one_snapshot_until_a_write(store_tm):
+    tm = store_tm
+    (a,) = tm.create_tasks([{"title": "Snowpipe backlog"}])
+    first = tm.list_tasks()
+    assert tm.get_task(a["id"])["title"] == "Snowpipe backlog"
+    assert tm.by_status("open") == first
+    stats = tm.cache_stats()
+    assert (stats["misses"], stats["hits"], stats["tasks"]) == (1, 2, 1)
+
+    tm.set_status(a["id"], "Closed")
+    assert tm.get_task(a["id"])["status"] == "Closed"
+    assert tm.cache_stats()["misses"] == 2
+
+
+def test_activity_keeps_the_snapshot(store_tm):
+    tm = store_tm
+    (a,) = tm.create_tasks([{"title": "Matillion job hangs"}])
+    tm.list_tasks()
+    tm.add_activity(a["id"], "ana", "restarted the agent")
+    tm.list_tasks()
+    assert tm.cache_stats()["misses"] == 1
+    assert [x["text"] for x in tm.iter_activity(a["id"])] == ["restarted the agent"]
+
+
+def test_write_from_another_process_is_picked_up(tm):
+    (a,) = tm.create_tasks([{"title": "Snowpipe backlog"}])
+    assert tm.get_task(a["id"])["status"] == "Open"
+    # A second connection stands in for another server process.
+    open_store("sqlite", tm.DB_PATH).update(a["id"], {"status": "In Progress"})
+    assert tm.get_task(a["id"])["status"] == "In Progress"
+
+
+def test_rows_are_read_only(tm):
+    (a,) = tm.create_tasks([{"title": "Snowpipe backlog", "tags": ["etl"]}])
+    row = tm.get_task(a["id"])
+    with pytest.raises(TypeError):
+        row["status"] = "Closed"
+    assert tm.get_task(a["id"])["status"] == "Open"
+    assert list(row["tags"]) == ["etl"]
@@ -0,0 +1,162 @@
+import json, sqlite3
+import pytest
+from services.storage import JsonStore, PackedStore, SqliteStore, open_store, migrate_json
+from services.packfile import convert_json
+
+FILES = {"json": "tasks.json", "sqlite": "tasks.db", "packed": "tasks.pack"}
+
+
+def _task(tid, title="Snowpipe stopped loading", **extra):
+    t = {"id": tid, "title": title, "description": f"{title} since the last deploy", "status": "Open",
+         "created_at": "2024-05-01T10:00:00+00:00", "due_days": 3, "tags": ["snowflake", "etl"]}
+    t.update(extra)
+    return t
+
+
+def _act(text, at="2024-05-01T11:00:00+00:00"):
+    return {"at": at, "who": "ana", "text": text}
+
+
+def _texts(store, tid):
+    return [a["text"] for a in reversed(store.iter_activity(tid, limit=None))]
+
+
+def _write_json(path, tasks):
+    path.write_text(json.dumps(tasks, indent=2))
+
+
+@pytest.fixture(params=sorted(FILES))
+def backend(request):
+    return request.param
+
+
+def _open(backend, root):
+    return open_store(backend, str(root / FILES[backend]))
+
+
+def test_round_trip(backend, tmp_path):
+    store = _open(backend, tmp_path)
+    store.insert_many([_task("TASK-1", owner="ana", activity=[_act("one"), _act("two")]),
+                       _task("TASK-2", title="Matillion job hangs", status="Closed",
+                             completed_at="2024-05-02T09:00:00+00:00")])
+    store.update("TASK-1", {"status": "In Progress", "tags": ["snowflake"]})
+    store.append_activity("TASK-1", _act("three"))
+    store.delete("TASK-2")
+
+    again = _open(backend, tmp_path)
+    assert len(again.all()) == 1
+    assert dict(again.get("TASK-1")) == _task("TASK-1", owner="ana", status="In Progress", tags=["snowflake"])
+    assert again.get("TASK-2") is None
+    assert _texts(again, "TASK-1") == ["one", "two", "three"]
+    assert again.activity_count("TASK-1") == 3
+    # Pages are newest first and continue from the last seq seen.
+    first = again.iter_activity("TASK-1", limit=2)
+    assert [a["text"] for a in first] == ["three", "two"]
+    assert [a["text"] for a in again.iter_activity("TASK-1", before=first[-1]["seq"])] == ["one"]
+
+
+def test_allocate_ids_start_above_existing(backend, tmp_path):
+    store = _open(backend, tmp_path)
+    store.insert_many([_task("TASK-41"), _task("TASK-1234567")])
+    a, b = store.allocate_ids(2), store.allocate_ids(1)
+    assert a == [1234568, 1234569] and b == [1234570]
+
+
+def test_sqlite_insert_does_not_replace(tmp_path):
+    store = SqliteStore(str(tmp_path / "tasks.db"))
+    store.insert(_task("TASK-1", activity=[_act("keep me")]))
+    with pytest.raises(sqlite3.IntegrityError):
+        store.insert(_task("TASK-1", title="Other task"))
+    assert store.get("TASK-1")["title"] == "Snowpipe stopped loading"
+    assert _texts(store, "TASK-1") == ["keep me"]
+
+
+# Legacy tasks.json: ids derived from the creation time (so two tasks can
+# share one), a task without an id, and activity nested in each task.
+LEGACY = [
+    _task("TASK-1714557600", activity=[_act("first a"), _act("first b")]),
+    _task("TASK-1714557600", title="Second task, same second", activity=[_act("second a")]),
+    _task("TASK-12", title="Older numbering"),
+    {k: v for k, v in _task(None, title="No id at all", activity=[_act("orphan")]).items() if k != "id"},
+]
+
+
+def test_migrate_json_reids_duplicates(tmp_path, caplog):
+    _write_json(tmp_path / "tasks.json", LEGACY)
+    store = SqliteStore(str(tmp_path / "tasks.db"))
+    assert migrate_json(str(tmp_path / "tasks.json"), store) == 4
+    assert "2 tasks had a duplicate or missing id" in caplog.text
+
+    tasks = {t["title"]: t for t in store.all()}
+    assert len(tasks) == 4
+    first, second, orphan = tasks["Snowpipe stopped loading"], tasks["Second task, same second"], tasks["No id at all"]
+    assert first["id"] == "TASK-1714557600" and "legacy_id" not in first
+    assert second["legacy_id"] == "TASK-1714557600"
+    assert {second["id"], orphan["id"]} == {"TASK-1714557601", "TASK-1714557602"}
+    assert "legacy_id" not in orphan
+    assert _texts(store, first["id"]) == ["first a", "first b"]
+    assert _texts(store, second["id"]) == ["second a"]
+    assert _texts(store, orphan["id"]) == ["orphan"]
+    # The counter carries on above the new ids.
+    assert store.allocate_ids(1) == [1714557603]
+
+
+def test_migrate_json_into_store_with_same_ids_fails(tmp_path):
+    _write_json(tmp_path / "tasks.json", [_task("TASK-1")])
+    store = SqliteStore(str(tmp_path / "tasks.db"))
+    store.insert(_task("TASK-1", title="Already here"))
+    with pytest.raises(sqlite3.IntegrityError):
+        migrate_json(str(tmp_path / "tasks.json"), store)
+    assert store.get("TASK-1")["title"] == "Already here"
+
+
+def _used_by_json_store(root):
+    # JsonStore moves nested activity out to data/activity on first open, and
+    # later notes only ever go there.
+    _write_json(root / "tasks.json", [_task("TASK-1", activity=[_act("one"), _act("two")]), _task("TASK-2")])
+    store = JsonStore(str(root / "tasks.json"))
+    store.append_activity("TASK-2", _act("late note"))
+    assert all("activity" not in t for t in json.loads((root / "tasks.json").read_text()))
+    return str(root / "tasks.json")
+
+
+def test_migrate_json_keeps_logged_activity(tmp_path):
+    path = _used_by_json_store(tmp_path)
+    store = SqliteStore(str(tmp_path / "tasks.db"))
+    migrate_json(path, store)
+    assert _texts(store, "TASK-1") == ["one", "two"]
+    assert _texts(store, "TASK-2") == ["late note"]
+
+
+@pytest.mark.parametrize("pack_dir", ["same", "other"])
+def test_convert_json_keeps_logged_activity(tmp_path, pack_dir):
+    path = _used_by_json_store(tmp_path)
+    # A pack next to tasks.json shares its activity log; one elsewhere gets the entries copied in.
+    root = tmp_path if pack_dir == "same" else tmp_path / "other"
+    root.mkdir(exist_ok=True)
+    assert convert_json(path, str(root / "tasks.pack")) == 2
+    store = PackedStore(str(root / "tasks.pack"))
+    assert _texts(store, "TASK-1") == ["one", "two"]
+    assert _texts(store, "TASK-2") == ["late note"]
+
+
+def test_convert_json_nested_activity_and_duplicates(tmp_path):
+    _write_json(tmp_path / "tasks.json", LEGACY)
+    assert convert_json(str(tmp_path / "tasks.json"), str(tmp_path / "tasks.pack"), compress=True) == 4
+    store = PackedStore(str(tmp_path / "tasks.pack"))
+    assert store.count() == 4
+    assert _texts(store, "TASK-12") == []
+    assert {t["title"] for t in store.all()} == {t["title"] for t in LEGACY}
+
+
+def test_unpack_then_json_store_keeps_all_activity(tmp_path):
+    packed = PackedStore(str(tmp_path / "tasks.pack"))
+    packed.insert_many([_task("TASK-1", activity=[_act("packed")])])
+    packed.append_activity("TASK-1", _act("appended"))
+    (tmp_path / "json").mkdir()
+    out = str(tmp_path / "json" / "tasks.json")
+    assert packed.export_json(out) == 1
+    store = JsonStore(out)
+    assert _texts(store, "TASK-1") == ["packed", "appended"]
+    # Re-opening doesn't move anything twice.
+    assert _texts(JsonStore(out), "TASK-1") == ["packed", "appended"]
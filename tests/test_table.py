@@ -0,0 +1,54 @@
+import datetime as dtm
+from services.table import TaskTable
+from services.temporal import is_closed
+from services.aggregates import TaskAggregates
+
+# Statuses are stored as typed or imported, so "closed" must not depend on case or padding.
+STATUSES = ["Closed", "closed", " CLOSED ", "Completed", "completed\n", "Open", "In Progress", "", None]
+CLOSED = [True, True, True, True, True, False, False, False, False]
+
+
+def _tasks():
+    return [{"id": f"TASK-{i}", "title": f"t{i}", "status": s, "created_at": "2024-05-01T10:00:00+00:00"}
+            for i, s in enumerate(STATUSES, 1)]
+
+
+def test_is_closed():
+    assert [is_closed(s) for s in STATUSES] == CLOSED
+
+
+def test_closed_mask_matches_is_closed():
+    assert TaskTable(_tasks()).closed_mask().tolist() == CLOSED
+
+
+def test_aggregates_agree_built_or_patched():
+    from_table = TaskAggregates.build(TaskTable(_tasks())).kpis()
+    from_dicts = TaskAggregates.build(_tasks()).kpis()
+    patched = TaskAggregates.build([])
+    for t in _tasks():
+        patched.upsert(t)
+    assert from_table == from_dicts == patched.kpis()
+    assert from_table["closed"] == sum(CLOSED)
+
+
+def test_kpis_same_after_incremental_update_and_rebuild(tm):
+    old = (dtm.datetime.now(dtm.timezone.utc) - dtm.timedelta(days=30)).isoformat()
+    tm.create_tasks([{"title": "old open task", "created_at": old}])
+    tm.task_kpis()      # builds the aggregates, which the next write patches
+    tm.create_tasks([{"title": "imported", "status": " closed", "created_at": old}])
+    incremental = tm.task_kpis()
+    tm._agg = None
+    assert incremental == tm.task_kpis()
+    assert (incremental["open"], incremental["closed"], incremental["overdue"]) == (1, 1, 1)
+
+
+def test_close_stamps_completed_at_whatever_the_case(tm):
+    (t,) = tm.create_tasks([{"title": "x"}])
+    tm.set_status(t["id"], "completed")
+    assert tm.get_task(t["id"])["completed_at"]
+
+
+def test_descriptions_load_on_first_access(tm):
+    tm.create_tasks([{"title": f"t{i}", "description": f"why {i} broke"} for i in range(600)])
+    rows = tm.list_tasks()
+    assert [r["description"] for r in rows[::97]] == [f"why {i} broke" for i in range(0, 600, 97)]